@@ -0,0 +1,92 @@
+"""
+This script follows the activities of HPE Compute Ops Management and writes every new activity to the standard output as newline-delimited JSON, e.g. to forward them to a SIEM:
+   python COM-Activities-tail.py >> activities.ndjson
+
+Only the activities created since the previous read are requested. The position in the activity stream is saved in the hpecom cache folder,
+so a restarted script continues where the previous run stopped, without duplicates and without downloading the history again.
+
+Note: To use the Compute Ops Management API, you must configure the API client credentials in the HPE GreenLake Cloud Platform.
+
+To learn more about how to set up the API client credentials, see https://support.hpe.com/hpesc/public/docDisplay?docId=a00120892en_us 
+
+Information about the HPE Greenlake for Compute Ops Management API can be found at:
+https://developer.greenlake.hpe.com/docs/greenlake/services/compute-ops/public/openapi/compute-ops-latest/overview/
+
+Requirements: 
+- Compute Ops Management API Client Credentials with appropriate roles, this includes:
+   - A Client ID
+   - A Client Secret
+   - A Connectivity Endpoint
+- The hpecom folder located next to this script (shared COM API client)
+
+
+Author: vincent.berger@hpe.com
+Date:   September 2022
+"""
+    
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+# MODULES TO INSTALL
+import sys
+from hpecom import ActivityTailer, COMClient, TokenProvider, write_ndjson, client_secret
+
+# Variables of the activity stream
+## Name of the saved position in the stream, one per consumer
+CursorName = "siem"
+## Seconds between two reads of the activities
+Interval = 30
+## Activities to forward, e.g. Field('source/type').eq('Server') (add Field to the hpecom import), or None for all of them
+ActivityFilter = None
+## Date of the first activity to read when there is no saved position: '' for the whole history, None to start from now
+Start = None
+
+# API Client Credentials
+#ClientID = "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
+ClientID = "a2acb3fd-5dd3-403f-b26f-4044c409f809"
+
+# The connectivity endpoint can be found in the GreenLake platform / API client information
+ConnectivityEndpoint = "https://us-west2-api.compute.cloud.hpe.com"
+APIversion = "v1beta1"
+
+
+# The client secret is only looked up when no valid token is found in the local token cache: COM_CLIENT_SECRET environment
+# variable, ~/.config/hpecom/credentials.json, system keyring, then a prompt when run from a terminal
+ClientSecret = client_secret(ClientID)
+
+# Token provider: tokens are cached on disk per ClientID and refreshed before they expire
+tokens = TokenProvider(ClientID, ClientSecret)
+
+# Pooled client: a single keep-alive connection to the connectivity endpoint is reused for the whole run
+com = COMClient(ConnectivityEndpoint, APIversion, tokens)
+
+#-----------------------------------------------------------Follow the activities-----------------------------------------------------------------------------
+
+tailer = ActivityTailer(com, CursorName, filter=ActivityFilter, start=Start)
+
+try:
+  for activity in tailer.follow(interval=Interval):
+    write_ndjson([activity], sys.stdout)
+except KeyboardInterrupt:
+  pass
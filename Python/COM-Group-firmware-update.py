@@ -17,6 +17,7 @@ Requirements:
    - A Client ID
    - A Client Secret
    - A Connectivity Endpoint
+- The hpecom folder located next to this script (shared COM API client)
 
 
 Author: vincent.berger@hpe.com
@@ -48,16 +49,23 @@ Date:   September 2022
 #################################################################################
 
 # MODULES TO INSTALL
-import requests
-import getpass
+import json
 import warnings
-from time import sleep
-from oauthlib.oauth2 import BackendApplicationClient       
-from requests_oauthlib import OAuth2Session       
+from hpecom import COMClient, FirmwareProgress, Instrumentation, JobWatcher, TokenProvider, get_servers, client_secret
 
 # Variables to perform the group firmware update 
 GroupName = "Production-Group"
 Baseline = "2022.03.0" 
+## Number of servers read in parallel for the final update report
+ReportConcurrency = 8
+## JSON file receiving the per-endpoint request statistics (latency, retries, bytes) at exit, None to disable
+RequestStatsFile = None
+## Follow the devices of the job during the update: every change (phase, power state, update status) is printed as a
+## JSON line with the per-device durations and an ETA. False to only follow the state of the job
+DeviceProgress = True
+## Seconds between two reads of the devices, JSON lines file receiving the changes (None: printed)
+ProgressInterval = 20
+ProgressFile = None
 
 # API Client Credentials
 #ClientID = "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
@@ -68,18 +76,20 @@ ConnectivityEndpoint = "https://us-west2-api.compute.cloud.hpe.com"
 APIversion = "v1beta1"
 
 
-ClientSecret = getpass.getpass(prompt='Enter your HPE GreenLake Client Secret: ')
+# The client secret is only looked up when no valid token is found in the local token cache: COM_CLIENT_SECRET environment
+# variable, ~/.config/hpecom/credentials.json, system keyring, then a prompt when run from a terminal
+ClientSecret = client_secret(ClientID)
 
-client = BackendApplicationClient(ClientID)       
-      
-oauth = OAuth2Session(client=client)       
-auth = requests.auth.HTTPBasicAuth(ClientID, ClientSecret)       
+# Token provider: tokens are cached on disk per ClientID and refreshed before they expire
+tokens = TokenProvider(ClientID, ClientSecret)
 
-      
-token = oauth.fetch_token(token_url='https://sso.common.cloud.hpe.com/as/token.oauth2', auth=auth)       
-AccessToken = token["access_token"]
+# Request statistics
+instrumentation = Instrumentation() if RequestStatsFile else None
+if instrumentation:
+  instrumentation.write_at_exit(RequestStatsFile)
 
-headers = {"Authorization": "Bearer " + AccessToken}
+# Pooled client: a single keep-alive connection to the connectivity endpoint is reused for the whole run
+com = COMClient(ConnectivityEndpoint, APIversion, tokens, instrumentation=instrumentation)
 
 #-----------------------------------------------------------Start the firmware update-----------------------------------------------------------------------------
 
@@ -88,30 +98,21 @@ headers = {"Authorization": "Bearer " + AccessToken}
 ## Warning: Any updates other than iLO FW require a server reboot!
 ## Note: To set schedule options during updates, you must create a schedule instead of a job
 
-# Retrieve job template id of GroupFirmwareUpdate
-jobtemplates = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/job-templates', headers=headers).json() 
-jobtemplateUri = [jt for jt in jobtemplates['items'] if jt['name'] == 'GroupFirmwareUpdate']['resourceUri']
-if jobtemplateUri is None:
-    warnings.warn("Error, job template 'GroupFirmwareUpdate' not found!")
+# Retrieve job template uri of GroupFirmwareUpdate, group id of the defined group name and firmware bundle id of the defined baseline
+## Names are resolved from local indexes of the collections, cached between runs
+try:
+    jobtemplateUri = com.resolver.job_template_uri('GroupFirmwareUpdate')
+    groupid = com.resolver.group_id(GroupName)
+    bundleid = com.resolver.bundle_id(Baseline)
+except LookupError as error:
+    warnings.warn("Error, " + str(error))
     exit()
 
-# Retrieve group uri of the defined group name
-groups = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers).json()
-group = [group for group in groups['items'] if group['name'] == GroupName]
+group = com.get('/groups/' + groupid)
 resourceUri = group['resourceUri']
-if resourceUri is None:
-    warnings.warn("Error, group name '" + GroupName + "' not found!")
-    exit()
-
-# Retrieve firmware bundle id of the defined baseline
-bundles = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles', headers=headers).json()
-bundleid = [fb for fb in bundles['items'] if fb['releaseVersion'] == Baseline][0]['id']
-if bundleid is None:
-    warnings.warn("Error, firmware bundle '" + Baseline + "' not found!")
-    exit()
 
 # The list of devices must be provided even if they are already part of the group!
-deviceids = [ server[id] for server in group['devices']]
+deviceids = [ server['id'] for server in group['devices']]
 
 # Creation of the payload
 body = {
@@ -125,34 +126,49 @@ body = {
   }
 
 # Creation of the request
-headers["Content-Type"] = "application/json"
-response = requests.post(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/jobs', headers=headers, body=body) 
-jobUri = response.json()['resourceUri']
-
-## Wait for the task to start or fail
-status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
-while status['state'] != "running" and status != "error":
-   sleep(5)
-   status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
+response = com.post('/jobs', json=body) 
+jobUri = response['resourceUri']
+
+## Track the job until it completes or fails
+if DeviceProgress:
+  ## Only the devices of the job are read, in batches, and only their changes are reported
+  progress = FirmwareProgress(com, deviceids, job_uri=jobUri)
+  output = open(ProgressFile, 'a') if ProgressFile else None
+  for change in progress.follow(interval=ProgressInterval):
+    print(json.dumps(change), file=output, flush=True)
+  if output:
+    output.close()
+  print(f"Device update summary: {progress.summary()}")
+  if progress.job_error is not None:
+    ## The job could not be read several times in a row (deleted job...)
+    print(f"Job {jobUri} could not be read: {progress.job_error}")
+    exit()
+  ## Read the job again: it may still have been running at the last poll (timeout)
+  status = com.get(jobUri)
+else:
+  ## The job is read every few seconds at first, then less often while its state does not change
+  watcher = JobWatcher(com, initial_interval=5, max_interval=60)
+  watcher.watch(jobUri, callback=lambda event: print(f"Job state: {event.previous_state} -> {event.state}"))
+  status = watcher.run()[jobUri]
+  if jobUri in watcher.errors:
+    ## The job could not be read several times in a row (deleted job...)
+    print(f"Job {jobUri} could not be read: {watcher.errors[jobUri]}")
+    exit()
 
-## Wait for the task to complete
 if status['state'] == "error" :
   print(f"Group firmware update failed! {status['status']}")
 
 else :
-  status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
-  while status['state'] != "complete" and status != "error":
-    sleep(20)
-    status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
-    FWUpgradeStatus = requests.get(url=ConnectivityEndpoint + "/ui-doorway/compute/v1/servers/counts/state", headers=headers)['content']
-    print(FWUpgradeStatus)
-
   ## Display status
   print(f"State: {status['state']} - Status: {status['status']}")
 
   # Get the update report for the servers in the group after the update is complete if lastFirmwareUpdate is defined 
-  for deviceid in deviceids:
-   server = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers/' + deviceid, headers=headers)['content']
+  ## Servers are read in parallel (ReportConcurrency requests at a time), the report keeps the order of the devices
+  for result in get_servers(com, deviceids, concurrency=ReportConcurrency):
+   if result.error is not None:
+    print(f"Server: {result.key} - Error: {result.error}")
+    continue
+   server = result.value
    if server['lastFirmwareUpdate'] is not None:
     print(f"Server: {server['name']} - Report status: {server['lastFirmwareUpdate']['status']}")
    else:
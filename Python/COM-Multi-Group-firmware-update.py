@@ -0,0 +1,108 @@
+"""
+This script performs a firmware update of several server groups managed by HPE Compute Ops Management, each one with a defined SPP baseline.
+
+The groups are updated by parallel jobs, a new group starting as soon as another one ends. A canary group can be updated first: the other groups are only updated if it succeeds.
+
+Warning: Any updates other than iLO FW require a server reboot!
+
+Note: To set schedule options during updates, you must create a schedule instead of a job, see COM-Schedule-group-firmware-update.py
+
+Note: To use the Compute Ops Management API, you must configure the API client credentials in the HPE GreenLake Cloud Platform.
+
+To learn more about how to set up the API client credentials, see https://support.hpe.com/hpesc/public/docDisplay?docId=a00120892en_us 
+
+Information about the HPE Greenlake for Compute Ops Management API can be found at:
+https://developer.greenlake.hpe.com/docs/greenlake/services/compute-ops/public/openapi/compute-ops-latest/overview/
+
+Requirements: 
+- Compute Ops Management API Client Credentials with appropriate roles, this includes:
+   - A Client ID
+   - A Client Secret
+   - A Connectivity Endpoint
+- The hpecom folder located next to this script (shared COM API client)
+
+
+Author: vincent.berger@hpe.com
+Date:   September 2022
+"""
+    
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+# MODULES TO INSTALL
+from hpecom import COMClient, FirmwareRollout, TokenProvider, format_summary, client_secret
+
+# Variables to perform the group firmware updates
+## Group name: SPP baseline
+Targets = {
+    "Test-Group": "2022.03.0",
+    "Production-Group": "2022.03.0",
+    "Production-Group-2": "2022.03.0",
+}
+## Group updated alone first, the rollout stops if it fails (None to disable)
+CanaryGroup = "Test-Group"
+## Maximum number of group updates running at the same time
+Concurrency = 4
+## Number of failed groups after which no new group update is started
+MaxFailures = 1
+## Number of servers read in parallel for the final update report
+ReportConcurrency = 8
+
+# API Client Credentials
+#ClientID = "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
+ClientID = "a2acb3fd-5dd3-403f-b26f-4044c409f809"
+
+# The connectivity endpoint can be found in the GreenLake platform / API client information
+ConnectivityEndpoint = "https://us-west2-api.compute.cloud.hpe.com"
+APIversion = "v1beta1"
+
+
+# The client secret is only looked up when no valid token is found in the local token cache: COM_CLIENT_SECRET environment
+# variable, ~/.config/hpecom/credentials.json, system keyring, then a prompt when run from a terminal
+ClientSecret = client_secret(ClientID)
+
+# Token provider: tokens are cached on disk per ClientID and refreshed before they expire
+tokens = TokenProvider(ClientID, ClientSecret)
+
+# Pooled client: a single keep-alive connection to the connectivity endpoint is reused for the whole run
+com = COMClient(ConnectivityEndpoint, APIversion, tokens)
+
+#-----------------------------------------------------------Start the firmware updates-----------------------------------------------------------------------------
+
+# Create one GroupFirmwareUpdate job per group, at most Concurrency jobs running at the same time
+## The next group is submitted as soon as a job ends, a slow group does not hold back the others
+## Warning: Any updates other than iLO FW require a server reboot!
+## Note: To set schedule options during updates, you must create schedules instead of jobs
+
+rollout = FirmwareRollout(com, Targets, canary=CanaryGroup, concurrency=Concurrency, max_failures=MaxFailures,
+                          report_concurrency=ReportConcurrency,
+                          on_change=lambda group, event: print(f"Group: {group} - Job state: {event.previous_state} -> {event.state}"))
+
+print(f"Update order: {', '.join(group for group, _ in rollout.order())}")
+
+results = rollout.run()
+
+## Display the per-group and per-device report
+for line in format_summary(results):
+  print(line)
@@ -14,6 +14,7 @@ Requirements:
    - A Client ID
    - A Client Secret
    - A Connectivity Endpoint
+- The hpecom folder located next to this script (shared COM API client)
 
 
   Author: vincent.berger@hpe.com
@@ -46,11 +47,8 @@ Requirements:
 
 
 # MODULES TO INSTALL
-import requests
-import getpass
-from time import sleep
-from oauthlib.oauth2 import BackendApplicationClient       
-from requests_oauthlib import OAuth2Session       
+import sys
+from hpecom import COMClient, TokenProvider, Field, check_compliance, InventoryMirror, export_servers, JobWatcher, contains, get_servers, sync_group_devices, Server, iter_models, client_secret, MultiRegionClient, AlertHarvester, write_ndjson
 
 # API Client Credentials
 #ClientID = "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
@@ -61,25 +59,21 @@ ConnectivityEndpoint = "https://us-west2-api.compute.cloud.hpe.com"
 APIversion = "v1beta1"
 
 
-ClientSecret = getpass.getpass(prompt='Enter your HPE GreenLake Client Secret: ')
+# The client secret is only looked up when no valid token is found in the local token cache: COM_CLIENT_SECRET environment
+# variable, ~/.config/hpecom/credentials.json, system keyring, then a prompt when run from a terminal
+ClientSecret = client_secret(ClientID)
 
-client = BackendApplicationClient(ClientID)       
+# Token provider: tokens are cached on disk per ClientID and refreshed before they expire
+tokens = TokenProvider(ClientID, ClientSecret)
 
-      
-oauth = OAuth2Session(client=client)       
-auth = requests.auth.HTTPBasicAuth(ClientID, ClientSecret)       
-
-      
-token = oauth.fetch_token(token_url='https://sso.common.cloud.hpe.com/as/token.oauth2', auth=auth)       
-AccessToken = token["access_token"]
-
-headers = {"Authorization": "Bearer " + AccessToken}
+# Pooled client: a single keep-alive connection to the connectivity endpoint is reused for the whole run
+com = COMClient(ConnectivityEndpoint, APIversion, tokens)
 
 #-------------------------------------------------------SERVERS requests samples--------------------------------------------------------------------------------
 
 
 # Obtain the list of servers in your account
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers', headers=headers) 
+response = com.request('GET', '/servers') 
 ServersList = response.json()
 
 print(f"{ServersList['count']} server(s) found")
@@ -135,88 +129,127 @@ if ServersList['count'] > 0 :
 # Hostname / OS information
    print(ServersList['items'][0]['host'])
 
+# Same information with the typed models: misspelled attributes fail with AttributeError and nested sections are decoded on first access
+   server = Server.from_dict(ServersList['items'][0])
+   print(server.name, server.serial_number, server.model, server.power_state, server.health, server.bmc_ip)
+   print(server.firmware_inventory)
+
+# Whole fleet held as compact models (a fraction of the memory of the raw dicts)
+fleet = list(iter_models(com, '/servers'))
+print(f"{sum(server.power_state == 'ON' for server in fleet)} of {len(fleet)} server(s) powered on")
+
 # Obtain the first 10 servers
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers?limit=10', headers=headers)
+response = com.request('GET', '/servers?limit=10')
 ServersList = response.json()
 
 
 # List of servers from the 10th
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers?offset=9', headers=headers)
+response = com.request('GET', '/servers?offset=9')
 ServersList = response.json()
 
+# Iterate over all servers, whatever the number of pages
+## Pages are requested with 'limit'/'offset' and the next pages are fetched while the current one is processed
+for server in com.iter_collection('/servers', page_size=100):
+   print(server['name'])
+
 # Get a server by ID
-serverId = [server for server in ServersList['items'] if server['name'] == 'HPE-HOL33'][0]['id']
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers/' + serverId, headers=headers)
+serverId = next(server for server in com.iter_collection('/servers') if server['name'] == 'HPE-HOL33')['id']
+response = com.request('GET', '/servers/' + serverId)
 server = response.json()
 print(server)
 
 # List all alerts for a server
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers/' + serverId + '/alerts', headers=headers)
+response = com.request('GET', '/servers/' + serverId + '/alerts')
 alerts = response.json()
 print(alerts['items'])
 
+# New alerts of every server since the last run
+## Only the servers whose updatedAt changed are read, and only for the alerts created since their high-water mark.
+## The alerts are deduplicated and kept in a local SQLite store
+with AlertHarvester(com, name='samples') as harvester:
+   result = harvester.harvest()
+   print(f"{len(result.alerts)} new alert(s) - Servers read: {result.fetched} - Unchanged servers: {result.skipped}")
+   write_ndjson(result.alerts, sys.stdout)
+   print(harvester.alerts(severity='CRITICAL'))
+
 # List all DL360 Gen10+ servers
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers', headers=headers) 
-DL360Gen10Plus = [server for server in response.json()['items'] if server['hardware']['model'] == 'ProLiant DL360 Gen10 Plus']
+## The model is filtered by the API and only the selected properties are returned, instead of downloading every full server record
+DL360Gen10Plus = list(com.iter_collection('/servers', filter=Field('hardware/model').eq('ProLiant DL360 Gen10 Plus'), select=['id', 'name', 'hardware/model', 'hardware/bmc/ip']))
 print(DL360Gen10Plus)
 
+# Query a local mirror of the inventory instead of the API
+## The first sync reads servers, groups, firmware bundles and jobs; the next ones only read the records changed since the last sync
+mirror = InventoryMirror(com)
+mirror.sync()
+DL360Gen10Plus_local = mirror.find('servers', {'hardware/model': 'ProLiant DL360 Gen10 Plus'})
+print([ (server['name'], server['hardware']['bmc']['ip']) for server in DL360Gen10Plus_local ])
+
+# Export the servers and their firmware components to Parquet files for pandas / DuckDB (requires pyarrow)
+## Nested properties are flattened into columns (hardware/bmc/ip -> hardware_bmc_ip), firmwareInventory goes to a separate table
+files = export_servers(com, 'fleet-export', format='parquet', servers=mirror.query('servers'))
+print(files)
+
 #-------------------------------------------------------ACTIVITIES requests samples--------------------------------------------------------------------------------
 
 # List all activities
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/activities', headers=headers) 
-activities = response.json()
-print(activities['items'])
+for activity in com.iter_collection('/activities'):
+   print(activity)
 
 # List last 10 server activities
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + "/activities?filter=source/type eq 'Server'&limit=10", headers=headers) 
+response = com.request('GET', '/activities', params={'filter': Field('source/type').eq('Server'), 'limit': 10}) 
 activities = response.json()
 print(activities['items'])
 print(activities['count'])
 
 # List last 10 firmware activities
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + "/activities?filter=source/type eq 'Firmware'&limit=10", headers=headers) 
+response = com.request('GET', '/activities', params={'filter': Field('source/type').eq('Firmware'), 'limit': 10}) 
 firmware_activities = response.json()
 print(firmware_activities['items'])
 print(firmware_activities['count'])
 
 # List required subscriptions activities
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + "/activities?filter=source/type eq 'Server' and contains(key,'SERVER_ASSIGNED')", headers=headers) 
-subscription_activities = response.json()
-print(subscription_activities['items'])
-print(subscription_activities['count'])
+subscription_activities = list(com.iter_collection('/activities', filter=Field('source/type').eq('Server') & contains('key', 'SERVER_ASSIGNED')))
+print(subscription_activities)
+print(len(subscription_activities))
 
 #-------------------------------------------------------FIRMWARE-BUNDLES requests samples--------------------------------------------------------------------------------
 
 
 # List all firmware bundles
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles', headers=headers) 
-firmware_bundles = response.json()
-print(firmware_bundles['items'])
+firmware_bundles = list(com.iter_collection('/firmware-bundles'))
+print(firmware_bundles)
 
 # List a specific firmware bundle
-firmwarebundleid = [fb for fb in firmware_bundles['items'] if fb['releaseVersion'] == '2022.03.0'][0]['id']
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles/' + firmwarebundleid, headers=headers) 
+## Names and release versions are resolved to ids from local indexes of the collections, cached between runs
+firmwarebundleid = com.resolver.bundle_id('2022.03.0')
+response = com.request('GET', '/firmware-bundles/' + firmwarebundleid) 
 firmware_bundle = response.json()
 print(firmware_bundle)
 
+# Check the firmware compliance of every server with a baseline, without running an update (requires numpy)
+## The firmwareInventory of all servers is compared with the bundle components in one batch
+report = check_compliance(com, '2022.03.0')
+print(report.summary())
+for drift in report.drift:
+   print(f"Server: {drift.server_name} - {drift.component}: {drift.installed} (baseline: {drift.baseline}) - {drift.status}")
+
 
 #-------------------------------------------------------GROUPS requests samples--------------------------------------------------------------------------------
 
 # List all groups
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers) 
-groups = response.json()
-print(groups['items'])
+groups = list(com.iter_collection('/groups'))
+print(groups)
 
 
 # List a group
-groupid = [group for group in groups['items'] if group['name'] == 'Production']['id']
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups/' + groupid, headers=headers) 
+groupid = com.resolver.group_id('Production')
+response = com.request('GET', '/groups/' + groupid) 
 group = response.json()
 print(group)
 
 
 # Delete a group
-#response = requests.delete(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups/' + groupid, headers=headers) 
+#response = com.request('DELETE', '/groups/' + groupid) 
 print(response.json())
 
 
@@ -237,20 +270,17 @@ body = {
     }
   }
 
-headers['Content-Type'] = "application/json"
-#response = requests.post(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers, body=body) 
+#response = com.request('POST', '/groups', json=body) 
 print (response.json())
 newcreategroupid = response.json()['id']
 
 # Add all DL360 Gen10 Plus to newly created group
-devices = [ server[id] for server in DL360Gen10Plus]
+## Only the devices that are not members yet are sent, in chunks of 50 devices posted in parallel
+## The other members are kept, remove=True would also remove the members that are not DL360 Gen10 Plus
+devices = [ server['id'] for server in DL360Gen10Plus]
 
-body = {
-    "devices":  devices
-  }
-
-response = requests.post(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups/' + newcreategroupid + "/devices", headers=headers, body=body)
-print (response.json())
+summary = sync_group_devices(com, newcreategroupid, devices, remove=False, chunk_size=50)
+print(f"Added: {len(summary.added)} - Already members: {summary.unchanged} - Failed: {sum(len(chunk) for _, chunk, _ in summary.failed)}")
 
 # Modify a group
 newgroupname = "DL360Gen10plus-Production-Group"
@@ -259,23 +289,20 @@ body = {
     "name":  newgroupname
   }
 
-headers['Content-Type'] = "application/merge-patch+json"
-response = requests.patch(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups/' + newcreategroupid, headers=headers, body=body)
+response = com.request('PATCH', '/groups/' + newcreategroupid, json=body, headers={"Content-Type": "application/merge-patch+json"})
 print (response.json())
-headers.pop("Content-Type")
 
 #-------------------------------------------------------JOB-TEMPLATES requests samples--------------------------------------------------------------------------------
 
 
 # List all job templates
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/job-templates', headers=headers) 
-jobtemplates = response.json()
-print(jobtemplates['item'])
+jobtemplates = list(com.iter_collection('/job-templates'))
+print(jobtemplates)
 
 
 # Get a  job template
-jobtemplateid = [jt for jt in jobtemplates['items'] if jt['name'] == 'GroupFirmwareUpdate']['id']
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/job-templates/' + jobtemplateid, headers=headers) 
+jobtemplateid = com.resolver.job_template_id('GroupFirmwareUpdate')
+response = com.request('GET', '/job-templates/' + jobtemplateid) 
 jobtemplate = response.json()
 print(jobtemplate)
 
@@ -283,14 +310,13 @@ print(jobtemplate)
 #-------------------------------------------------------JOBS requests samples--------------------------------------------------------------------------------
 
 # List all jobs
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/jobs', headers=headers) 
-jobs = response.json()
-print(jobs['item'])
+jobs = list(com.iter_collection('/jobs'))
+print(jobs)
 
 
 # Get a job
-jobid = jobs['items'][0]['id']
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/jobs/' + jobid, headers=headers) 
+jobid = jobs[0]['id']
+response = com.request('GET', '/jobs/' + jobid) 
 job = response.json()
 print(job)
 
@@ -298,14 +324,12 @@ print(job)
 ## This job will update all servers in the group "DL360Gen10plus-Production-Group" with SPP 2022.03.0
 ## Warning: Any updates other than iLO FW require a server reboot!
 ## Note: To set schedule options during updates, you must create a schedule instead of a job
-jobtemplates = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/job-templates', headers=headers).json() 
-jobtemplateUri = [jt for jt in jobtemplates['items'] if jt['name'] == 'GroupFirmwareUpdate']['resourceUri']
-groups = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers).json()
-groupUri = [group for group in groups['items'] if group['name'] == 'DL360Gen10plus-Production-Group']['resourceUri']
-bundles = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles', headers=headers).json()
-firmwarebundleid = [fb for fb in bundles['items'] if fb['releaseVersion'] == '2022.03.0'][0]['id']
-DL360Gen10Plus_group = [group for group in groups['items'] if group['name'] == 'DL360Gen10plus-Production-Group']
-deviceids = [ server[id] for server in DL360Gen10Plus['devices']]
+jobtemplateUri = com.resolver.job_template_uri('GroupFirmwareUpdate')
+groupid = com.resolver.group_id('DL360Gen10plus-Production-Group')
+firmwarebundleid = com.resolver.bundle_id('2022.03.0')
+DL360Gen10Plus_group = com.get('/groups/' + groupid)
+groupUri = DL360Gen10Plus_group['resourceUri']
+deviceids = [ server['id'] for server in DL360Gen10Plus_group['devices']]
 
 body = {
     "jobTemplateUri": jobtemplateUri,
@@ -317,35 +341,31 @@ body = {
     }
   }
 
-headers["Content-Type"] = "application/json"
-response = requests.post(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/jobs', headers=headers, body=body) 
+response = com.request('POST', '/jobs', json=body) 
 jobUri = response.json()['resourceUri']
 
-## Wait for the task to start or fail
-status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
-while status['state'] != "running" and status != "error":
-   sleep(5)
-   status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
+## Track the job until it completes or fails
+## The job is read every few seconds at first, then less often while its state does not change
+watcher = JobWatcher(com, initial_interval=5, max_interval=60)
+watcher.watch(jobUri, callback=lambda event: print(f"Job state: {event.previous_state} -> {event.state}"))
+status = watcher.run()[jobUri]
+
+if jobUri in watcher.errors:
+  ## The job could not be read several times in a row (deleted job...)
+  print(f"Job {jobUri} could not be read: {watcher.errors[jobUri]}")
 
-## Wait for the task to complete
-if status['state'] == "error" :
+elif status['state'] == "error" :
   print(f"Group firmware update failed! {status['status']}")
 
 else :
-  status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
-  while status['state'] != "complete" and status != "error":
-    sleep(20)
-    status = requests.get(url=ConnectivityEndpoint + jobUri, headers=headers)['Content']
-    FWUpgradeStatus = requests.get(url=ConnectivityEndpoint + "/ui-doorway/compute/v1/servers/counts/state", headers=headers)['content']
-    print(FWUpgradeStatus)
-
   ## Display status
   print(f"State: {status['state']} - Status: {status['status']}")
 
 
 # Get the update report for the servers in the group after the update is complete.
-for deviceid in deviceids:
-   report = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers/' + deviceid, headers=headers)['content']['lastFirmwareUpdate']
+## Servers are read in parallel, 8 requests at a time, results keep the order of deviceids
+for result in get_servers(com, deviceids, concurrency=8):
+   report = result.value['lastFirmwareUpdate'] if result.error is None else result.error
    print(report)
 
 
@@ -353,27 +373,25 @@ for deviceid in deviceids:
 
 
 # List all schedules
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules', headers=headers) 
-schedules = response.json()
-print(schedules['item'])
+schedules = list(com.iter_collection('/schedules'))
+print(schedules)
 
 
 # Get a schedule
-scheduleid = schedules['items'][0]['id']
-response = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers) 
+scheduleid = schedules[0]['id']
+response = com.request('GET', '/schedules/' + scheduleid) 
 schedule = response.json()
 print(schedule)
 
 
 # Delete a schedule
-response = requests.delete(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers) 
+response = com.request('DELETE', '/schedules/' + scheduleid) 
 
 
 # Update a schedule
 newname = "Firmware update for group Production"
 description = "This upgrade is going to rock!"
-groups = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers).json()
-associatedResourceUri = [group for group in groups['items'] if group['name'] == 'Production']['resourceUri']
+associatedResourceUri = com.resolver.group_uri('Production')
 
 body = {
     "name":  newname,
@@ -382,8 +400,7 @@ body = {
     "purpose": "GROUP_FW_UPDATE"
 }
 
-headers["Content-Type"] = "application/merge-patch+json"
-response = requests.patch(url=ConnectivityEndpoint + "/compute-ops-mgmt/" + APIversion + "/schedules/" + scheduleid,headers=headers, body=body)
+response = com.request('PATCH', "/schedules/" + scheduleid, json=body, headers={"Content-Type": "application/merge-patch+json"})
 print(response.json())
 
 
@@ -396,14 +413,11 @@ description = "Upgrade to SPP 2022.03.0"
 startAt = "2022-10-01T02:00:00"
 interval = "null" # Can be P7D for 7 days intervals, P15m, P1M, P1Y
 
-jobtemplates = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/job-templates', headers=headers).json() 
-jobTemplateid = [jt for jt in jobtemplates['items'] if jt['name'] == 'GroupFirmwareUpdate']['id']
-groups = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers).json()
-groupid = [group for group in groups['items'] if group['name'] == 'DL360Gen10plus-Production-Group']['id']
-bundles = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles', headers=headers).json()
-bundleid = [fb for fb in bundles['items'] if fb['releaseVersion'] == '2022.03.0'][0]['id']
-DL360Gen10Plus_group = [group for group in groups['items'] if group['name'] == 'DL360Gen10plus-Production-Group']
-deviceids = [ server[id] for server in DL360Gen10Plus_group['devices']]
+jobTemplateid = com.resolver.job_template_id('GroupFirmwareUpdate')
+groupid = com.resolver.group_id('DL360Gen10plus-Production-Group')
+bundleid = com.resolver.bundle_id('2022.03.0')
+DL360Gen10Plus_group = com.get('/groups/' + groupid)
+deviceids = [ server['id'] for server in DL360Gen10Plus_group['devices']]
 
 
 body = {
@@ -431,18 +445,39 @@ body = {
                   }
 }
 
-headers["Content-Type"] = "application/json"
-response = requests.post(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules', headers=headers, body=body) 
+response = com.request('POST', '/schedules', json=body) 
 scheduleid = response.json()['id']
 
 # Get details about newly created schedule
-print(requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers).json())
-print(requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers).json()['operation']['body']['data'])
+print(com.get('/schedules/' + scheduleid))
+print(com.get('/schedules/' + scheduleid)['operation']['body']['data'])
 
 # Delete newly created schedule
-response = requests.delete(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers)
+response = com.request('DELETE', '/schedules/' + scheduleid)
 
 # Get the update report for the servers in the group after the update is complete.
-for deviceid in deviceids:
-   report = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/servers/' + serverId, headers=headers)['content']['lastFirmwareUpdate']
+for result in get_servers(com, deviceids, concurrency=8):
+   report = result.value['lastFirmwareUpdate'] if result.error is None else result.error
    print(report)
+
+
+#-------------------------------------------------------MULTI-REGION requests samples--------------------------------------------------------------------------------
+
+# Servers of the account in several regional COM instances, read at the same time with the same token provider
+# A slow region is given more time, and every region must answer within its deadline so that it cannot stall the others
+regions = MultiRegionClient({"us-west": "https://us-west2-api.compute.cloud.hpe.com",
+                             "eu-central": "https://eu-central1-api.compute.cloud.hpe.com",
+                             "ap-northeast": "https://ap-northeast1-api.compute.cloud.hpe.com"},
+                            APIversion, tokens, pool_size=4, deadline=300,
+                            options={"ap-northeast": {"timeout": (10, 120), "deadline": 600}})
+
+AllServers = regions.iter_collection('/servers', select=['id', 'name', 'hardware/model'])
+for region, server in AllServers:
+   print(f"{region}: {server['name']} - {server['hardware']['model']}")
+print(f"Servers per region: {AllServers.counts}")
+for region, error in AllServers.errors.items():
+   print(f"Region {region} - Error: {error}")
+
+# Same request sent to every region
+for region, result in regions.get('/ui-doorway/compute/v1/servers/counts/state').items():
+   print(region, result.value if result.error is None else result.error)
@@ -17,6 +17,7 @@ Requirements:
    - A Client ID
    - A Client Secret
    - A Connectivity Endpoint
+- The hpecom folder located next to this script (shared COM API client)
 
 
 Author: vincent.berger@hpe.com
@@ -48,12 +49,10 @@ Date:   September 2022
 #################################################################################
 
 # MODULES TO INSTALL
-import requests
-import getpass
 import warnings
 from time import sleep
-from oauthlib.oauth2 import BackendApplicationClient       
-from requests_oauthlib import OAuth2Session       
+from datetime import timedelta
+from hpecom import COMClient, TokenProvider, SchedulePlanner, daily_windows, format_plan, client_secret
 
 # Variables to perform the group firmware update 
 GroupName = "Production-Group"
@@ -61,6 +60,17 @@ Baseline = "2022.03.0"
 ## Start schedule on Sept 1, 2022 at 2am
 startAt = "2022-10-01T02:00:00"
 
+# Staggered schedules for many groups: when defined, the groups below are spread over the maintenance
+# windows instead of all starting at startAt, e.g. {"Production-Group": "2022.03.0", "Dev-Group": "2022.03.0"}
+StaggeredGroups = None
+## Maintenance windows: every day at 1am for 5 hours, during 3 days
+MaintenanceWindows = daily_windows("2022-10-01T01:00:00", hours=5, count=3)
+## Maximum number of groups / servers updated at the same time, estimated duration of a group update
+MaxGroups = 2
+MaxServers = 50
+UpdateDuration = timedelta(hours=1)
+PerServerDuration = timedelta(minutes=2)
+
 # API Client Credentials
 #ClientID = "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
 ClientID = "a2acb3fd-5dd3-403f-b26f-4044c409f809"
@@ -70,44 +80,48 @@ ConnectivityEndpoint = "https://us-west2-api.compute.cloud.hpe.com"
 APIversion = "v1beta1"
 
 
-ClientSecret = getpass.getpass(prompt='Enter your HPE GreenLake Client Secret: ')
+# The client secret is only looked up when no valid token is found in the local token cache: COM_CLIENT_SECRET environment
+# variable, ~/.config/hpecom/credentials.json, system keyring, then a prompt when run from a terminal
+ClientSecret = client_secret(ClientID)
+
+# Token provider: tokens are cached on disk per ClientID and refreshed before they expire
+tokens = TokenProvider(ClientID, ClientSecret)
 
-client = BackendApplicationClient(ClientID)       
-      
-oauth = OAuth2Session(client=client)       
-auth = requests.auth.HTTPBasicAuth(ClientID, ClientSecret)       
+# Pooled client: a single keep-alive connection to the connectivity endpoint is reused for the whole run
+com = COMClient(ConnectivityEndpoint, APIversion, tokens)
 
-      
-token = oauth.fetch_token(token_url='https://sso.common.cloud.hpe.com/as/token.oauth2', auth=auth)       
-AccessToken = token["access_token"]
+#-----------------------------------------------------------Staggered schedules for many groups-----------------------------------------------------------------------------
 
-headers = {"Authorization": "Bearer " + AccessToken}
+if StaggeredGroups:
+  planner = SchedulePlanner(com, MaintenanceWindows, max_groups=MaxGroups, max_servers=MaxServers,
+                            duration=UpdateDuration, per_server=PerServerDuration)
+  plan = planner.plan(StaggeredGroups)
+  print("\n".join(format_plan(plan)))
+  ## Only the missing schedules are created and the ones that changed are patched
+  summary = planner.apply(plan)
+  print(f"Schedules created: {len(summary.created)} - Updated: {len(summary.updated)} - Unchanged: {len(summary.unchanged)} - Failed: {len(summary.failed)}")
+  for group_name, error in summary.failed:
+    print(f"Group '{group_name}' - Error: {error}")
+  exit()
 
 #-----------------------------------------------------------Modify the server group to set the defined baseline-----------------------------------------------------------------------------
 
 
-# Retrieve firmware bundle id of the defined baseline
-bundles = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles', headers=headers).json()
-bundleid = [fb for fb in bundles['items'] if fb['releaseVersion'] == Baseline][0]['id']
-if bundleid is None:
-    warnings.warn("Error, firmware bundle '" + Baseline + "' not found!")
-    exit()
-
-# Retrieve group id of the defined group name
-groups = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers).json()
-group = [group for group in groups['items'] if group['name'] == GroupName]
-groupid = group['id']
-if groupid is None:
-    warnings.warn("Error, group name '" + GroupName + "' not found!")
+# Retrieve firmware bundle id of the defined baseline and group id of the defined group name
+## Names are resolved from local indexes of the collections, cached between runs
+try:
+    bundleid = com.resolver.bundle_id(Baseline)
+    groupid = com.resolver.group_id(GroupName)
+except LookupError as error:
+    warnings.warn("Error, " + str(error))
     exit()
 
 body = {
     "firmwareBaseline": bundleid
   }
 
-headers["Content-Type"] = "application/merge-patch+json"
-response = requests.patch(url=ConnectivityEndpoint + "/compute-ops-mgmt/" + APIversion + "/groups/" + groupid, headers=headers, body=body)
-print(f"Group '{GroupName}' modification to use SPP '{Baseline}' - Status: {response['StatusDescription']}")
+response = com.request('PATCH', '/groups/' + groupid, json=body, headers={"Content-Type": "application/merge-patch+json"})
+print(f"Group '{GroupName}' modification to use SPP '{Baseline}' - Status: {response.status_code} {response.reason}")
 
 
 #-----------------------------------------------------------Schedule a firmware update-----------------------------------------------------------------------------
@@ -116,23 +130,21 @@ print(f"Group '{GroupName}' modification to use SPP '{Baseline}' - Status: {resp
 # This schedule will update all servers in the defined group with defined SPP
 ## Warning: Any updates other than iLO FW require a server reboot!
 ## Note: To perform an immediate update, you must create a job instead of a schedule
-schedulename = "Firmware upgrade for group DL360Gen10plus-Production-Group"
-description = "Upgrade to SPP 2022.03.0"
-interval = "null" # Can be P7D for 7 days intervals, P15m, P1M, P1Y
-
-jobtemplates = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/job-templates', headers=headers).json() 
-jobTemplateid = [jt for jt in jobtemplates['items'] if jt['name'] == 'GroupFirmwareUpdate']['id']
-if jobTemplateid is None:
-    warnings.warn("Error, job template 'GroupFirmwareUpdate' not found!")
+## The name and description follow GroupName and Baseline (they used to be fixed texts, see the README)
+schedulename = "Firmware upgrade for group " + GroupName
+description = "Upgrade to SPP " + Baseline
+## None is sent as JSON null: a one-time schedule. Can be P7D for 7 days intervals, P15m, P1M, P1Y
+interval = None
+
+try:
+    jobTemplateid = com.resolver.job_template_id('GroupFirmwareUpdate')
+except LookupError as error:
+    warnings.warn("Error, " + str(error))
     exit()
 
-groups = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/groups', headers=headers).json()
-groupid = [group for group in groups['items'] if group['name'] == GroupName]['id']
-bundles = requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/firmware-bundles', headers=headers).json()
-bundleid = [fb for fb in bundles['items'] if fb['releaseVersion'] == '2022.03.0'][0]['id']
-group = [group for group in groups['items'] if group['name'] == GroupName]
-deviceids = [ server[id] for server in group['devices']]
-
+# The group and bundle resolved above are reused, only the group itself is read to get its devices
+group = com.get('/groups/' + groupid)
+deviceids = [ server['id'] for server in group['devices']]
 
 body = {
     "name":  schedulename,
@@ -159,10 +171,10 @@ body = {
                   }
 }
 
-headers["Content-Type"] = "application/json"
-response = requests.post(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules', headers=headers, body=body) 
-scheduleid = response.json()['id']
+response = com.post('/schedules', json=body) 
+scheduleid = response['id']
 
 # Get details about newly created schedule
-print(requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers).json())
-print(requests.get(url=ConnectivityEndpoint + '/compute-ops-mgmt/' + APIversion + '/schedules/' + scheduleid, headers=headers).json()['operation']['body']['data'])
+schedule = com.get('/schedules/' + scheduleid)
+print(schedule)
+print(schedule['operation']['body']['data'])
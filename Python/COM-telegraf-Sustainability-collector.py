@@ -0,0 +1,103 @@
+"""
+This script collects the sustainability data of HPE Compute Ops Management for Telegraf and writes it in InfluxDB Line Protocol format.
+
+It is the long-running counterpart of Grafana-InfluxDB-Telegraf/COM-telegraf-Sustainability-collector.ps1 for the Telegraf execd input:
+Telegraf starts the script once and writes a new line to its standard input at every interval. The token, the connections and the
+job template / filter lookups are kept between collections, so a collection does not pay a process startup and a new authentication.
+
+Today, HPE COM provides for each server, as well as for all servers the following metrics data:
+  - The carbon emissions (in kgCO2e)
+  - The energy consumption (in kWh) 
+  - The energy cost (in USD)
+
+Telegraf configuration (/etc/telegraf/HPE_COM.conf):
+
+[[inputs.execd]]
+  command = ["python3", "<path>/Python/COM-telegraf-Sustainability-collector.py"]
+  signal = "STDIN"
+  interval = "24h"
+  restart_delay = "60s"
+  data_format = "influx"
+
+The client secret is read from the COM_CLIENT_SECRET environment variable (e.g. Environment= in the telegraf systemd unit),
+~/.config/hpecom/credentials.json of the telegraf user or the system keyring, never prompted as the standard input of the
+script is used by Telegraf.
+
+Note: To use the Compute Ops Management API, you must configure the API client credentials in the HPE GreenLake Cloud Platform.
+
+To learn more about how to set up the API client credentials, see https://support.hpe.com/hpesc/public/docDisplay?docId=a00120892en_us 
+
+Information about the HPE Greenlake for Compute Ops Management API can be found at:
+https://developer.greenlake.hpe.com/docs/greenlake/services/compute-ops/public/openapi/compute-ops-latest/overview/
+
+Requirements: 
+- Compute Ops Management API Client Credentials with appropriate roles, this includes:
+   - A Client ID
+   - A Client Secret
+   - A Connectivity Endpoint
+- The hpecom folder located next to this script (shared COM API client)
+
+
+Author: lionel.jullien@hpe.com
+Date:   October 2023
+"""
+    
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+# MODULES TO INSTALL
+import sys
+from hpecom import COMClient, SustainabilityCollector, TokenProvider, client_secret
+
+# API Client Credentials
+#ClientID = "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"
+ClientID = "a2acb3fd-5dd3-403f-b26f-4044c409f809"
+
+# The connectivity endpoint can be found in the GreenLake platform / API client information
+ConnectivityEndpoint = "https://us-west2-api.compute.cloud.hpe.com"
+APIversion = "v1beta1"
+
+
+# The client secret is only read when no valid token is found in the local token cache (never prompted)
+ClientSecret = client_secret(ClientID, prompt=False)
+
+# Token provider: tokens are cached on disk per ClientID and refreshed before they expire
+tokens = TokenProvider(ClientID, ClientSecret)
+
+# Pooled client: a single keep-alive connection to the connectivity endpoint is reused for the whole run
+com = COMClient(ConnectivityEndpoint, APIversion, tokens)
+
+#-----------------------------------------------------------Collect the sustainability data-----------------------------------------------------------------------------
+
+collector = SustainabilityCollector(com)
+
+# Telegraf writes a line to the standard input at every interval, the script stops when Telegraf closes it
+for signal in sys.stdin:
+  try:
+    lines = collector.collect()
+  except Exception as error:
+    # Errors are logged by Telegraf, the next interval tries again
+    print(f"Sustainability data collection failure! {error}", file=sys.stderr, flush=True)
+    continue
+  print('\n'.join(lines), flush=True)
@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark of the command line (python -m hpecom) against the local mock COM API.
+
+Every command is started in a new interpreter, the way cron, Telegraf or CI run it, with the
+credentials in the environment and a valid token in the token cache. The median wall time of
+each command is compared with its budget and the heavy modules it loaded are listed
+(python -X importtime); the exit code is 1 when a budget is exceeded.
+
+Usage:
+   python benchmarks/bench_cli.py --repeat 10
+   python benchmarks/bench_cli.py --help-budget 0.1 --query-budget 0.4 --json
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from mock_com import MockCOM  # noqa: E402
+
+# Modules that a quick lookup should not need to load
+HEAVY_MODULES = ['requests', 'oauthlib', 'requests_oauthlib', 'sqlite3', 'asyncio', 'numpy', 'pyarrow']
+
+CLIENT_ID = 'bench-cli'
+
+
+def commands(args):
+    """(name, command line arguments, budget in seconds)"""
+    return [
+        ('help', ['--help'], args.help_budget),
+        ('servers', ['servers', '--limit', '10'], args.query_budget),
+        ('groups', ['groups', '--output', 'json'], args.query_budget),
+        ('bundles', ['bundles'], args.query_budget),
+    ]
+
+
+def environment(cache, endpoint):
+    """Environment of a non-interactive run with a valid cached token."""
+    os.makedirs(os.path.join(cache, 'tokens'), mode=0o700)
+    with open(os.path.join(cache, 'tokens', CLIENT_ID + '.json'), 'w') as f:
+        json.dump({'client_id': CLIENT_ID, 'token_url': 'https://sso.common.cloud.hpe.com/as/token.oauth2',
+                   'access_token': 'bench', 'expires_at': time.time() + 7200}, f)
+    env = dict(os.environ, HPECOM_CACHE_DIR=cache, COM_CLIENT_ID=CLIENT_ID, COM_ENDPOINT=endpoint,
+               PYTHONPATH=os.path.dirname(HERE))
+    env.pop('COM_CLIENT_SECRET', None)
+    return env
+
+
+def run(arguments, env, importtime=False):
+    """Run python -m hpecom once, return (wall time, exit code, stderr)."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-m', 'hpecom'] + arguments
+    start = time.perf_counter()
+    process = subprocess.run(command, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, process.returncode, process.stderr
+
+
+def loaded_modules(importtime_output):
+    """Heavy top-level modules listed by python -X importtime."""
+    loaded = set()
+    for line in importtime_output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            loaded.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return [module for module in HEAVY_MODULES if module in loaded]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', type=int, default=200, help='number of servers of the mock fleet')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each command, the median is reported')
+    parser.add_argument('--help-budget', type=float, default=0.15, help='budget of --help, in seconds')
+    parser.add_argument('--query-budget', type=float, default=0.5, help='budget of a simple query, in seconds')
+    parser.add_argument('--json', action='store_true', help='print the measurements as JSON')
+    args = parser.parse_args(argv)
+
+    cache = tempfile.mkdtemp(prefix='hpecom-bench-cli-')
+    results = []
+    try:
+        with MockCOM(servers=args.servers) as mock:
+            env = environment(os.path.join(cache, 'cache'), mock.url)
+            for name, arguments, budget in commands(args):
+                # A first run compiles the modules, as an installed package would be
+                _, code, errors = run(arguments, env, importtime=True)
+                runs = [run(arguments, env)[0] for _ in range(args.repeat)]
+                results.append({'command': name, 'exit_code': code, 'median': statistics.median(runs),
+                                'runs': runs, 'budget': budget, 'heavy_modules': loaded_modules(errors)})
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+    over = [result for result in results if result['exit_code'] != 0 or result['median'] > result['budget']]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Command':<12}{'Median (s)':>12}{'Budget (s)':>12}{'Exit':>6}  Heavy modules loaded")
+        for result in results:
+            print(f"{result['command']:<12}{result['median']:>12.3f}{result['budget']:>12.3f}{result['exit_code']:>6}  "
+                  f"{', '.join(result['heavy_modules']) or '-'}")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Benchmark of the script workflows against the local mock COM API (mock_com.py).
+
+Each workflow is run with a fresh hpecom cache folder, a fresh token and a fresh client, the
+way a script run starts, and reports:
+- the wall time,
+- the number of requests received by the mock (and the injected errors),
+- the bytes received and sent by the mock.
+
+Workflows:
+   group-firmware-update   COM-Group-firmware-update.py: lookups, job, JobWatcher, per-device report
+   firmware-progress       COM-Group-firmware-update.py with DeviceProgress: job followed per device
+   schedule-creation       COM-Schedule-Group-firmware-update.py: baseline PATCH, lookups, schedule
+   sample-queries          the read-only queries of COM-Native-API-request-samples.py
+   multi-group-rollout     COM-Multi-Group-firmware-update.py: rollout of every group, 4 jobs at a time
+   alert-harvest           alerts of the whole fleet, then a second harvest with nothing new
+
+Usage:
+   python benchmarks/bench_workflows.py --servers 1000 --latency 0.02 --error-rate 0.01 --repeat 3
+   python benchmarks/bench_workflows.py --workflow sample-queries --json
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from hpecom import AlertHarvester, COMClient, Field, FirmwareProgress, FirmwareRollout, JobWatcher, RequestScheduler, TokenProvider, get_servers  # noqa: E402
+from mock_com import MockCOM  # noqa: E402
+
+# The mock SSO is served over http
+os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+
+
+def group_firmware_update(com):
+    jobtemplateUri = com.resolver.job_template_uri('GroupFirmwareUpdate')
+    groupid = com.resolver.group_id('Production-Group')
+    bundleid = com.resolver.bundle_id('2022.03.0')
+    group = com.get('/groups/' + groupid)
+    deviceids = [server['id'] for server in group['devices']]
+    body = {"jobTemplateUri": jobtemplateUri, "resourceUri": group['resourceUri'],
+            "data": {"bundle_id": bundleid, "devices": deviceids}}
+    jobUri = com.post('/jobs', json=body)['resourceUri']
+    watcher = JobWatcher(com, initial_interval=0.2, max_interval=2)
+    watcher.watch(jobUri)
+    watcher.run()
+    return sum(1 for result in get_servers(com, deviceids) if result.error is None)
+
+
+def firmware_progress(com):
+    jobtemplateUri = com.resolver.job_template_uri('GroupFirmwareUpdate')
+    groupid = com.resolver.group_id('Production-Group')
+    bundleid = com.resolver.bundle_id('2022.03.0')
+    group = com.get('/groups/' + groupid)
+    deviceids = [server['id'] for server in group['devices']]
+    body = {"jobTemplateUri": jobtemplateUri, "resourceUri": group['resourceUri'],
+            "data": {"bundle_id": bundleid, "devices": deviceids}}
+    jobUri = com.post('/jobs', json=body)['resourceUri']
+    progress = FirmwareProgress(com, deviceids, job_uri=jobUri)
+    changes = sum(1 for _ in progress.follow(interval=0.2))
+    return changes
+
+
+def alert_harvest(com):
+    with AlertHarvester(com, path=':memory:', concurrency=16) as harvester:
+        first = harvester.harvest()
+        # Second run: nothing changed, only the server listing is read
+        harvester.harvest()
+    return len(first.alerts)
+
+
+def schedule_creation(com):
+    bundleid = com.resolver.bundle_id('2022.03.0')
+    groupid = com.resolver.group_id('Production-Group')
+    com.patch('/groups/' + groupid, json={"firmwareBaseline": bundleid})
+    jobTemplateid = com.resolver.job_template_id('GroupFirmwareUpdate')
+    group = com.get('/groups/' + groupid)
+    deviceids = [server['id'] for server in group['devices']]
+    body = {"name": "Firmware upgrade for group Production-Group", "purpose": "GROUP_FW_UPDATE",
+            "associatedResourceUri": "/api/compute/v1/groups/" + groupid,
+            "schedule": {"interval": None, "startAt": "2022-10-01T02:00:00"},
+            "operation": {"type": "REST", "method": "POST", "uri": "/api/compute/v1/jobs",
+                          "body": {"resourceUri": "/api/compute/v1/groups/" + groupid,
+                                   "jobTemplateUri": "/api/compute/v1/job-templates/" + jobTemplateid,
+                                   "data": {"devices": deviceids, "parallel": "true", "stopOnFailure": "false"}}}}
+    scheduleid = com.post('/schedules', json=body)['id']
+    return com.get('/schedules/' + scheduleid)['id']
+
+
+def sample_queries(com):
+    servers = list(com.iter_collection('/servers', page_size=100))
+    serverId = servers[0]['id']
+    com.get('/servers/' + serverId)
+    com.get('/servers/' + serverId + '/alerts')
+    dl360 = list(com.iter_collection('/servers', filter=Field('hardware/model').eq('ProLiant DL360 Gen10 Plus'),
+                                     select=['id', 'name', 'hardware/model', 'hardware/bmc/ip']))
+    list(com.iter_collection('/activities', filter=Field('source/type').eq('Firmware')))
+    list(com.iter_collection('/firmware-bundles'))
+    com.get('/firmware-bundles/' + com.resolver.bundle_id('2022.03.0'))
+    list(com.iter_collection('/groups'))
+    list(com.iter_collection('/job-templates'))
+    return len(dl360)
+
+
+def multi_group_rollout(com):
+    targets = {group['name']: '2022.03.0' for group in com.iter_collection('/groups')}
+    canary = next(iter(targets))
+    rollout = FirmwareRollout(com, targets, canary=canary, concurrency=4, max_failures=None,
+                              initial_interval=0.2, max_interval=2)
+    return sum(1 for result in rollout.run() if result.state == 'complete')
+
+
+WORKFLOWS = {
+    'group-firmware-update': group_firmware_update,
+    'firmware-progress': firmware_progress,
+    'schedule-creation': schedule_creation,
+    'sample-queries': sample_queries,
+    'multi-group-rollout': multi_group_rollout,
+    'alert-harvest': alert_harvest,
+}
+
+
+def run_workflow(mock, workflow, pool_size=10, rate=None):
+    """Run a workflow once from a cold start and return its measurements."""
+    cache = tempfile.mkdtemp(prefix='hpecom-bench-')
+    previous = os.environ.get('HPECOM_CACHE_DIR')
+    os.environ['HPECOM_CACHE_DIR'] = cache
+    try:
+        mock.reset_stats()
+        started = time.perf_counter()
+        tokens = TokenProvider('bench-client', 'secret', token_url=mock.url + '/as/token.oauth2',
+                               background_refresh=False)
+        scheduler = RequestScheduler(rate=rate, max_concurrency=pool_size) if rate is not None else None
+        with COMClient(mock.url, 'v1beta1', tokens, pool_size=pool_size, scheduler=scheduler) as com:
+            result = WORKFLOWS[workflow](com)
+        wall = time.perf_counter() - started
+        return {'workflow': workflow, 'wall_time': wall, 'requests': mock.stats['requests'],
+                'errors_injected': mock.stats['errors_injected'], 'bytes_received': mock.stats['bytes_received'],
+                'bytes_sent': mock.stats['bytes_sent'], 'result': result, 'endpoints': dict(mock.endpoints)}
+    finally:
+        if previous is None:
+            os.environ.pop('HPECOM_CACHE_DIR', None)
+        else:
+            os.environ['HPECOM_CACHE_DIR'] = previous
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workflow', choices=sorted(WORKFLOWS), action='append',
+                        help='workflow to run (default: all), can be repeated')
+    parser.add_argument('--servers', type=int, default=200, help='number of servers of the mock fleet')
+    parser.add_argument('--groups', type=int, default=4, help='number of groups of the mock fleet')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds added to every answer')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of a 503 / 429 answer')
+    parser.add_argument('--job-duration', type=float, default=2.0, help='seconds until a job completes')
+    parser.add_argument('--pool-size', type=int, default=10, help='client connection pool size')
+    parser.add_argument('--rate', type=float, help='requests per second per endpoint (default: client default)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs of each workflow, the median is reported')
+    parser.add_argument('--json', action='store_true', help='print the measurements as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    with MockCOM(servers=args.servers, groups=args.groups, latency=args.latency, error_rate=args.error_rate,
+                 job_duration=args.job_duration) as mock:
+        for workflow in args.workflow or list(WORKFLOWS):
+            runs = [run_workflow(mock, workflow, args.pool_size, args.rate) for _ in range(args.repeat)]
+            median = sorted(runs, key=lambda run: run['wall_time'])[len(runs) // 2]
+            median['wall_time_runs'] = [run['wall_time'] for run in runs]
+            median['wall_time_stdev'] = statistics.pstdev(median['wall_time_runs'])
+            results.append(median)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'Workflow':<24}{'Wall time (s)':>15}{'Requests':>10}{'Errors':>8}{'Sent (KiB)':>12}{'Received (KiB)':>16}")
+    for result in results:
+        # bytes_received / bytes_sent are counted by the mock server: sent by the client / received by the client
+        print(f"{result['workflow']:<24}{result['wall_time']:>15.3f}{result['requests']:>10}{result['errors_injected']:>8}"
+              f"{result['bytes_received'] / 1024:>12.1f}{result['bytes_sent'] / 1024:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,479 @@
+"""
+Local stand-in for the HPE Compute Ops Management API, used by the benchmarks.
+
+MockCOM serves, on 127.0.0.1, the endpoints used by the scripts of this folder:
+- POST /as/token.oauth2 (GreenLake SSO client credentials),
+- /compute-ops-mgmt/<version>/ servers, groups, firmware-bundles, job-templates, filters, jobs,
+  schedules, activities and reports, with offset / limit pagination, filter= (eq, ne, gt, ge,
+  lt, le, contains, and, or) and select=,
+- POST /jobs: the job is 'pending', then 'running' after job_duration / 4 seconds and 'complete'
+  after job_duration seconds (an 'error' job when job_error_rate is hit); every device of a firmware
+  update job is updated during a random part of the job (lastFirmwareUpdate in progress, power OFF
+  during the reboot, then successful, or failed for one device of a failed job),
+- GET /servers/{id}/alerts (one server in eight has alerts, add_alert() raises a new one and
+  changes the updatedAt of the server),
+- POST / DELETE /groups/{id}/devices[/unassign], PATCH /groups/{id}, POST /schedules,
+- GET /ui-doorway/compute/v1/servers/counts/state.
+
+The fleet size, the latency added to every request and the rate of injected 503 / 429 answers
+are tunable. Every request is counted (total, per endpoint, bytes received and sent).
+
+Example:
+   with MockCOM(servers=500, latency=0.02, error_rate=0.01) as mock:
+      com = COMClient(mock.url, "v1beta1", "token")
+      print(len(list(com.iter_collection('/servers'))), mock.stats)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MODELS = ('ProLiant DL360 Gen10 Plus', 'ProLiant DL380 Gen10 Plus', 'ProLiant DL360 Gen10', 'ProLiant DL325 Gen10 Plus')
+
+_COMPARISON = re.compile(r"^\s*([\w/]+)\s+(eq|ne|gt|ge|lt|le)\s+(.+?)\s*$")
+_CONTAINS = re.compile(r"^\s*contains\(\s*([\w/]+)\s*,\s*(.+?)\s*\)\s*$")
+
+
+def _id(kind, number):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, kind + '/' + str(number)))
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+def _literal(text):
+    text = text.strip()
+    if text.startswith("'") and text.endswith("'"):
+        return text[1:-1].replace("''", "'")
+    if text in ('true', 'false'):
+        return text == 'true'
+    if text == 'null':
+        return None
+    return float(text) if '.' in text else int(text)
+
+
+def _value(item, path):
+    for part in path.split('/'):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(part)
+    return item
+
+
+def _term(item, term):
+    term = term.strip()
+    while term.startswith('(') and term.endswith(')'):
+        term = term[1:-1].strip()
+    if re.search(r'\s+or\s+', term):
+        return any(_term(item, part) for part in re.split(r'\s+or\s+', term))
+    contains = _CONTAINS.match(term)
+    if contains:
+        return str(_literal(contains.group(2))) in str(_value(item, contains.group(1)) or '')
+    comparison = _COMPARISON.match(term)
+    if not comparison:
+        raise ValueError('unsupported filter: ' + term)
+    path, operator, literal = comparison.groups()
+    left, right = _value(item, path), _literal(literal)
+    if operator == 'eq':
+        return left == right
+    if operator == 'ne':
+        return left != right
+    if left is None:
+        return False
+    return {'gt': left > right, 'ge': left >= right, 'lt': left < right, 'le': left <= right}[operator]
+
+
+def _match(item, expression):
+    """Evaluate the subset of the filter syntax produced by hpecom.query: terms joined by 'and', each
+    term a comparison or a parenthesized group of comparisons joined by 'or'."""
+    return all(_term(item, term) for term in re.split(r'\s+and\s+', expression.strip()))
+
+
+def _select(item, paths):
+    selected = {}
+    for path in paths:
+        value = _value(item, path)
+        if value is None:
+            continue
+        target = selected
+        parts = path.split('/')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return selected
+
+
+class MockCOM:
+    """In-process HTTP server emulating the COM API.
+
+    servers:        number of servers of the fleet
+    groups:         number of groups, the servers are spread over them
+    activities:     number of activities
+    latency:        seconds added to every answer
+    error_rate:     probability of answering 503 (GET) or 429 with Retry-After: 0 (other methods)
+    job_duration:   seconds between the creation and the completion of a job
+    job_error_rate: probability that a job ends in the 'error' state
+    seed:           random seed of the fleet and of the injected errors
+    """
+
+    def __init__(self, servers=100, groups=4, activities=500, latency=0.0, error_rate=0.0, job_duration=2.0,
+                 job_error_rate=0.0, seed=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.job_duration = job_duration
+        self.job_error_rate = job_error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        self.endpoints = Counter()
+        self.collections = {}
+        # Alerts of the servers: server id -> list of alerts
+        self.alerts = {}
+        self._build(servers, groups, activities)
+        self._server = None
+        self._thread = None
+        self.url = None
+
+    def _build(self, server_count, group_count, activity_count):
+        c = self.collections
+        c['firmware-bundles'] = {}
+        for number, version in enumerate(('2022.03.0', '2022.09.0', '2023.03.0')):
+            bundle_id = _id('bundle', number)
+            c['firmware-bundles'][bundle_id] = {
+                'id': bundle_id, 'name': 'Service Pack for ProLiant', 'releaseVersion': version,
+                'resourceUri': '/compute-ops-mgmt/v1beta2/firmware-bundles/' + bundle_id,
+                'components': [{'name': 'iLO 5', 'version': '2.%d' % (60 + 5 * number)},
+                               {'name': 'System ROM', 'version': 'U46 v2.%d' % (60 + 4 * number)}],
+                'updatedAt': _now()}
+        c['job-templates'] = {}
+        for name in ('GroupFirmwareUpdate', 'DataRoundupReportOrchestrator', 'ServerFirmwareUpdate'):
+            template_id = _id('job-template', name)
+            c['job-templates'][template_id] = {'id': template_id, 'name': name,
+                                               'resourceUri': '/api/compute/v1/job-templates/' + template_id}
+        filter_id = _id('filter', 'all')
+        c['filters'] = {filter_id: {'id': filter_id, 'name': 'All Servers',
+                                    'resourceUri': '/compute-ops-mgmt/v1beta1/filters/' + filter_id}}
+        c['servers'] = {}
+        for number in range(server_count):
+            server_id = 'P%05d-B21+MXQ%07d' % (number, number)
+            c['servers'][server_id] = {
+                'id': server_id, 'name': 'HPE-SRV%04d' % number, 'type': 'compute-ops-mgmt/server',
+                'resourceUri': '/compute-ops-mgmt/v1beta2/servers/' + server_id,
+                'serverGeneration': 'GEN_10', 'processorVendor': 'Intel(R) Xeon(R) Gold 6230',
+                'hardware': {'serialNumber': 'MXQ%07d' % number, 'model': self._random.choice(MODELS),
+                             'powerState': self._random.choice(('ON', 'ON', 'ON', 'OFF')),
+                             'health': {'summary': self._random.choice(('OK', 'OK', 'OK', 'WARNING', 'CRITICAL'))},
+                             'bmc': {'ip': '10.0.%d.%d' % (number // 250, number % 250 + 1), 'version': '2.60'}},
+                'state': {'managed': True, 'connected': self._random.random() > 0.05,
+                          'subscriptionState': 'SUBSCRIBED'},
+                'host': {'hostname': 'host%04d' % number, 'osName': 'VMware ESXi'},
+                'firmwareInventory': [{'name': 'iLO 5', 'version': self._random.choice(('2.55', '2.60', '2.72'))},
+                                      {'name': 'System ROM', 'version': 'U46 v2.60 (02/22/2022)'}],
+                'lastFirmwareUpdate': None, 'tags': {}, 'updatedAt': _now()}
+        for number, server_id in enumerate(list(c['servers'])[::8]):
+            for index in range(self._random.randint(1, 3)):
+                created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - 86400 + number * 60 + index))
+                self.alerts.setdefault(server_id, []).append(self._alert(created, _id('alert', f'{number}-{index}')))
+        c['groups'] = {}
+        server_ids = list(c['servers'])
+        names = ['Production-Group'] + ['Group-%d' % number for number in range(1, group_count)]
+        for number, name in enumerate(names):
+            group_id = _id('group', number)
+            members = server_ids[number::group_count]
+            c['groups'][group_id] = {
+                'id': group_id, 'name': name, 'resourceUri': '/api/compute/v1/groups/' + group_id,
+                'devices': [{'id': member, 'type': 'compute-ops-mgmt/server'} for member in members],
+                'firmwareBaseline': None, 'updatedAt': _now()}
+        if names:
+            dl360 = [s for s in server_ids if c['servers'][s]['hardware']['model'] == MODELS[0]]
+            group_id = _id('group', 'dl360')
+            c['groups'][group_id] = {
+                'id': group_id, 'name': 'DL360Gen10plus-Production-Group', 'resourceUri': '/api/compute/v1/groups/' + group_id,
+                'devices': [{'id': member} for member in dl360[:len(dl360) // 2]], 'updatedAt': _now()}
+        c['activities'] = {}
+        for number in range(activity_count):
+            activity_id = _id('activity', number)
+            created = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() - (activity_count - number) * 60))
+            c['activities'][activity_id] = {
+                'id': activity_id, 'createdAt': created, 'key': self._random.choice(('SERVER_ASSIGNED', 'FW_UPDATE', 'POWER_ON')),
+                'source': {'type': self._random.choice(('Server', 'Firmware', 'Group'))}, 'title': 'Activity %d' % number}
+        c['jobs'] = {}
+        c['schedules'] = {}
+        c['reports'] = {}
+
+    def _alert(self, created, alert_id):
+        severity = self._random.choice(('WARNING', 'CRITICAL', 'OK'))
+        return {'id': alert_id, 'createdAt': created, 'severity': severity, 'type': 'compute-ops-mgmt/alert',
+                'description': 'Mock alert %s' % alert_id[:8], 'resolution': 'None'}
+
+    def add_alert(self, server_id):
+        """Raise a new alert on a server, its updatedAt changes. Return the alert."""
+        now = time.time()
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(now)) + '.%03dZ' % (now * 1000 % 1000)
+        alert = self._alert(stamp, str(uuid.uuid4()))
+        with self._lock:
+            self.alerts.setdefault(server_id, []).append(alert)
+            self.collections['servers'][server_id]['updatedAt'] = stamp
+        return alert
+
+    # ------------------------------------------------------------------ server
+
+    def start(self):
+        handler = self._handler()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self.url = 'http://127.0.0.1:%d' % self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-com', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+            self.endpoints.clear()
+
+    # ---------------------------------------------------------------- handlers
+
+    def _job_state(self, job):
+        elapsed = time.time() - job['_created']
+        if elapsed >= self.job_duration:
+            return 'error' if job['_fails'] else 'complete'
+        if elapsed >= self.job_duration / 4:
+            return 'running'
+        return 'pending'
+
+    def _public(self, collection, item):
+        if collection == 'jobs':
+            item = dict(item, state=self._job_state(item))
+            item['status'] = {'pending': 'Pending', 'running': 'Running', 'complete': 'Job completed',
+                              'error': 'Job failed'}[item['state']]
+            if item['state'] == 'complete' and item.get('_report'):
+                item['results'] = {'location': '/compute-ops-mgmt/v1beta2/reports/' + item['_report']}
+            return {key: value for key, value in item.items() if not key.startswith('_')}
+        if collection == 'servers' and '_fw_update' in item:
+            return self._updating_server(item)
+        return item
+
+    def _updating_server(self, server):
+        """Server during the firmware update of a job: in progress, rebooted (OFF) in the middle of
+        its update, then successful or failed."""
+        update = server['_fw_update']
+        now = time.time()
+        server = {key: value for key, value in server.items() if not key.startswith('_')}
+        if now < update['start']:
+            return server
+        started = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(update['start']))
+        if now < update['end']:
+            server['lastFirmwareUpdate'] = {'status': 'Firmware update in progress', 'attemptedAt': started}
+            if now > (update['start'] + update['end']) / 2:
+                server['hardware'] = dict(server['hardware'], powerState='OFF')
+            return server
+        server['lastFirmwareUpdate'] = {
+            'status': 'Firmware update failed' if update['fails'] else 'Firmware update successful',
+            'attemptedAt': started, 'updatedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(update['end']))}
+        server['updatedAt'] = server['lastFirmwareUpdate']['updatedAt']
+        return server
+
+    def _list(self, collection, query):
+        return self._page([self._public(collection, item) for item in self.collections[collection].values()], query)
+
+    def _page(self, items, query):
+        if 'filter' in query:
+            items = [item for item in items if _match(item, query['filter'])]
+        total = len(items)
+        offset = int(query.get('offset', 0))
+        limit = min(int(query.get('limit', 100)), 1000)
+        page = items[offset:offset + limit]
+        if 'select' in query:
+            page = [_select(item, query['select'].split(',')) for item in page]
+        return 200, {'count': len(page), 'offset': offset, 'total': total, 'items': page}
+
+    def _create_job(self, body):
+        job_id = str(uuid.uuid4())
+        template = body.get('jobTemplateUri', '')
+        job = {'id': job_id, 'resourceUri': '/compute-ops-mgmt/v1beta2/jobs/' + job_id, 'jobTemplateUri': template,
+               'associatedResourceUri': body.get('resourceUri'), 'data': body.get('data'), 'createdAt': _now(),
+               '_created': time.time(), '_fails': self._random.random() < self.job_error_rate}
+        if body.get('data', {}).get('reportType'):
+            report_id = str(uuid.uuid4())
+            job['_report'] = report_id
+            self.collections['reports'][report_id] = {
+                'id': report_id, 'name': 'Sustainability report', 'createdAt': _now(), 'state': 'Complete',
+                'data': {'series': [{'name': 'Energy Consumption', 'subject': {'type': 'TOTAL'},
+                                     'buckets': [{'value': 330.62}], 'summary': {'sum': 1973.1}}]}}
+        # Every device is updated during a part of the job, one of them fails when the job fails
+        devices = [d for d in (body.get('data') or {}).get('devices') or [] if d in self.collections['servers']]
+        failing = self._random.choice(devices) if devices and job['_fails'] else None
+        for device in devices:
+            start = job['_created'] + self._random.uniform(0.1, 0.5) * self.job_duration
+            end = start + self._random.uniform(0.3, 1.0) * (job['_created'] + self.job_duration - start)
+            self.collections['servers'][device]['_fw_update'] = {'start': start, 'end': end, 'fails': device == failing}
+        self.collections['jobs'][job_id] = job
+        return 200, self._public('jobs', job)
+
+    def dispatch(self, method, path, query, body):
+        """Return (status, JSON document) of a request."""
+        if path == '/as/token.oauth2':
+            return 200, {'access_token': 'mock-' + uuid.uuid4().hex, 'token_type': 'Bearer', 'expires_in': 7200}
+        if path == '/ui-doorway/compute/v1/servers/counts/state':
+            return 200, dict(Counter(s['hardware']['powerState'] for s in self.collections['servers'].values()))
+
+        parts = [part for part in path.split('/') if part]
+        if parts[:1] == ['compute-ops-mgmt'] and len(parts) >= 3:
+            parts = parts[2:]
+        elif parts[:3] == ['api', 'compute', 'v1']:
+            parts = parts[3:]
+        else:
+            return 404, {'message': 'Not found: ' + path}
+        collection, rest = parts[0], parts[1:]
+        if collection not in self.collections:
+            return 404, {'message': 'Unknown collection: ' + collection}
+        items = self.collections[collection]
+
+        if not rest:
+            if method == 'GET':
+                return self._list(collection, query)
+            if method == 'POST' and collection == 'jobs':
+                return self._create_job(body)
+            if method == 'POST' and collection in ('schedules', 'groups'):
+                item_id = str(uuid.uuid4())
+                items[item_id] = dict(body, id=item_id, resourceUri='/api/compute/v1/' + collection + '/' + item_id,
+                                      createdAt=_now(), updatedAt=_now())
+                if collection == 'groups':
+                    items[item_id].setdefault('devices', [])
+                return 200, items[item_id]
+            return 405, {'message': 'Method not allowed'}
+
+        item = items.get(rest[0])
+        if item is None:
+            return 404, {'message': collection + ' ' + rest[0] + ' not found'}
+        if len(rest) == 1:
+            if method == 'GET':
+                return 200, self._public(collection, item)
+            if method == 'PATCH':
+                item.update(body or {})
+                item['updatedAt'] = _now()
+                return 200, item
+            if method == 'DELETE':
+                del items[rest[0]]
+                return 204, None
+            return 405, {'message': 'Method not allowed'}
+        if collection == 'servers' and rest[1] == 'alerts':
+            return self._page(list(self.alerts.get(rest[0], [])), query)
+        if collection == 'reports' and rest[1] == 'data':
+            return 200, {'data': item['data']}
+        if collection == 'groups' and rest[1] == 'devices' and method == 'POST':
+            members = {device['id'] for device in item['devices']}
+            unassign = rest[2:] == ['unassign']
+            for device in body.get('devices') or []:
+                device = device['serverId'] if isinstance(device, dict) else device
+                if unassign and device in members:
+                    members.discard(device)
+                elif not unassign:
+                    members.add(device)
+            item['devices'] = [{'id': device} for device in sorted(members)]
+            return 200, {'devices': item['devices']}
+        return 404, {'message': 'Not found: ' + path}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _answer(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if mock.latency:
+                    time.sleep(mock.latency)
+                with mock._lock:
+                    mock.stats['requests'] += 1
+                    mock.stats['bytes_received'] += len(raw) + len(self.path)
+                    collection = [part for part in url.path.split('/') if part][2:3] or ['']
+                    mock.endpoints[method + ' ' + collection[0]] += 1
+                    inject = url.path != '/as/token.oauth2' and mock._random.random() < mock.error_rate
+                    if inject:
+                        mock.stats['errors_injected'] += 1
+                        status, document = (503, {'message': 'Service unavailable'}) if method == 'GET' else \
+                            (429, {'message': 'Too many requests'})
+                    else:
+                        if raw and self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                            body = {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+                        else:
+                            body = json.loads(raw) if raw else None
+                        try:
+                            status, document = mock.dispatch(method, url.path, query, body)
+                        except ValueError as error:
+                            status, document = 400, {'message': str(error)}
+                payload = b'' if document is None else json.dumps(document).encode()
+                with mock._lock:
+                    mock.stats['bytes_sent'] += len(payload)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if status == 429:
+                    self.send_header('Retry-After', '0')
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._answer('GET')
+
+            def do_POST(self):
+                self._answer('POST')
+
+            def do_PATCH(self):
+                self._answer('PATCH')
+
+            def do_DELETE(self):
+                self._answer('DELETE')
+
+        return Handler
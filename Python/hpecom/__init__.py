@@ -0,0 +1,98 @@
+"""
+Helpers shared by the HPE Compute Ops Management Python scripts.
+
+The scripts in this folder import this package from their own directory, e.g.:
+   from hpecom import COMClient, TokenProvider
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import importlib
+
+# Public names and their module. The modules are imported on first access, so that a script or the
+# command line (python -m hpecom) only loads what it uses: requests, sqlite3, asyncio...
+# 'from hpecom import COMClient' works as before.
+_EXPORTS = {
+    'ActivityTailer': 'activities',
+    'write_ndjson': 'activities',
+    'AlertHarvester': 'alerts',
+    'TokenProvider': 'auth',
+    'fetch_many': 'bulk',
+    'get_server_alerts': 'bulk',
+    'get_servers': 'bulk',
+    'COMClient': 'client',
+    'check_compliance': 'compliance',
+    'CredentialsError': 'credentials',
+    'client_secret': 'credentials',
+    'load_settings': 'credentials',
+    'export_servers': 'export',
+    'FleetExporter': 'exporter',
+    'Instrumentation': 'instrument',
+    'OpenTelemetryHook': 'instrument',
+    'JobEvent': 'jobs',
+    'JobWatcher': 'jobs',
+    'sync_group_devices': 'membership',
+    'InventoryMirror': 'mirror',
+    'FirmwareBundle': 'models',
+    'Group': 'models',
+    'Job': 'models',
+    'JobTemplate': 'models',
+    'Schedule': 'models',
+    'Server': 'models',
+    'iter_models': 'models',
+    'iter_collection': 'pagination',
+    'SchedulePlanner': 'planner',
+    'daily_windows': 'planner',
+    'format_plan': 'planner',
+    'Field': 'query',
+    'Filter': 'query',
+    'contains': 'query',
+    'FirmwareProgress': 'progress',
+    'MultiRegionClient': 'regions',
+    'RegionTimeout': 'regions',
+    'DuplicateResourceName': 'resolver',
+    'Resolver': 'resolver',
+    'ResourceNotFound': 'resolver',
+    'FirmwareRollout': 'rollout',
+    'GroupResult': 'rollout',
+    'format_summary': 'rollout',
+    'RequestScheduler': 'scheduler',
+    'SustainabilityCollector': 'sustainability',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
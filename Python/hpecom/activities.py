@@ -0,0 +1,135 @@
+"""
+Incremental tail of the /activities stream with a persisted cursor.
+
+An ActivityTailer only requests the activities created at or after its cursor:
+- the cursor is the largest createdAt read so far plus the ids of the activities created at that
+  instant; it is saved (0600 file under the hpecom cache folder) after each batch is handed out,
+  so a restarted tailer continues where the previous one stopped,
+- the createdAt values are compared as timestamps, not as strings, as the API mixes timestamps
+  with and without milliseconds,
+- activities already handed out (same createdAt as the cursor, or seen twice when new entries
+  shift the pages during a read) are dropped,
+- new activities are returned oldest first; write_ndjson() writes them as newline-delimited JSON.
+
+Example:
+   tailer = ActivityTailer(com, 'siem', filter=Field('source/type').eq('Server'))
+   for activity in tailer.follow(interval=30):
+      write_ndjson([activity], sys.stdout)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import datetime
+import json
+import os
+import threading
+import time
+
+from .cache import cache_dir, client_key, read_json, write_json_private
+from .export import parse_timestamp
+from .query import Field, all_of
+
+DEFAULT_INTERVAL = 30
+
+_OLDEST = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+def created_at(activity):
+    """UTC datetime of the createdAt of an activity, for ordering (timestamps with and without milliseconds)."""
+    return parse_timestamp(activity.get('createdAt')) or _OLDEST
+
+
+def write_ndjson(activities, stream):
+    """Write activities to a text stream, one JSON document per line, and flush it."""
+    for activity in activities:
+        stream.write(json.dumps(activity, separators=(',', ':')) + '\n')
+    stream.flush()
+
+
+class ActivityTailer:
+    """Follow /activities from a persisted cursor.
+
+    com:         COMClient
+    name:        name of the cursor, one per consumer (e.g. 'siem')
+    filter:      optional filter of the activities, a query.Filter or a string
+    start:       createdAt to start from when there is no saved cursor (default: now, '' for the whole history)
+    cursor_file: cursor location (default: <hpecom cache>/cursors/<endpoint and client key>-<name>.json)
+    page_size:   page size of the reads
+    """
+
+    def __init__(self, com, name='activities', filter=None, start=None, cursor_file=None, page_size=100):
+        self.com = com
+        self.filter = filter
+        self.page_size = page_size
+        self.cursor_file = cursor_file or os.path.join(cache_dir('cursors'), client_key(com) + '-' + name + '.json')
+        self._stop = threading.Event()
+        cursor = read_json(self.cursor_file) or {}
+        self.created_at = cursor.get('createdAt')
+        self.seen = set(cursor.get('seen') or [])
+        if self.created_at is None:
+            self.created_at = start if start is not None else time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+    def save(self):
+        write_json_private(self.cursor_file, {'createdAt': self.created_at, 'seen': sorted(self.seen)})
+
+    def poll(self, save=True):
+        """Return the activities created since the cursor, oldest first, and move the cursor after them."""
+        since = Field('createdAt').ge(self.created_at) if self.created_at else None
+        cursor = parse_timestamp(self.created_at) or _OLDEST
+        new = {}
+        for activity in self.com.iter_collection('/activities', filter=all_of(since, self.filter),
+                                                  page_size=self.page_size):
+            id = activity.get('id')
+            if id in self.seen or id in new or created_at(activity) < cursor:
+                continue
+            new[id] = activity
+        # Sorted on the parsed timestamps: '...T10:00:00Z' sorts after '...T10:00:00.500Z' as strings
+        activities = sorted(new.values(), key=created_at)
+
+        if activities:
+            last = created_at(activities[-1])
+            if last > cursor:
+                self.created_at = activities[-1].get('createdAt')
+                self.seen = set()
+            self.seen.update(activity.get('id') for activity in activities if created_at(activity) == last)
+            if save:
+                self.save()
+        return activities
+
+    def follow(self, interval=DEFAULT_INTERVAL):
+        """Yield new activities every 'interval' seconds until stop() is called.
+
+        The cursor is saved once every activity of a batch has been consumed.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            activities = self.poll(save=False)
+            yield from activities
+            if activities:
+                self.save()
+            self._stop.wait(interval)
+
+    def stop(self):
+        self._stop.set()
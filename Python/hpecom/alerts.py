@@ -0,0 +1,205 @@
+"""
+Fleet-wide server alerts, harvested incrementally.
+
+Alerts are only available per server (/servers/{id}/alerts): reading them for the whole fleet
+every time is one request per server. An AlertHarvester keeps, in a local SQLite store:
+- the updatedAt of every server at its last harvest: a server whose updatedAt has not changed is
+  skipped, the fleet is listed with one paginated read of id, name and updatedAt only,
+- a high-water mark per server (createdAt of its newest alert and the ids of the alerts at that
+  time): only the alerts created since the mark are requested,
+- the alerts themselves, deduplicated on their id (or their content when they have none).
+
+The alerts of the changed servers are read with at most 'concurrency' requests in flight. A
+server whose read failed keeps its previous mark and is read again by the next harvest.
+
+Example:
+   with AlertHarvester(com) as harvester:
+      result = harvester.harvest()
+      write_ndjson(result.alerts, sys.stdout)          # only the new alerts, tagged with their server
+      print(result.fetched, result.skipped, result.failed)
+      critical = harvester.alerts(severity='CRITICAL')
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import hashlib
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .activities import created_at
+from .bulk import DEFAULT_CONCURRENCY
+from .cache import cache_dir, client_key
+from .query import Field
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS alerts (
+    id          TEXT PRIMARY KEY,
+    server_id   TEXT NOT NULL,
+    created_at  TEXT,
+    severity    TEXT,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_server ON alerts (server_id, created_at);
+CREATE TABLE IF NOT EXISTS marks (
+    server_id   TEXT PRIMARY KEY,
+    updated_at  TEXT,
+    high_water  TEXT,
+    seen        TEXT NOT NULL
+);
+'''
+
+# alerts: new alerts, oldest first, with serverId / serverName, fetched / skipped: number of servers
+# read / not read (unchanged updatedAt), failed: list of (server id, error)
+HarvestResult = namedtuple('HarvestResult', ['alerts', 'fetched', 'skipped', 'failed'])
+
+
+def alert_id(alert):
+    """Id of an alert, a hash of its content when it has none."""
+    if alert.get('id'):
+        return str(alert['id'])
+    return hashlib.sha256(json.dumps(alert, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class AlertHarvester:
+    """Incremental harvest of the alerts of every server.
+
+    com:         COMClient
+    name:        name of the store, one per consumer (e.g. 'siem')
+    path:        SQLite file (default: <hpecom cache>/alerts/<endpoint and client key>-<name>.sqlite)
+    concurrency: maximum number of alert requests in flight
+    page_size:   page size of the server listing and of the alert reads
+    """
+
+    def __init__(self, com, name='alerts', path=None, concurrency=DEFAULT_CONCURRENCY, page_size=100):
+        self.com = com
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.path = path or os.path.join(cache_dir('alerts'), client_key(com) + '-' + name + '.sqlite')
+        self._db = sqlite3.connect(self.path)
+        if self.path != ':memory:':
+            os.chmod(self.path, 0o600)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def marks(self):
+        """{server id: (updatedAt, high-water createdAt, ids of the alerts at the high-water mark)}"""
+        return {row['server_id']: (row['updated_at'], row['high_water'], set(json.loads(row['seen'])))
+                for row in self._db.execute('SELECT server_id, updated_at, high_water, seen FROM marks')}
+
+    def _read(self, item):
+        server_id, high_water = item
+        try:
+            since = Field('createdAt').ge(high_water) if high_water else None
+            return list(self.com.iter_collection('/servers/' + server_id + '/alerts', filter=since,
+                                                 page_size=self.page_size)), None
+        except Exception as error:
+            return None, error
+
+    def harvest(self, full=False, server_ids=None):
+        """Read the new alerts of the servers that changed since the last harvest and store them.
+
+        full:       read every server, even the ones whose updatedAt did not change
+        server_ids: only harvest these servers (default: every server)
+        """
+        marks = self.marks()
+        servers = [server for server in self.com.iter_collection('/servers', select=['id', 'name', 'updatedAt'],
+                                                                 page_size=self.page_size)
+                   if server_ids is None or server['id'] in server_ids]
+        changed = [server for server in servers
+                   if full or server['id'] not in marks or marks[server['id']][0] != server.get('updatedAt')]
+
+        work = [(server['id'], marks.get(server['id'], (None, None, set()))[1]) for server in changed]
+        results = []
+        if work:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(work))),
+                                    thread_name_prefix='hpecom-alerts') as pool:
+                results = list(pool.map(self._read, work))
+
+        new, failed = [], []
+        with self._db:
+            for server, (alerts, error) in zip(changed, results):
+                if error is not None:
+                    failed.append((server['id'], error))
+                    continue
+                _, high_water, seen = marks.get(server['id'], (None, None, set()))
+                fresh = {}
+                for alert in alerts:
+                    id = alert_id(alert)
+                    if id not in seen and id not in fresh:
+                        fresh[id] = dict(alert, serverId=server['id'], serverName=server.get('name'))
+                new += self._store(server['id'], fresh)
+
+                # The mark only moves forward: the alerts at the new high-water createdAt are remembered.
+                # The dates are compared parsed, the API mixes timestamps with and without milliseconds
+                mark = created_at({'createdAt': high_water})
+                newest = max((alert for alert in alerts if alert.get('createdAt')), key=created_at, default=None)
+                last = high_water
+                if newest is not None and created_at(newest) > mark:
+                    last, mark, seen = newest['createdAt'], created_at(newest), set()
+                if last is not None:
+                    seen.update(alert_id(alert) for alert in alerts if created_at(alert) == mark)
+                self._db.execute('INSERT OR REPLACE INTO marks (server_id, updated_at, high_water, seen) '
+                                 'VALUES (?, ?, ?, ?)',
+                                 (server['id'], server.get('updatedAt'), last, json.dumps(sorted(seen))))
+        new.sort(key=created_at)
+        return HarvestResult(new, len(changed), len(servers) - len(changed), failed)
+
+    def _store(self, server_id, alerts):
+        """Insert the alerts ({id: alert}) not stored yet, return them."""
+        stored = []
+        for id, alert in alerts.items():
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO alerts (id, server_id, created_at, severity, data) VALUES (?, ?, ?, ?, ?)',
+                (id, server_id, alert.get('createdAt'), alert.get('severity'),
+                 json.dumps(alert, separators=(',', ':'))))
+            if cursor.rowcount:
+                stored.append(alert)
+        return stored
+
+    def alerts(self, server_id=None, since=None, severity=None):
+        """Stored alerts, oldest first, optionally of one server, created since a date or of a severity."""
+        where, parameters = [], []
+        for column, operator, value in (('server_id', '=', server_id), ('created_at', '>=', since),
+                                        ('severity', '=', severity)):
+            if value is not None:
+                where.append(f'{column} {operator} ?')
+                parameters.append(value)
+        sql = 'SELECT data FROM alerts' + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY created_at'
+        return [json.loads(row['data']) for row in self._db.execute(sql, parameters)]
+
+    def count(self):
+        return self._db.execute('SELECT count(*) FROM alerts').fetchone()[0]
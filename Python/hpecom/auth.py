@@ -0,0 +1,183 @@
+"""
+OAuth token provider for the HPE Compute Ops Management API.
+
+TokenProvider replaces the one-shot oauth.fetch_token() of the scripts:
+- Tokens are cached on disk per ClientID (0600 file under the hpecom cache folder), so a new
+  run reuses a still valid token instead of paying an SSO round trip.
+- The 'expires_in' value returned by the SSO is honored: a token is only handed out while it
+  is valid for at least refresh_margin seconds.
+- A background timer fetches a new token refresh_margin seconds before expiry, so long
+  running jobs (e.g. multi-hour firmware polls) never present an expired token.
+- COMClient calls refresh() and retries a request once when the API answers 401.
+
+The client secret can be given as a string or as a callable (e.g. a getpass prompt) that is
+only invoked when a token really has to be fetched from the SSO.
+
+Example:
+   tokens = TokenProvider(ClientID, lambda: getpass.getpass(prompt='Enter your HPE GreenLake Client Secret: '))
+   com = COMClient(ConnectivityEndpoint, APIversion, tokens)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import os
+import threading
+import time
+
+from .cache import cache_dir, read_json, write_json_private
+
+TOKEN_URL = 'https://sso.common.cloud.hpe.com/as/token.oauth2'
+
+# A token is refreshed when it has less than this number of seconds left
+DEFAULT_REFRESH_MARGIN = 300
+
+
+class TokenProvider:
+    """Cached, self-refreshing GreenLake SSO bearer token for one API client.
+
+    client_id:          API client ID
+    client_secret:      API client secret, or a callable returning it (called at most once)
+    token_url:          GreenLake SSO token endpoint
+    refresh_margin:     seconds before expiry at which the token is renewed
+    background_refresh: renew the token from a daemon timer thread before it expires
+    use_cache:          read and write the on-disk token cache
+    """
+
+    def __init__(self, client_id, client_secret, token_url=TOKEN_URL, refresh_margin=DEFAULT_REFRESH_MARGIN,
+                 background_refresh=True, use_cache=True):
+        self.client_id = client_id
+        self._client_secret = client_secret
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self.cache_file = os.path.join(cache_dir('tokens'), client_id + '.json') if use_cache else None
+
+        # Called with (start time, duration, error) after every SSO request, see Instrumentation.record_token_fetch()
+        self.on_fetch = None
+
+        self._lock = threading.RLock()
+        self._timer = None
+        self._access_token = None
+        self._expires_at = 0.0
+
+        if self.cache_file:
+            cached = read_json(self.cache_file)
+            if cached and cached.get('client_id') == client_id and cached.get('token_url') == token_url:
+                self._access_token = cached.get('access_token')
+                self._expires_at = float(cached.get('expires_at', 0))
+                if self._is_valid():
+                    self._schedule_refresh()
+
+    @property
+    def expires_at(self):
+        return self._expires_at
+
+    def _is_valid(self):
+        return self._access_token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    def get_token(self):
+        """Return a bearer token valid for at least refresh_margin seconds."""
+        with self._lock:
+            if not self._is_valid():
+                self._fetch()
+            return self._access_token
+
+    def refresh(self, stale_token=None):
+        """Fetch a new token.
+
+        When stale_token is given, the SSO is only called if it is still the current token, so
+        concurrent requests rejected with the same token trigger a single refresh.
+        """
+        with self._lock:
+            if stale_token is None or stale_token == self._access_token:
+                self._fetch()
+            return self._access_token
+
+    def _secret(self):
+        if callable(self._client_secret):
+            self._client_secret = self._client_secret()
+        return self._client_secret
+
+    def _fetch(self):
+        # Imported here so that runs served from the token cache do not load the OAuth stack
+        import requests
+        from oauthlib.oauth2 import BackendApplicationClient
+        from requests_oauthlib import OAuth2Session
+
+        oauth = OAuth2Session(client=BackendApplicationClient(self.client_id))
+        auth = requests.auth.HTTPBasicAuth(self.client_id, self._secret())
+        start, started = time.time(), time.monotonic()
+        try:
+            token = oauth.fetch_token(token_url=self.token_url, auth=auth)
+        except Exception as error:
+            if self.on_fetch:
+                self.on_fetch(start, time.monotonic() - started, error)
+            raise
+        if self.on_fetch:
+            self.on_fetch(start, time.monotonic() - started, None)
+
+        self._access_token = token['access_token']
+        self._expires_at = time.time() + float(token.get('expires_in', 7200))
+        if self.cache_file:
+            write_json_private(self.cache_file, {
+                'client_id': self.client_id,
+                'token_url': self.token_url,
+                'access_token': self._access_token,
+                'expires_at': self._expires_at,
+            })
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if not self.background_refresh:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(self._expires_at - self.refresh_margin - time.time(), 0) + 1
+        self._timer = threading.Timer(delay, self._background_fetch)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_fetch(self):
+        try:
+            with self._lock:
+                if not self._is_valid():
+                    self._fetch()
+        except Exception:
+            # The next get_token() call fetches synchronously and surfaces the error
+            pass
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def clear_cache(self):
+        """Forget the current token and remove it from the disk cache."""
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0.0
+            if self.cache_file and os.path.exists(self.cache_file):
+                os.unlink(self.cache_file)
@@ -0,0 +1,88 @@
+"""
+Bounded-concurrency bulk fetch of per-device resources.
+
+Reading /servers/{id} or /servers/{id}/alerts one device at a time makes reports on hundreds of
+servers take minutes. fetch_many() sends the requests from a thread pool over the pooled
+COMClient session:
+- results are returned in the order of the requested paths,
+- an error on one device is captured in its result and does not stop the others,
+- the number of requests in flight is capped by 'concurrency'.
+
+Example:
+   for result in get_servers(com, deviceids, concurrency=16):
+      if result.error:
+         print(f"Server {result.key}: {result.error}")
+      else:
+         print(result.value['name'], result.value['lastFirmwareUpdate'])
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = 8
+
+# key: the id (or path) the result belongs to, value: decoded JSON or None, error: exception or None
+BulkResult = namedtuple('BulkResult', ['key', 'value', 'error'])
+
+
+def _fetch(com, key, path, params):
+    try:
+        return BulkResult(key, com.get(path, params=params), None)
+    except Exception as error:
+        return BulkResult(key, None, error)
+
+
+def fetch_many(com, paths, keys=None, params=None, concurrency=DEFAULT_CONCURRENCY):
+    """GET every path with at most 'concurrency' requests in flight.
+
+    Returns a list of BulkResult in the order of 'paths'. 'keys' (same length as paths) are
+    reported in the results, they default to the paths themselves.
+    """
+    paths = list(paths)
+    keys = list(keys) if keys is not None else paths
+    if len(keys) != len(paths):
+        raise ValueError('keys and paths must have the same length')
+    if not paths:
+        return []
+    workers = max(1, min(concurrency, len(paths)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hpecom-bulk') as pool:
+        return list(pool.map(lambda kp: _fetch(com, kp[0], kp[1], params), zip(keys, paths)))
+
+
+def get_servers(com, server_ids, concurrency=DEFAULT_CONCURRENCY, select=None):
+    """GET /servers/{id} for every server id, see fetch_many()."""
+    params = {'select': ','.join(select)} if select else None
+    server_ids = list(server_ids)
+    return fetch_many(com, ['/servers/' + server_id for server_id in server_ids], keys=server_ids,
+                      params=params, concurrency=concurrency)
+
+
+def get_server_alerts(com, server_ids, concurrency=DEFAULT_CONCURRENCY):
+    """GET /servers/{id}/alerts for every server id, see fetch_many()."""
+    server_ids = list(server_ids)
+    return fetch_many(com, ['/servers/' + server_id + '/alerts' for server_id in server_ids], keys=server_ids,
+                      concurrency=concurrency)
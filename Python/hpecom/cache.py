@@ -0,0 +1,78 @@
+"""
+Local cache location and private file helpers used by the hpecom modules.
+
+Files are stored under $HPECOM_CACHE_DIR, or ~/.cache/hpecom by default. Cache files may
+contain bearer tokens or inventory data, so directories are created with 0700 and files
+with 0600 permissions, and they are replaced atomically so a concurrent reader never
+sees a partial file.
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+def cache_dir(*subdirs):
+    """Return (and create if needed) a private directory under the hpecom cache folder."""
+    base = os.environ.get('HPECOM_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'hpecom')
+    path = os.path.join(base, *subdirs)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def client_key(com):
+    """Return a short key of the endpoint and API client of a COMClient, used to name its cache files."""
+    provider = getattr(com, 'token_provider', None)
+    account = getattr(provider, 'client_id', '')
+    return hashlib.sha256((com.connectivity_endpoint + '|' + account).encode()).hexdigest()[:16]
+
+
+def read_json(path):
+    """Return the JSON content of a cache file, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_private(path, data):
+    """Atomically write data as JSON to path with 0600 permissions."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        os.chmod(tmp, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,206 @@
+"""
+Command line entry point: python -m hpecom <command>.
+
+One fast-starting command for the quick lookups and the firmware updates, usable from cron,
+Telegraf or CI: the credentials are read from the environment, the credentials file or the
+keyring (see credentials.py), and only the modules needed by the command are imported, e.g.
+'--help' loads neither requests nor the OAuth stack, and a lookup served from the token cache
+never loads the OAuth stack.
+
+Commands:
+   servers      list the servers (--filter, --select, --limit)
+   groups       list the groups
+   bundles      list the firmware bundles
+   jobs         list the jobs
+   schedules    list the schedules
+   fw-update    update groups to a baseline (GroupFirmwareUpdate jobs, see rollout.py)
+   alerts       new alerts of the fleet since the last run, as JSON lines (see alerts.py)
+
+Examples:
+   python -m hpecom servers --filter "hardware/powerState eq 'OFF'" --output ndjson
+   python -m hpecom groups --select name,firmwareBaseline
+   python -m hpecom fw-update --baseline 2022.03.0 Production-Group Dev-Group --canary Dev-Group
+   python -m hpecom alerts --name siem >> alerts.ndjson
+
+Several regional instances are listed at the same time when the endpoint is a comma-separated
+list, the items are tagged with their region (see regions.py):
+   python -m hpecom servers --endpoint https://us-west2-api.compute.cloud.hpe.com,https://eu-central1-api.compute.cloud.hpe.com
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import argparse
+import json
+import sys
+
+# command: (collection path, default columns)
+LISTS = {
+    'servers': ('/servers', ['name', 'hardware/model', 'hardware/serialNumber', 'hardware/powerState',
+                             'hardware/health/summary', 'hardware/bmc/ip']),
+    'groups': ('/groups', ['name', 'id', 'firmwareBaseline', 'updatedAt']),
+    'bundles': ('/firmware-bundles', ['name', 'releaseVersion', 'bundleType', 'id']),
+    'jobs': ('/jobs', ['createdAt', 'state', 'status', 'associatedResourceUri', 'id']),
+    'schedules': ('/schedules', ['name', 'purpose', 'schedule/startAt', 'associatedResourceUri', 'id']),
+}
+
+
+def parser():
+    main = argparse.ArgumentParser(prog='python -m hpecom', description='HPE Compute Ops Management command line')
+    main.add_argument('--client-id', help='API client ID (default: COM_CLIENT_ID, credentials file)')
+    main.add_argument('--endpoint', help='connectivity endpoint, or comma-separated endpoints of several regions '
+                      '(default: COM_ENDPOINT, credentials file)')
+    main.add_argument('--api-version', help='API version (default: COM_API_VERSION, credentials file, v1beta1)')
+    main.add_argument('--credentials', help='credentials file (default: COM_CREDENTIALS, ~/.config/hpecom/credentials.json)')
+    main.add_argument('--no-prompt', action='store_true', help='fail instead of prompting for a missing client secret')
+    commands = main.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    for name, (path, _) in LISTS.items():
+        command = commands.add_parser(name, help=f"list the {path.strip('/')}")
+        command.add_argument('--filter', help="filter expression, e.g. \"name eq 'Production-Group'\"")
+        command.add_argument('--select', help='comma-separated property paths to show (default: a summary)')
+        command.add_argument('--limit', type=int, help='maximum number of items')
+        command.add_argument('--output', choices=['table', 'json', 'ndjson'], default='table')
+
+    update = commands.add_parser('fw-update', help='update groups to a firmware baseline')
+    update.add_argument('groups', nargs='+', metavar='group', help='group name')
+    update.add_argument('--baseline', required=True, help='baseline releaseVersion, e.g. 2022.03.0')
+    update.add_argument('--canary', help='group updated alone first, the update stops if it fails')
+    update.add_argument('--concurrency', type=int, default=4, help='maximum number of group jobs at the same time')
+    update.add_argument('--max-failures', type=int, default=1, help='failed groups after which no new group starts')
+
+    alerts = commands.add_parser('alerts', help='print the new alerts of every server as JSON lines')
+    alerts.add_argument('--name', default='alerts', help='name of the alert store, one per consumer')
+    alerts.add_argument('--full', action='store_true', help='read every server, even the unchanged ones')
+    alerts.add_argument('--concurrency', type=int, default=8, help='maximum number of alert requests in flight')
+    return main
+
+
+def connect(args):
+    """Return a COMClient, or a MultiRegionClient for several endpoints, built from the options,
+    environment, credentials file or keyring."""
+    from .auth import TokenProvider
+    from .credentials import load_settings
+
+    settings = load_settings(args.client_id, args.endpoint, args.api_version, args.credentials,
+                             prompt=not args.no_prompt)
+    tokens = TokenProvider(settings.client_id, settings.client_secret, background_refresh=False)
+    endpoints = [endpoint.strip() for endpoint in settings.endpoint.split(',') if endpoint.strip()]
+    if len(endpoints) > 1:
+        from .regions import MultiRegionClient
+        return MultiRegionClient(endpoints, settings.api_version, tokens)
+    from .client import COMClient
+    return COMClient(endpoints[0], settings.api_version, tokens)
+
+
+def items(com, path, args):
+    """Return the items of a listing command and {region: error} of the regions that failed."""
+    from itertools import islice
+
+    select = args.select.split(',') if args.select else None
+    page_size = min(args.limit, 100) if args.limit else 100
+    iterator = com.iter_collection(path, filter=args.filter, select=select, page_size=page_size)
+    records = list(islice(iterator, args.limit)) if args.limit else list(iterator)
+    iterator.close()
+    return records, getattr(iterator, 'errors', {})
+
+
+def table(records, columns):
+    """Return the records as lines of aligned columns."""
+    from .export import cell, value_at
+
+    rows = [columns] + [[cell(value_at(record, column)) or '' for column in columns] for record in records]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return ['  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+
+
+def list_command(com, args, out):
+    path, columns = LISTS[args.command]
+    columns = args.select.split(',') if args.select else columns
+    records, errors = items(com, path, args)
+    if hasattr(com, 'regions'):
+        # MultiRegionClient: RegionItems, tagged with their region
+        records = [dict(item, region=region) for region, item in records]
+        columns = ['region'] + columns
+    if args.output == 'json':
+        json.dump(records, out, indent=2)
+        out.write('\n')
+    elif args.output == 'ndjson':
+        for record in records:
+            out.write(json.dumps(record, separators=(',', ':')) + '\n')
+    else:
+        out.write('\n'.join(table(records, columns)) + '\n')
+    for region, error in errors.items():
+        print(f"Error: region {region} - {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def fw_update_command(com, args, out):
+    from .rollout import FirmwareRollout, format_summary
+
+    rollout = FirmwareRollout(com, [(group, args.baseline) for group in args.groups], canary=args.canary,
+                              concurrency=args.concurrency, max_failures=args.max_failures,
+                              on_change=lambda group, event: out.write(f"{group}: {event.state}\n"))
+    results = rollout.run()
+    out.write('\n'.join(format_summary(results)) + '\n')
+    return 0 if all(result.state == 'complete' for result in results) else 1
+
+
+def alerts_command(com, args, out):
+    from .activities import write_ndjson
+    from .alerts import AlertHarvester
+
+    with AlertHarvester(com, name=args.name, concurrency=args.concurrency) as harvester:
+        result = harvester.harvest(full=args.full)
+    write_ndjson(result.alerts, out)
+    print(f"{len(result.alerts)} new alert(s) - Servers read: {result.fetched} - Unchanged: {result.skipped} - "
+          f"Failed: {len(result.failed)}", file=sys.stderr)
+    for server_id, error in result.failed:
+        print(f"Error: server {server_id} - {error}", file=sys.stderr)
+    return 1 if result.failed else 0
+
+
+def main(argv=None, out=None):
+    args = parser().parse_args(argv)
+    out = out or sys.stdout
+    try:
+        with connect(args) as com:
+            if args.command in ('fw-update', 'alerts'):
+                if hasattr(com, 'regions'):
+                    print(f"Error: {args.command} needs a single endpoint", file=sys.stderr)
+                    return 2
+                command = fw_update_command if args.command == 'fw-update' else alerts_command
+                return command(com, args, out)
+            return list_command(com, args, out)
+    except LookupError as error:
+        # Missing credentials, unknown group or baseline
+        print(f"Error: {error}", file=sys.stderr)
+        return 2
+    except Exception as error:
+        response = getattr(error, 'response', None)
+        if response is None:
+            raise
+        print(f"Error: {response.status_code} {response.reason} - {response.text}", file=sys.stderr)
+        return 1
@@ -0,0 +1,267 @@
+"""
+Pooled HTTP client for the HPE Compute Ops Management API.
+
+All requests of a run go through a single keep-alive requests.Session, so the TLS
+connection to the connectivity endpoint is opened once and then reused instead of
+being renegotiated for every call.
+
+URLs are built in one place from the connectivity endpoint and the API version:
+- '/servers'                           -> <endpoint>/compute-ops-mgmt/<version>/servers
+- '/compute-ops-mgmt/v1beta2/jobs/<id>' -> <endpoint>/compute-ops-mgmt/v1beta2/jobs/<id>  (resourceUri, jobUri...)
+- '/ui-doorway/compute/v1/...'         -> <endpoint>/ui-doorway/compute/v1/...
+- 'https://...'                        -> used as is
+
+The token can be a static access token string or a TokenProvider (see auth.py). With a
+TokenProvider the bearer header is taken from the provider on every request, and a request
+answered with 401 is retried once with a freshly fetched token.
+
+Requests are sent through a RequestScheduler (see scheduler.py): optional per-endpoint rate limit,
+adaptive concurrency and retries of 429 / 5xx answers honoring Retry-After. With an
+Instrumentation (see instrument.py), every request and token fetch is recorded.
+
+Example:
+   com = COMClient("https://us-west2-api.compute.cloud.hpe.com", "v1beta1", TokenProvider(ClientID, ClientSecret))
+   servers = com.get('/servers')
+   job = com.post('/jobs', json=body)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .decode import ItemStream, loads
+from .instrument import RequestRecord, endpoint_template
+from .query import encode_query
+from .pagination import DEFAULT_PAGE_SIZE, DEFAULT_PREFETCH, iter_collection
+from .resolver import Resolver
+from .scheduler import RequestScheduler
+
+# Path prefixes that are already rooted on the connectivity endpoint (resourceUri, jobUri, ui-doorway...)
+ROOTED_PREFIXES = ('/compute-ops-mgmt/', '/ui-doorway/', '/api/')
+
+# Default (connect, read) timeouts in seconds applied to every request
+DEFAULT_TIMEOUT = (10, 60)
+
+
+class COMClient:
+    """Keep-alive session bound to one connectivity endpoint and API version.
+
+    connectivity_endpoint: e.g. "https://us-west2-api.compute.cloud.hpe.com"
+    api_version:           default API version used to build collection URLs, e.g. "v1beta1"
+    access_token:          bearer token returned by the GreenLake SSO, or a TokenProvider
+    pool_size:             maximum number of connections kept open to the endpoint
+    timeout:               default (connect, read) timeout in seconds, can be overridden per request
+    api_versions:          optional per-collection versions, e.g. {'jobs': 'v1beta3', 'servers': 'v1beta2'}
+    scheduler:             RequestScheduler, can be shared by several clients (default: one per client
+                           with max_concurrency=pool_size and no rate limit), False to send requests without concurrency limit or retry
+    instrumentation:       optional Instrumentation recording every request
+    fast_json:             decode the answers with orjson / msgspec when installed (see decode.py)
+    """
+
+    def __init__(self, connectivity_endpoint, api_version="v1beta1", access_token=None,
+                 pool_size=10, timeout=DEFAULT_TIMEOUT, api_versions=None, scheduler=None,
+                 instrumentation=None, fast_json=False):
+        self.connectivity_endpoint = connectivity_endpoint.rstrip('/')
+        self.api_version = api_version
+        self.api_versions = dict(api_versions or {})
+        self.pool_size = pool_size
+        self.timeout = timeout
+        if scheduler is None:
+            scheduler = RequestScheduler(max_concurrency=pool_size)
+        self.scheduler = scheduler or None
+        self.instrumentation = instrumentation
+        self.fast_json = fast_json
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept'] = 'application/json'
+        self.token_provider = None
+        self._resolver = None
+        if access_token is not None:
+            self.set_access_token(access_token)
+
+    def set_access_token(self, access_token):
+        """Use a static token string or a TokenProvider for the Authorization header."""
+        if hasattr(access_token, 'get_token'):
+            self.token_provider = access_token
+            self.session.headers.pop('Authorization', None)
+            if self.instrumentation is not None:
+                self.token_provider.on_fetch = self.instrumentation.record_token_fetch
+        else:
+            self.token_provider = None
+            self.session.headers['Authorization'] = 'Bearer ' + access_token
+
+    def url(self, path):
+        """Return the absolute URL of a collection path, a resourceUri or an absolute URL."""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        if not path.startswith('/'):
+            path = '/' + path
+        if path.startswith(ROOTED_PREFIXES):
+            return self.connectivity_endpoint + path
+        collection = path[1:].split('/', 1)[0].split('?', 1)[0]
+        version = self.api_versions.get(collection, self.api_version)
+        return self.connectivity_endpoint + '/compute-ops-mgmt/' + version + path
+
+    def endpoint(self, path):
+        """Return the rate limit key of a path: the collection name ('servers', 'jobs'...) or 'ui-doorway'."""
+        url = self.url(path)
+        if not url.startswith(self.connectivity_endpoint + '/'):
+            return url.split('://', 1)[-1].split('/', 1)[0]
+        parts = url[len(self.connectivity_endpoint) + 1:].split('?', 1)[0].split('/')
+        if parts[0] == 'compute-ops-mgmt' and len(parts) > 2:
+            return parts[2]
+        if parts[0] == 'api' and len(parts) > 3:
+            return parts[3]
+        return parts[0]
+
+    def _send(self, method, url, params, json, headers, timeout, **kwargs):
+        token = None
+        if self.token_provider is not None:
+            token = self.token_provider.get_token()
+            headers = dict(headers or {}, Authorization='Bearer ' + token)
+        response = self.session.request(method, url, params=params, json=json, headers=headers,
+                                        timeout=timeout or self.timeout, **kwargs)
+        if response.status_code == 401 and token is not None:
+            response.close()
+            token = self.token_provider.refresh(stale_token=token)
+            headers['Authorization'] = 'Bearer ' + token
+            response = self.session.request(method, url, params=params, json=json, headers=headers,
+                                            timeout=timeout or self.timeout, **kwargs)
+        return response
+
+    def request(self, method, path, params=None, json=None, headers=None, timeout=None, **kwargs):
+        """Send a request through the pooled session and return the requests.Response.
+
+        With a TokenProvider, a 401 answer is retried once with a fresh token. With a scheduler,
+        429 / 5xx answers are retried (see scheduler.py) and the last answer is returned.
+        """
+        url = self.url(path)
+        if isinstance(params, dict):
+            params = encode_query(params)
+
+        if self.instrumentation is None:
+            def send():
+                return self._send(method, url, params, json, headers, timeout, **kwargs)
+
+            if self.scheduler is None:
+                return send()
+            return self.scheduler.send(self.endpoint(path), method, send)
+        return self._instrumented(method, path, url, params, json, headers, timeout, **kwargs)
+
+    def _instrumented(self, method, path, url, params, json, headers, timeout, **kwargs):
+        attempts = [0]
+        bytes_sent = [0]
+
+        def send():
+            attempts[0] += 1
+            response = self._send(method, url, params, json, headers, timeout, **kwargs)
+            body = response.request.body if response.request is not None else None
+            bytes_sent[0] += len(body) if body else 0
+            return response
+
+        start, started = time.time(), time.monotonic()
+        response, error = None, None
+        try:
+            if self.scheduler is None:
+                response = send()
+            else:
+                response = self.scheduler.send(self.endpoint(path), method, send)
+            return response
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            received = 0
+            if response is not None:
+                length = response.headers.get('Content-Length')
+                if length and length.isdigit():
+                    received = int(length)
+                elif not kwargs.get('stream'):
+                    received = len(response.content)
+            relative = url[len(self.connectivity_endpoint):] if url.startswith(self.connectivity_endpoint) else url
+            self.instrumentation.record(RequestRecord(
+                method, endpoint_template(relative), response.status_code if response is not None else None, attempts[0],
+                time.monotonic() - started, bytes_sent[0], received, start, error))
+
+    def _json(self, method, path, **kwargs):
+        response = self.request(method, path, **kwargs)
+        response.raise_for_status()
+        if not response.content:
+            return None
+        if self.fast_json:
+            return loads(response.content)
+        return response.json()
+
+    def stream_items(self, path, params=None, key='items', **kwargs):
+        """GET a collection page and return an ItemStream decoding its items one at a time."""
+        response = self.request('GET', path, params=params, stream=True, **kwargs)
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return ItemStream(response, key=key)
+
+    def get(self, path, params=None, **kwargs):
+        return self._json('GET', path, params=params, **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        return self._json('POST', path, json=json, **kwargs)
+
+    def patch(self, path, json=None, content_type='application/merge-patch+json', **kwargs):
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers.setdefault('Content-Type', content_type)
+        return self._json('PATCH', path, json=json, headers=headers, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self._json('DELETE', path, **kwargs)
+
+    @property
+    def resolver(self):
+        """Shared Resolver (name -> id indexes of groups, job templates and firmware bundles)."""
+        if self._resolver is None:
+            self._resolver = Resolver(self)
+        return self._resolver
+
+    def iter_collection(self, path, filter=None, select=None, params=None, page_size=DEFAULT_PAGE_SIZE,
+                        prefetch=DEFAULT_PREFETCH):
+        """Yield every item of a collection, see pagination.iter_collection()."""
+        return iter_collection(self, path, filter=filter, select=select, params=params, page_size=page_size,
+                               prefetch=prefetch)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
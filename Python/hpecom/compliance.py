@@ -0,0 +1,201 @@
+"""
+Firmware compliance of the servers against an SPP baseline, without running an update.
+
+check_compliance() reads the component list of a firmware bundle (/firmware-bundles/{id}) and
+compares the firmwareInventory of every server with it:
+- each version string is encoded once into a single sortable integer (the first VERSION_PARTS
+  numbers of the version, PART_BITS bits each, e.g. '2.60' -> (2, 60, 0, 0)),
+- the installed components of all the servers are laid out in flat numpy arrays (server index,
+  bundle component index, installed version code) and compared with the bundle versions in one
+  vectorized pass; per-server counts are obtained with bincount,
+- only the components that differ are turned back into Python objects.
+
+Components are matched by name (case and surrounding spaces ignored); 'aliases' maps firmwareInventory
+names to bundle component names when they differ. Components that are not in the bundle, and
+versions without any number, are not compared.
+
+numpy is only needed by this module (pip install numpy).
+
+Example:
+   report = check_compliance(com, '2022.03.0')
+   for server in report.servers:
+      print(server.name, server.status, server.outdated)
+   for drift in report.drift:
+      print(drift.server_name, drift.component, drift.installed, '->', drift.baseline)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import re
+from collections import Counter, namedtuple
+
+VERSION_PARTS = 4
+PART_BITS = 15
+
+_DOTTED = re.compile(r'\d+(?:\.\d+)+')
+_NUMBER = re.compile(r'\d+')
+
+# status: 'compliant', 'outdated' (at least one component older than the baseline), 'newer' (only newer
+# components) or 'unknown' (no component of the bundle found); checked / outdated / newer: component counts
+ServerCompliance = namedtuple('ServerCompliance', ['id', 'name', 'status', 'checked', 'outdated', 'newer'])
+
+# status: 'outdated' or 'newer'
+ComponentDrift = namedtuple('ComponentDrift', ['server_id', 'server_name', 'component', 'installed', 'baseline',
+                                               'status'])
+
+
+def encode_version(version):
+    """Return a version string as one sortable integer, or -1 when it contains no number.
+
+    The first dotted number of the string is used ('U46 v2.60 (02/22/2022)' -> 2.60), or every
+    number when there is no dotted one. Numbers are capped to PART_BITS bits.
+    """
+    if version is None:
+        return -1
+    text = str(version)
+    match = _DOTTED.search(text)
+    parts = match.group(0).split('.') if match else _NUMBER.findall(text)
+    if not parts:
+        return -1
+    code = 0
+    for part in (parts + ['0'] * VERSION_PARTS)[:VERSION_PARTS]:
+        code = (code << PART_BITS) | min(int(part), (1 << PART_BITS) - 1)
+    return code
+
+
+def normalize(name):
+    return ' '.join(str(name).split()).lower() if name is not None else None
+
+
+def bundle_components(bundle):
+    """Return {normalized component name: (name, version)} of a firmware bundle document."""
+    components = {}
+    for component in bundle.get('components') or []:
+        name = component.get('name') or component.get('componentName')
+        version = component.get('version') or component.get('componentVersion')
+        if name and version:
+            components[normalize(name)] = (name, version)
+    if not components:
+        raise ValueError(f"firmware bundle '{bundle.get('releaseVersion') or bundle.get('id')}' has no component list")
+    return components
+
+
+class ComplianceReport:
+    """Result of compare(): per-server compliance and per-component drift."""
+
+    def __init__(self, baseline, servers, drift):
+        self.baseline = baseline
+        self.servers = servers
+        self.drift = drift
+
+    def summary(self):
+        """Number of servers by status."""
+        return dict(Counter(server.status for server in self.servers))
+
+    def non_compliant(self):
+        return [server for server in self.servers if server.status == 'outdated']
+
+
+def compare(servers, components, aliases=None, baseline=None):
+    """Compare the firmwareInventory of server records with bundle components and return a ComplianceReport.
+
+    servers:    iterable of server records with id, name and firmwareInventory
+    components: {normalized name: (name, version)}, see bundle_components()
+    aliases:    optional {firmwareInventory name: bundle component name}
+    """
+    # Imported here so that the other helpers do not require numpy
+    import numpy as np
+
+    names = list(components)
+    index = {name: i for i, name in enumerate(names)}
+    aliases = {normalize(key): normalize(value) for key, value in (aliases or {}).items()}
+    expected_codes = np.array([encode_version(components[name][1]) for name in names], dtype=np.int64)
+
+    codes = {}
+    server_ids, server_names = [], []
+    row_server, row_component, row_code, row_version = [], [], [], []
+    for position, server in enumerate(servers):
+        server_ids.append(server.get('id'))
+        server_names.append(server.get('name'))
+        for component in server.get('firmwareInventory') or []:
+            name = normalize(component.get('name'))
+            component_index = index.get(aliases.get(name, name))
+            if component_index is None:
+                continue
+            version = component.get('version')
+            code = codes.get(version)
+            if code is None:
+                code = codes[version] = encode_version(version)
+            row_server.append(position)
+            row_component.append(component_index)
+            row_code.append(code)
+            row_version.append(version)
+
+    count = len(server_ids)
+    server_index = np.array(row_server, dtype=np.int64)
+    component_index = np.array(row_component, dtype=np.int64)
+    installed = np.array(row_code, dtype=np.int64)
+    expected = expected_codes[component_index]
+
+    known = (installed >= 0) & (expected >= 0)
+    outdated = known & (installed < expected)
+    newer = known & (installed > expected)
+    checked_counts = np.bincount(server_index[known], minlength=count)
+    outdated_counts = np.bincount(server_index[outdated], minlength=count)
+    newer_counts = np.bincount(server_index[newer], minlength=count)
+
+    results = []
+    for position in range(count):
+        if outdated_counts[position]:
+            status = 'outdated'
+        elif newer_counts[position]:
+            status = 'newer'
+        elif checked_counts[position]:
+            status = 'compliant'
+        else:
+            status = 'unknown'
+        results.append(ServerCompliance(server_ids[position], server_names[position], status,
+                                        int(checked_counts[position]), int(outdated_counts[position]),
+                                        int(newer_counts[position])))
+
+    drift = []
+    for row in np.flatnonzero(outdated | newer):
+        position = server_index[row]
+        name, version = components[names[component_index[row]]]
+        drift.append(ComponentDrift(server_ids[position], server_names[position], name, row_version[row], version,
+                                    'outdated' if outdated[row] else 'newer'))
+    return ComplianceReport(baseline, results, drift)
+
+
+def check_compliance(com, baseline, servers=None, aliases=None, page_size=100):
+    """Compare every server with the firmware bundle of a baseline releaseVersion, e.g. '2022.03.0'.
+
+    servers: optional iterable of server records (e.g. InventoryMirror.query('servers')), read from
+             /servers with select=id,name,firmwareInventory by default
+    """
+    bundle = com.get('/firmware-bundles/' + com.resolver.bundle_id(baseline))
+    if servers is None:
+        servers = com.iter_collection('/servers', select=['id', 'name', 'firmwareInventory'], page_size=page_size)
+    return compare(servers, bundle_components(bundle), aliases=aliases, baseline=baseline)
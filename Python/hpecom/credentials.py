@@ -0,0 +1,134 @@
+"""
+Non-interactive API client credentials.
+
+The scripts used to block on getpass() for the client secret, which cannot work from cron, Telegraf
+or CI. The settings of the API client are read, first found first used, from:
+- the arguments (e.g. the variables at the top of a script, or the CLI options),
+- the environment: COM_CLIENT_ID, COM_CLIENT_SECRET, COM_ENDPOINT, COM_API_VERSION,
+- a private JSON file, $COM_CREDENTIALS or ~/.config/hpecom/credentials.json:
+     {"client_id": "...", "client_secret": "...", "endpoint": "https://us-west2-api.compute.cloud.hpe.com"}
+  (a file readable by other users is ignored with a warning),
+- the system keyring, when the 'keyring' module is installed (service 'hpecom', user = client id):
+     keyring set hpecom <client id>
+- a prompt, only when the standard input is a terminal.
+
+client_secret() returns a callable, so the secret is only looked up when the token cache has no
+valid token.
+
+Example:
+   settings = load_settings()
+   tokens = TokenProvider(settings.client_id, settings.client_secret)
+   com = COMClient(settings.endpoint, settings.api_version, tokens)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import json
+import os
+import stat
+import sys
+import warnings
+from collections import namedtuple
+
+KEYRING_SERVICE = 'hpecom'
+DEFAULT_API_VERSION = 'v1beta1'
+PROMPT = 'Enter your HPE GreenLake Client Secret: '
+
+# client_secret is a callable returning the secret
+Settings = namedtuple('Settings', ['client_id', 'client_secret', 'endpoint', 'api_version'])
+
+
+class CredentialsError(LookupError):
+    """A setting of the API client was found nowhere."""
+
+
+def credentials_file():
+    """Return the path of the credentials file."""
+    return os.environ.get('COM_CREDENTIALS') or os.path.join(os.path.expanduser('~'), '.config', 'hpecom',
+                                                             'credentials.json')
+
+
+def read_credentials(path=None):
+    """Return the content of the credentials file, {} when it is missing or not private."""
+    path = path or credentials_file()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if os.name == 'posix' and os.fstat(f.fileno()).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+                warnings.warn(f"Ignoring '{path}': it must only be readable by its owner (chmod 600)")
+                return {}
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as error:
+        warnings.warn(f"Ignoring '{path}': {error}")
+        return {}
+
+
+def keyring_secret(client_id):
+    """Return the secret of client_id stored in the system keyring, None without keyring."""
+    try:
+        import keyring
+    except ImportError:
+        return None
+    try:
+        return keyring.get_password(KEYRING_SERVICE, client_id)
+    except Exception as error:
+        warnings.warn(f"Keyring not available: {error}")
+        return None
+
+
+def client_secret(client_id, path=None, prompt=True):
+    """Return a callable looking up the secret of client_id: environment, file, keyring, then prompt.
+
+    prompt: ask for the secret when nothing is found and the standard input is a terminal
+    """
+    def secret():
+        value = os.environ.get('COM_CLIENT_SECRET')
+        if not value:
+            stored = read_credentials(path)
+            if stored.get('client_id') in (None, client_id):
+                value = stored.get('client_secret')
+        value = value or keyring_secret(client_id)
+        if value:
+            return value
+        if prompt and sys.stdin is not None and sys.stdin.isatty():
+            import getpass
+            return getpass.getpass(prompt=PROMPT, stream=sys.stderr)
+        raise CredentialsError(f"No client secret found for client '{client_id}' (COM_CLIENT_SECRET, "
+                               f"{path or credentials_file()} or keyring)")
+    return secret
+
+
+def load_settings(client_id=None, endpoint=None, api_version=None, path=None, prompt=True):
+    """Return the Settings of the API client, the arguments take precedence."""
+    stored = read_credentials(path)
+    client_id = client_id or os.environ.get('COM_CLIENT_ID') or stored.get('client_id')
+    endpoint = endpoint or os.environ.get('COM_ENDPOINT') or stored.get('endpoint')
+    api_version = api_version or os.environ.get('COM_API_VERSION') or stored.get('api_version') or DEFAULT_API_VERSION
+    if not client_id:
+        raise CredentialsError('No client id found (COM_CLIENT_ID or ' + (path or credentials_file()) + ')')
+    if not endpoint:
+        raise CredentialsError('No connectivity endpoint found (COM_ENDPOINT or ' + (path or credentials_file()) + ')')
+    return Settings(client_id, client_secret(client_id, path, prompt), endpoint.rstrip('/'), api_version)
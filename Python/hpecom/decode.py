@@ -0,0 +1,195 @@
+"""
+Fast and incremental JSON decoding of the API answers.
+
+Two opt-in paths for large collections (e.g. /servers pages with hardware and firmwareInventory):
+- loads() decodes a whole document with orjson or msgspec when one of them is installed, and
+  falls back to the standard json module; COMClient(fast_json=True) uses it for every answer,
+- ItemStream decodes the 'items' array of a streamed answer one item at a time, so the peak
+  memory is one item and one network chunk instead of the whole page and all its dicts; the other
+  top-level properties (count, offset, total...) are available in ItemStream.meta once the
+  stream is consumed.
+
+The answers are transferred gzip-compressed (requests sends Accept-Encoding: gzip, deflate) and
+decompressed on the fly, ItemStream included.
+
+Example:
+   for server in com.stream_items('/servers', params={'limit': 1000}):
+      print(server['id'], server['name'])
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import codecs
+import json
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\r\n'
+_decoder = json.JSONDecoder()
+_loads = None
+_dumps = None
+
+
+def fast_loads():
+    """Return the fastest available decoding function: orjson.loads, msgspec.json.decode or json.loads."""
+    global _loads
+    if _loads is None:
+        try:
+            import orjson
+            _loads = orjson.loads
+        except ImportError:
+            try:
+                import msgspec
+                _loads = msgspec.json.decode
+            except ImportError:
+                _loads = json.loads
+    return _loads
+
+
+def loads(data):
+    """Decode a JSON document (bytes or str) with the fastest available decoder."""
+    return fast_loads()(data)
+
+
+def dumps(value):
+    """Encode a value as compact JSON bytes with the fastest available encoder."""
+    global _dumps
+    if _dumps is None:
+        try:
+            import orjson
+            _dumps = orjson.dumps
+        except ImportError:
+            try:
+                import msgspec
+                _dumps = msgspec.json.encode
+            except ImportError:
+                _dumps = lambda value: json.dumps(value, separators=(',', ':')).encode('utf-8')
+    return _dumps(value)
+
+
+class _Reader:
+    """Buffered reader of a text stream for the incremental decoder."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Append the next chunk to the buffer; return False at the end of the stream."""
+        for chunk in self.chunks:
+            if self.pos > DEFAULT_CHUNK_SIZE:
+                self.buffer = self.buffer[self.pos:]
+                self.pos = 0
+            self.buffer += chunk
+            if chunk:
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        self.skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError('unexpected end of JSON document')
+        return self.buffer[self.pos]
+
+    def skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError(f"expected '{character}' at position {self.pos} of the JSON document")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number ending at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+class ItemStream:
+    """Iterate over the items of the JSON array 'key' of a streamed requests.Response.
+
+    response:   requests.Response obtained with stream=True
+    key:        top-level property holding the array
+    chunk_size: bytes read from the network at a time
+    """
+
+    def __init__(self, response, key='items', chunk_size=DEFAULT_CHUNK_SIZE):
+        self.response = response
+        self.key = key
+        self.chunk_size = chunk_size
+        self.meta = {}
+
+    def _chunks(self):
+        decoder = codecs.getincrementaldecoder(self.response.encoding or 'utf-8')()
+        for chunk in self.response.iter_content(self.chunk_size):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+
+    def __iter__(self):
+        reader = _Reader(self._chunks())
+        try:
+            reader.expect('{')
+            while True:
+                character = reader.peek()
+                if character == '}':
+                    return
+                if character == ',':
+                    reader.pos += 1
+                    continue
+                key = reader.value()
+                reader.expect(':')
+                if key != self.key:
+                    self.meta[key] = reader.value()
+                    continue
+                reader.expect('[')
+                while True:
+                    character = reader.peek()
+                    if character == ']':
+                        reader.pos += 1
+                        break
+                    if character == ',':
+                        reader.pos += 1
+                        continue
+                    yield reader.value()
+        finally:
+            self.response.close()
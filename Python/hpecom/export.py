@@ -0,0 +1,275 @@
+"""
+Columnar export of the server inventory to Parquet or Arrow IPC files.
+
+Server records are nested (hardware/bmc/ip, hardware/health/summary, state/connected...) and carry
+a firmwareInventory list. export_servers() flattens them into two tables:
+- servers:  one row per server, one column per property path of SERVER_COLUMNS, named with '_'
+            instead of '/' (hardware/bmc/ip -> hardware_bmc_ip),
+- firmware: one row per firmware component of every server (server_id, server_name, name,
+            version, deviceContext).
+
+Scalar properties keep their type: booleans, integers and floats are written as such, the
+timestamps of COLUMN_TYPES as UTC timestamps; objects and lists (tags...) are written as JSON text.
+The type of a column missing from COLUMN_TYPES is inferred from the values of its first batch, and a
+value that does not match the type of its column is written as null.
+
+The collection is read page by page and written in record batches of 'batch_size' rows, so memory
+use does not grow with the size of the fleet. The files are read back directly by pandas
+(pd.read_parquet) or DuckDB (SELECT * FROM 'servers.parquet').
+
+pyarrow is only needed by this module (pip install pyarrow).
+
+Example:
+   files = export_servers(com, 'fleet', format='parquet')
+   # {'servers': ('fleet/servers.parquet', 1250), 'firmware': ('fleet/firmware.parquet', 31250)}
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import datetime
+import json
+import os
+
+# Property paths exported as columns of the servers table
+SERVER_COLUMNS = (
+    'id', 'name', 'displayName', 'serverGeneration', 'generation', 'biosFamily', 'platformFamily',
+    'processorVendor', 'firmwareBundleUri', 'resourceUri', 'createdAt', 'updatedAt',
+    'hardware/serialNumber', 'hardware/model', 'hardware/productId', 'hardware/powerState',
+    'hardware/indicatorLed', 'hardware/health/summary', 'hardware/bmc/ip', 'hardware/bmc/hostname',
+    'hardware/bmc/mac', 'hardware/bmc/version',
+    'state/managed', 'state/connected', 'state/subscriptionState', 'state/subscriptionTier',
+    'host/hostname', 'host/osName', 'host/osVersion',
+    'lastFirmwareUpdate/status', 'lastFirmwareUpdate/updatedAt', 'tags',
+)
+
+# Properties of the firmwareInventory items exported as columns of the firmware table
+FIRMWARE_COLUMNS = ('name', 'version', 'deviceContext')
+
+# Type of the columns, by property path: 'string', 'bool', 'int', 'float', 'timestamp' or 'json'
+COLUMN_TYPES = {
+    'id': 'string', 'name': 'string', 'displayName': 'string', 'serverGeneration': 'string',
+    'biosFamily': 'string', 'platformFamily': 'string', 'processorVendor': 'string',
+    'firmwareBundleUri': 'string', 'resourceUri': 'string', 'createdAt': 'timestamp', 'updatedAt': 'timestamp',
+    'hardware/serialNumber': 'string', 'hardware/model': 'string', 'hardware/productId': 'string',
+    'hardware/powerState': 'string', 'hardware/indicatorLed': 'string', 'hardware/health/summary': 'string',
+    'hardware/bmc/ip': 'string', 'hardware/bmc/hostname': 'string', 'hardware/bmc/mac': 'string',
+    'hardware/bmc/version': 'string',
+    'state/managed': 'bool', 'state/connected': 'bool', 'state/subscriptionState': 'string',
+    'state/subscriptionTier': 'string',
+    'host/hostname': 'string', 'host/osName': 'string', 'host/osVersion': 'string',
+    'lastFirmwareUpdate/status': 'string', 'lastFirmwareUpdate/updatedAt': 'timestamp', 'tags': 'json',
+}
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def column_name(path):
+    return path.replace('/', '_')
+
+
+def value_at(record, path):
+    """Return the value of a property path of a record, None when a level is missing."""
+    value = record
+    for part in path.split('/'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def cell(value):
+    """Column value: strings as is, other values (objects, lists, booleans, numbers) as JSON text."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(',', ':'), sort_keys=True)
+
+
+def infer_type(values):
+    """Column type of a list of property values, 'string' when they are all None."""
+    kinds = set()
+    for value in values:
+        if isinstance(value, bool):
+            kinds.add('bool')
+        elif isinstance(value, int):
+            kinds.add('int')
+        elif isinstance(value, float):
+            kinds.add('float')
+        elif isinstance(value, (dict, list)):
+            kinds.add('json')
+        elif value is not None:
+            kinds.add('string')
+    if len(kinds) == 1:
+        return kinds.pop()
+    if kinds == {'int', 'float'}:
+        return 'float'
+    return 'json' if 'json' in kinds else 'string'
+
+
+def parse_timestamp(value):
+    """UTC datetime of an API timestamp ('2022-10-01T02:00:00Z', with or without milliseconds), or None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        stamp = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if stamp.tzinfo is None:
+        return stamp.replace(tzinfo=datetime.timezone.utc)
+    return stamp.astimezone(datetime.timezone.utc)
+
+
+def typed(value, kind):
+    """Column value of a property value for a column type, None when the value does not match it."""
+    if value is None:
+        return None
+    if kind == 'string':
+        return cell(value)
+    if kind == 'json':
+        return json.dumps(value, separators=(',', ':'), sort_keys=True)
+    if kind == 'timestamp':
+        return parse_timestamp(value)
+    if kind == 'bool':
+        return value if isinstance(value, bool) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if kind == 'int':
+        return value if isinstance(value, int) else None
+    return float(value)
+
+
+def flatten_server(server, columns=SERVER_COLUMNS):
+    """Return the row of the servers table of a server record (property values, see typed())."""
+    return {column_name(path): value_at(server, path) for path in columns}
+
+
+def firmware_rows(server, columns=FIRMWARE_COLUMNS):
+    """Return the rows of the firmware table of a server record."""
+    return [dict({'server_id': server.get('id'), 'server_name': server.get('name')},
+                 **{column: component.get(column) for column in columns})
+            for component in server.get('firmwareInventory') or [] if isinstance(component, dict)]
+
+
+class _TableWriter:
+    """Buffer rows and write them as record batches of a fixed schema.
+
+    types: column type of every name, None for the columns typed from the values of the first batch.
+    The file is created with the first batch, once every column has a type.
+    """
+
+    def __init__(self, pa, path, format, names, batch_size, types=None):
+        self.pa = pa
+        self.path = path
+        self.format = format
+        self.names = names
+        self.types = {name: (types or {}).get(name) for name in names}
+        self.schema = None
+        self.batch_size = batch_size
+        self.rows = 0
+        self._columns = {name: [] for name in names}
+        self._buffered = 0
+        self._writer = None
+
+    def _arrow_type(self, kind):
+        pa = self.pa
+        return {'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(),
+                'timestamp': pa.timestamp('ms', tz='UTC')}.get(kind, pa.string())
+
+    def _open(self):
+        for name in self.names:
+            if self.types[name] is None:
+                self.types[name] = infer_type(self._columns[name])
+        self.schema = self.pa.schema([(name, self._arrow_type(self.types[name])) for name in self.names])
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            self._writer = self.pa.ipc.new_file(self.path, self.schema)
+
+    def add(self, row):
+        for name in self.names:
+            self._columns[name].append(row[name])
+        self._buffered += 1
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffered:
+            return
+        if self._writer is None:
+            self._open()
+        arrays = [self.pa.array([typed(value, self.types[name]) for value in self._columns[name]],
+                                type=self.schema.field(name).type) for name in self.names]
+        batch = self.pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if hasattr(self._writer, 'write_batch'):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(self.pa.Table.from_batches([batch]))
+        self.rows += self._buffered
+        self._columns = {name: [] for name in self.names}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        if self._writer is None:
+            self._open()
+        self._writer.close()
+
+
+def export_servers(com, directory, format='parquet', servers=None, columns=SERVER_COLUMNS, batch_size=1000,
+                   page_size=100):
+    """Write the servers and firmware tables to 'directory' and return {table: (path, rows)}.
+
+    com:        COMClient, used to read /servers when 'servers' is not given
+    format:     'parquet' or 'arrow' (Arrow IPC file)
+    servers:    optional iterable of server records, e.g. InventoryMirror.query('servers')
+    columns:    property paths exported in the servers table
+    batch_size: rows per record batch (and Parquet row group)
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    # Imported here so that the other helpers do not require pyarrow
+    import pyarrow as pa
+
+    os.makedirs(directory, exist_ok=True)
+    if servers is None:
+        # Only the top level properties of the exported columns are transferred
+        select = sorted({path.split('/', 1)[0] for path in columns} | {'id', 'name', 'firmwareInventory'})
+        servers = com.iter_collection('/servers', select=select, page_size=page_size)
+
+    paths = {table: os.path.join(directory, table + FORMATS[format]) for table in ('servers', 'firmware')}
+    server_table = _TableWriter(pa, paths['servers'], format, [column_name(path) for path in columns], batch_size,
+                                {column_name(path): COLUMN_TYPES.get(path) for path in columns})
+    firmware_names = ['server_id', 'server_name'] + list(FIRMWARE_COLUMNS)
+    firmware_table = _TableWriter(pa, paths['firmware'], format, firmware_names, batch_size,
+                                  dict.fromkeys(firmware_names, 'string'))
+    try:
+        for server in servers:
+            server_table.add(flatten_server(server, columns))
+            for row in firmware_rows(server):
+                firmware_table.add(row)
+    finally:
+        server_table.close()
+        firmware_table.close()
+    return {'servers': (paths['servers'], server_table.rows), 'firmware': (paths['firmware'], firmware_table.rows)}
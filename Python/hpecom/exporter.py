@@ -0,0 +1,213 @@
+"""
+Prometheus exporter of fleet health metrics, served from a background-refreshed snapshot.
+
+Reading /servers on every scrape takes far longer than a scrape timeout. A FleetExporter reads
+the servers and jobs every 'interval' seconds in a background thread, keeps only the counts by
+label set, and renders the metrics text once per refresh; a scrape of /metrics returns that text
+plus the snapshot age, whatever the size of the fleet.
+
+Metrics:
+   hpecom_servers{health, power_state, connected, model, generation}   servers by label set
+   hpecom_jobs{state}                                                  jobs by state
+   hpecom_up                                                           1 if the last refresh succeeded
+   hpecom_refresh_duration_seconds                                     duration of the last refresh
+   hpecom_last_refresh_timestamp_seconds                               end of the last successful refresh
+   hpecom_refresh_errors_total                                         failed refreshes
+   hpecom_snapshot_age_seconds                                         age of the served snapshot
+
+Example:
+   exporter = FleetExporter(com, interval=300)
+   exporter.serve(port=9877)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .export import value_at
+
+DEFAULT_INTERVAL = 300
+DEFAULT_PORT = 9877
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Label name -> property path of the server records
+SERVER_LABELS = {
+    'health': 'hardware/health/summary',
+    'power_state': 'hardware/powerState',
+    'connected': 'state/connected',
+    'model': 'hardware/model',
+    'generation': 'serverGeneration',
+}
+
+
+def label_value(value):
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif value is None:
+        value = ''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(name + '="' + label_value(value) + '"' for name, value in zip(names, values)) + '}'
+
+
+def metric(lines, name, help, type, samples):
+    """Append the HELP / TYPE / sample lines of a metric; samples is a list of (labels text, value)."""
+    lines.append('# HELP ' + name + ' ' + help)
+    lines.append('# TYPE ' + name + ' ' + type)
+    for label_text, value in samples:
+        lines.append(name + label_text + ' ' + repr(float(value)))
+
+
+class FleetExporter:
+    """Background-refreshed fleet snapshot rendered in the Prometheus text format.
+
+    com:        COMClient
+    interval:   seconds between two refreshes
+    jobs:       also count the jobs by state
+    job_filter: optional filter of the counted jobs, a query.Filter or a string
+    page_size:  page size of the collection reads
+    """
+
+    def __init__(self, com, interval=DEFAULT_INTERVAL, jobs=True, job_filter=None, page_size=100):
+        self.com = com
+        self.interval = interval
+        self.jobs = jobs
+        self.job_filter = job_filter
+        self.page_size = page_size
+        self.up = 0
+        self.refresh_duration = 0.0
+        self.last_refresh = None
+        self.refresh_errors = 0
+        self._body = b''
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def snapshot(self):
+        """Read the collections and return (server counts by label values, job counts by state)."""
+        names = list(SERVER_LABELS)
+        select = sorted({path.split('/', 1)[0] for path in SERVER_LABELS.values()})
+        servers = Counter(tuple(value_at(server, SERVER_LABELS[name]) for name in names)
+                          for server in self.com.iter_collection('/servers', select=select, page_size=self.page_size))
+        jobs = Counter()
+        if self.jobs:
+            jobs = Counter(job.get('state') for job in self.com.iter_collection('/jobs', filter=self.job_filter,
+                                                                                   select=['state'],
+                                                                                   page_size=self.page_size))
+        return servers, jobs
+
+    def render(self, servers, jobs):
+        names = list(SERVER_LABELS)
+        lines = []
+        metric(lines, 'hpecom_servers', 'Servers by health, power state, connection, model and generation.', 'gauge',
+               [(labels(names, key), count) for key, count in sorted(servers.items(), key=lambda item: str(item[0]))])
+        if self.jobs:
+            metric(lines, 'hpecom_jobs', 'Jobs by state.', 'gauge',
+                   [(labels(['state'], [state]), count) for state, count in sorted(jobs.items(), key=lambda item: str(item[0]))])
+        return lines
+
+    def _status_lines(self):
+        lines = []
+        metric(lines, 'hpecom_up', 'Whether the last refresh of the snapshot succeeded.', 'gauge', [('', self.up)])
+        metric(lines, 'hpecom_refresh_duration_seconds', 'Duration of the last refresh.', 'gauge',
+               [('', self.refresh_duration)])
+        metric(lines, 'hpecom_refresh_errors_total', 'Failed refreshes.', 'counter', [('', self.refresh_errors)])
+        if self.last_refresh is not None:
+            metric(lines, 'hpecom_last_refresh_timestamp_seconds', 'End of the last successful refresh.', 'gauge',
+                   [('', self.last_refresh)])
+            metric(lines, 'hpecom_snapshot_age_seconds', 'Age of the served snapshot.', 'gauge',
+                   [('', time.time() - self.last_refresh)])
+        return lines
+
+    def refresh(self):
+        """Read a new snapshot and render it; on error the previous snapshot is kept."""
+        started = time.monotonic()
+        try:
+            body = '\n'.join(self.render(*self.snapshot())) + '\n'
+        except Exception:
+            self.up = 0
+            self.refresh_errors += 1
+            raise
+        finally:
+            self.refresh_duration = time.monotonic() - started
+        self._body = body.encode('utf-8')
+        self.last_refresh = time.time()
+        self.up = 1
+
+    def metrics(self):
+        """Return the /metrics document: the rendered snapshot and the refresh status."""
+        return self._body + ('\n'.join(self._status_lines()) + '\n').encode('utf-8')
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                # Reported by hpecom_up and hpecom_refresh_errors_total, the next interval tries again
+                pass
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background refresh thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='hpecom-exporter', daemon=True)
+            self._thread.start()
+
+    def serve(self, port=DEFAULT_PORT, address=''):
+        """Start the refresh thread and serve /metrics until shutdown() is called."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.metrics()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.start()
+        self._server = ThreadingHTTPServer((address, port), Handler)
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
@@ -0,0 +1,204 @@
+"""
+Per-endpoint instrumentation of the COM API requests.
+
+An Instrumentation attached to a COMClient records every request (retries included) and every
+SSO token fetch:
+- the endpoint template (ids replaced by {id}, e.g. GET /compute-ops-mgmt/v1beta2/jobs/{id}),
+- the method, final status, number of attempts and payload bytes sent and received,
+- the latency, aggregated per endpoint in a cumulative histogram (HISTOGRAM_BOUNDS seconds).
+
+summary() returns the aggregates as a JSON-serializable dict, write_json() / write_at_exit()
+write it to a file. Hooks are callables receiving every RequestRecord: they can time, sample or
+forward the requests; OpenTelemetryHook turns each record into a span when the opentelemetry
+API is installed. An exception raised by a hook is ignored.
+
+Example:
+   instrumentation = Instrumentation(hooks=[OpenTelemetryHook()])
+   instrumentation.write_at_exit('com-requests.json')
+   com = COMClient(ConnectivityEndpoint, APIversion, tokens, instrumentation=instrumentation)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import atexit
+import json
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+HISTOGRAM_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+TOKEN_TEMPLATE = '/as/token.oauth2'
+
+_VERSION = re.compile(r'^v\d+((alpha|beta)\d+)?$')
+_ID = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$|\d')
+
+# method / template: request, status: final HTTP status (None on a connection error), attempts: sends
+# including retries, duration: seconds, bytes_sent / bytes_received: payload sizes, start: time.time()
+# of the first send, error: exception raised, if any
+RequestRecord = namedtuple('RequestRecord', ['method', 'template', 'status', 'attempts', 'duration', 'bytes_sent',
+                                             'bytes_received', 'start', 'error'])
+
+
+def endpoint_template(path):
+    """Return a path with its ids replaced by {id}, e.g. /compute-ops-mgmt/v1beta2/servers/{id}/alerts."""
+    path = path.split('?', 1)[0]
+    return '/'.join(segment if not segment or _VERSION.match(segment) or not _ID.search(segment) else '{id}'
+                    for segment in path.split('/'))
+
+
+class _EndpointStats:
+    __slots__ = ('count', 'errors', 'statuses', 'attempts', 'duration', 'min', 'max', 'buckets', 'bytes_sent',
+                 'bytes_received')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = Counter()
+        self.attempts = 0
+        self.duration = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def add(self, record):
+        self.count += 1
+        if record.error is not None or record.status is None or record.status >= 400:
+            self.errors += 1
+        self.statuses[str(record.status)] += 1
+        self.attempts += record.attempts
+        self.duration += record.duration
+        self.min = record.duration if self.min is None else min(self.min, record.duration)
+        self.max = max(self.max, record.duration)
+        for index, bound in enumerate(HISTOGRAM_BOUNDS):
+            if record.duration <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.bytes_sent += record.bytes_sent
+        self.bytes_received += record.bytes_received
+
+    def as_dict(self):
+        cumulative, histogram = 0, {}
+        for bound, count in zip([str(bound) for bound in HISTOGRAM_BOUNDS] + ['+Inf'], self.buckets):
+            cumulative += count
+            histogram[bound] = cumulative
+        return {'count': self.count, 'errors': self.errors, 'statuses': dict(self.statuses),
+                'retries': self.attempts - self.count, 'total_seconds': round(self.duration, 6),
+                'mean_seconds': round(self.duration / self.count, 6) if self.count else 0.0,
+                'min_seconds': round(self.min or 0.0, 6), 'max_seconds': round(self.max, 6),
+                'histogram': histogram, 'bytes_sent': self.bytes_sent, 'bytes_received': self.bytes_received}
+
+
+class Instrumentation:
+    """Aggregated request statistics and hooks.
+
+    hooks: callables called with every RequestRecord
+    """
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self.started = time.time()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def record(self, record):
+        """Aggregate a RequestRecord and pass it to the hooks."""
+        key = record.method + ' ' + record.template
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+            stats.add(record)
+        for hook in list(self.hooks):
+            try:
+                hook(record)
+            except Exception:
+                pass
+
+    def record_token_fetch(self, start, duration, error=None):
+        """Record a GreenLake SSO token fetch (see TokenProvider.on_fetch)."""
+        self.record(RequestRecord('POST', TOKEN_TEMPLATE, None if error else 200, 1, duration, 0, 0, start, error))
+
+    def summary(self):
+        """Return the statistics per endpoint, slowest total time first."""
+        with self._lock:
+            endpoints = {key: stats.as_dict() for key, stats in self._stats.items()}
+        ordered = dict(sorted(endpoints.items(), key=lambda item: -item[1]['total_seconds']))
+        return {'started': self.started, 'elapsed_seconds': round(time.time() - self.started, 6),
+                'requests': sum(stats['count'] for stats in endpoints.values()),
+                'retries': sum(stats['retries'] for stats in endpoints.values()),
+                'endpoints': ordered}
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_at_exit(self, path):
+        """Write the JSON summary to path when the interpreter exits."""
+        atexit.register(self.write_json, path)
+
+
+class OpenTelemetryHook:
+    """Hook creating one client span per request with the opentelemetry API (pip install opentelemetry-api).
+
+    tracer: an opentelemetry Tracer (default: trace.get_tracer('hpecom'))
+    """
+
+    def __init__(self, tracer=None):
+        # Imported here so that the instrumentation does not require opentelemetry
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer('hpecom')
+
+    def __call__(self, record):
+        start = int(record.start * 1e9)
+        span = self.tracer.start_span(record.method + ' ' + record.template, kind=self._trace.SpanKind.CLIENT,
+                                      start_time=start)
+        span.set_attribute('http.request.method', record.method)
+        span.set_attribute('url.template', record.template)
+        if record.status is not None:
+            span.set_attribute('http.response.status_code', record.status)
+        span.set_attribute('hpecom.attempts', record.attempts)
+        span.set_attribute('hpecom.bytes_sent', record.bytes_sent)
+        span.set_attribute('hpecom.bytes_received', record.bytes_received)
+        if record.error is not None:
+            span.record_exception(record.error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(record.error)))
+        elif record.status is not None and record.status >= 400:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end(end_time=start + int(record.duration * 1e9))
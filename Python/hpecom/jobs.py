@@ -0,0 +1,229 @@
+"""
+Multiplexed job watcher with adaptive polling.
+
+The scripts used to poll one jobUri with fixed sleep(5) / sleep(20) loops. A JobWatcher tracks any
+number of job URIs in a single loop:
+- each job is polled quickly at first, then less and less often while its state does not change
+  (exponential backoff up to max_interval, with jitter so that many jobs do not poll in lockstep),
+  and fast again right after a state change,
+- jobs that reach a terminal state ('complete', 'error') are no longer polled, nor jobs that could
+  not be read max_errors times in a row (e.g. deleted jobs, 404), whose last error is kept in errors,
+- state changes are delivered to callbacks, through the events() generator or through the
+  aevents() async iterator,
+- the due jobs of an iteration are read in parallel with bounded concurrency.
+
+Example:
+   watcher = JobWatcher(com)
+   watcher.watch(jobUri, callback=lambda event: print(event.uri, event.previous_state, '->', event.state))
+   watcher.run()
+   print(watcher.errors.get(jobUri) or watcher.jobs[jobUri]['state'])
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import asyncio
+import random
+import threading
+import time
+from collections import namedtuple
+
+from .bulk import DEFAULT_CONCURRENCY, fetch_many
+
+TERMINAL_STATES = ('complete', 'error')
+
+# uri: job resourceUri, job: last job document, previous_state / state: job states (None before the first read)
+JobEvent = namedtuple('JobEvent', ['uri', 'job', 'previous_state', 'state'])
+
+
+class _WatchedJob:
+    __slots__ = ('uri', 'callbacks', 'job', 'state', 'interval', 'next_poll', 'errors', 'last_error')
+
+    def __init__(self, uri, callback, interval):
+        self.uri = uri
+        self.callbacks = [callback] if callback else []
+        self.job = None
+        self.state = None
+        self.interval = interval
+        self.next_poll = 0.0
+        self.errors = 0
+        self.last_error = None
+
+
+def is_terminal(state, terminal_states=TERMINAL_STATES):
+    return state is not None and str(state).lower() in terminal_states
+
+
+class JobWatcher:
+    """Poll many jobs in one loop with per-job adaptive intervals.
+
+    com:              COMClient
+    on_change:        callback called with a JobEvent for every state change of every job
+    initial_interval: seconds between polls right after a job is added or changes state
+    max_interval:     upper bound of the poll interval of a job whose state does not change
+    factor:           growth of the interval after each poll without state change
+    jitter:           relative random variation applied to every interval (0.2 = +/-20%)
+    concurrency:      maximum number of job reads in flight
+    terminal_states:  states after which a job is no longer polled (compared in lower case)
+    max_errors:       consecutive read errors after which a job is no longer polled (None: never give up)
+    """
+
+    def __init__(self, com, on_change=None, initial_interval=2, max_interval=60, factor=1.5, jitter=0.2,
+                 concurrency=DEFAULT_CONCURRENCY, terminal_states=TERMINAL_STATES, max_errors=5):
+        self.com = com
+        self.on_change = on_change
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.terminal_states = tuple(s.lower() for s in terminal_states)
+        self.max_errors = max_errors
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.polls = 0
+
+    def watch(self, job_uri, callback=None):
+        """Start tracking a job resourceUri. callback is called with the JobEvents of this job only."""
+        with self._lock:
+            watched = self._watched.get(job_uri)
+            if watched is None:
+                self._watched[job_uri] = _WatchedJob(job_uri, callback, self.initial_interval)
+            elif callback:
+                watched.callbacks.append(callback)
+        self._wakeup.set()
+
+    @property
+    def jobs(self):
+        """Last known document of every watched job, by uri."""
+        return {uri: watched.job for uri, watched in self._watched.items()}
+
+    @property
+    def errors(self):
+        """Last read error of the jobs given up after max_errors consecutive read errors, by uri."""
+        return {uri: watched.last_error for uri, watched in self._watched.items() if self._gave_up(watched)}
+
+    @property
+    def pending(self):
+        """Uris of the jobs that are still polled (not terminal, not given up)."""
+        return [uri for uri, watched in self._watched.items() if self._polled(watched)]
+
+    def _gave_up(self, watched):
+        return self.max_errors is not None and watched.errors >= self.max_errors
+
+    def _polled(self, watched):
+        return not is_terminal(watched.state, self.terminal_states) and not self._gave_up(watched)
+
+    def _delay(self, interval):
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def poll_once(self):
+        """Read the jobs that are due and return the list of JobEvents for the states that changed."""
+        now = time.monotonic()
+        with self._lock:
+            due = [w for w in self._watched.values() if self._polled(w) and w.next_poll <= now]
+        if not due:
+            return []
+
+        results = fetch_many(self.com, [w.uri for w in due], concurrency=self.concurrency)
+        self.polls += len(due)
+        now = time.monotonic()
+        events = []
+        for watched, result in zip(due, results):
+            if result.error is not None:
+                watched.errors += 1
+                watched.last_error = result.error
+                watched.interval = min(watched.interval * self.factor, self.max_interval)
+            else:
+                watched.errors = 0
+                watched.job = result.value
+                state = result.value.get('state')
+                if state != watched.state:
+                    events.append(JobEvent(watched.uri, watched.job, watched.state, state))
+                    watched.state = state
+                    watched.interval = self.initial_interval
+                else:
+                    watched.interval = min(watched.interval * self.factor, self.max_interval)
+            watched.next_poll = now + self._delay(watched.interval)
+
+        for event in events:
+            if self.on_change:
+                self.on_change(event)
+            for callback in self._watched[event.uri].callbacks:
+                callback(event)
+        return events
+
+    def _next_due(self):
+        with self._lock:
+            polls = [w.next_poll for w in self._watched.values() if self._polled(w)]
+        return min(polls) if polls else None
+
+    def wait(self, deadline=None):
+        """Sleep until the next job is due, watch() is called or the time.monotonic() deadline.
+
+        Return False, without waiting, when no job is polled anymore or the deadline has passed.
+        """
+        next_due = self._next_due()
+        if next_due is None:
+            return False
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            return False
+        wait = next_due - now
+        if deadline is not None:
+            wait = min(wait, deadline - now)
+        if wait > 0:
+            self._wakeup.clear()
+            self._wakeup.wait(wait)
+        return True
+
+    def events(self, timeout=None):
+        """Yield JobEvents until every watched job is terminal or given up, or until timeout seconds have elapsed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            for event in self.poll_once():
+                yield event
+            if not self.wait(deadline):
+                return
+
+    async def aevents(self, timeout=None):
+        """Async iterator over the JobEvents; the polling runs in the default executor."""
+        loop = asyncio.get_running_loop()
+        generator = self.events(timeout)
+        done = object()
+        while True:
+            event = await loop.run_in_executor(None, next, generator, done)
+            if event is done:
+                return
+            yield event
+
+    def run(self, timeout=None):
+        """Poll until every watched job is terminal or given up (or timeout) and return the last job documents by uri.
+
+        The jobs given up after max_errors consecutive read errors are in errors.
+        """
+        for _ in self.events(timeout):
+            pass
+        return self.jobs
@@ -0,0 +1,125 @@
+"""
+Diff-based, chunked updates of the devices of a group.
+
+Posting the whole device list to /groups/{id}/devices times out on large fleets and sends
+devices that are already members again. sync_group_devices() reads the current members of the
+group, and only sends the difference with the desired device ids:
+- the devices to add are posted to /groups/{id}/devices; with remove=True only, the members
+  missing from the desired ids are posted to /groups/{id}/devices/unassign,
+- each list is cut in chunks of at most 'chunk_size' devices, sent in parallel with at most
+  'concurrency' requests in flight,
+- a chunk that fails with a connection error, a timeout or a 5xx answer (not retried by the
+  RequestScheduler for a POST) is retried 'retries' times with exponential backoff, as well as a
+  429 answer when the client has no scheduler; the other errors (400, 404...) are not retried.
+  The devices of the chunks that still fail are reported in the summary, the other chunks are
+  not affected.
+
+Example:
+   summary = sync_group_devices(com, groupid, [server['id'] for server in DL360Gen10Plus])
+   print(f"Added: {len(summary.added)} - Removed: {len(summary.removed)} - Unchanged: {summary.unchanged}")
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+
+# added / removed: device ids changed, unchanged: number of desired devices already members,
+# failed: list of (operation 'add' or 'remove', device ids of the chunk, error)
+MembershipSummary = namedtuple('MembershipSummary', ['added', 'removed', 'unchanged', 'failed'])
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def group_device_ids(com, group_id):
+    """Return the ids of the current devices of a group."""
+    group = com.get('/groups/' + group_id)
+    return [device['id'] for device in group.get('devices') or []]
+
+
+def _retryable(com, error):
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        # 429 answers are already retried by the scheduler, for every method
+        return status >= 500 or (status == 429 and com.scheduler is None)
+    return False
+
+
+def _send_chunk(com, path, chunk, retries, backoff):
+    attempt = 0
+    while True:
+        try:
+            com.post(path, json={"devices": chunk})
+            return None
+        except Exception as error:
+            if attempt >= retries or not _retryable(com, error):
+                return error
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+            attempt += 1
+
+
+def sync_group_devices(com, group_id, device_ids, remove=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                       concurrency=DEFAULT_CONCURRENCY, retries=2, backoff=1.0):
+    """Add the missing device_ids to a group and return a MembershipSummary.
+
+    remove:      also remove the members that are not in device_ids, so that the group matches
+                 device_ids exactly (default False: the other members are kept)
+    chunk_size:  maximum number of devices per request
+    concurrency: maximum number of requests in flight
+    retries:     retries of a chunk failed with a connection error, a timeout or a 5xx answer
+    """
+    current = set(group_device_ids(com, group_id))
+    desired = list(dict.fromkeys(device_ids))
+    desired_set = set(desired)
+    to_add = [device for device in desired if device not in current]
+    to_remove = sorted(current - desired_set) if remove else []
+
+    work = [('add', '/groups/' + group_id + '/devices', chunk) for chunk in chunks(to_add, chunk_size)]
+    work += [('remove', '/groups/' + group_id + '/devices/unassign', chunk) for chunk in chunks(to_remove, chunk_size)]
+
+    added, removed, failed = [], [], []
+    if work:
+        workers = max(1, min(concurrency, len(work)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hpecom-members') as pool:
+            errors = list(pool.map(lambda item: _send_chunk(com, item[1], item[2], retries, backoff), work))
+        for (operation, _, chunk), error in zip(work, errors):
+            if error is not None:
+                failed.append((operation, chunk, error))
+            elif operation == 'add':
+                added += chunk
+            else:
+                removed += chunk
+    return MembershipSummary(added, removed, len(desired_set & current), failed)
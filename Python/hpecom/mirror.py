@@ -0,0 +1,204 @@
+"""
+Local SQLite mirror of the COM inventory with incremental sync.
+
+Reports used to download the whole /servers collection on every run. An InventoryMirror keeps
+servers, groups, firmware bundles and jobs in a SQLite file of the hpecom cache folder:
+- the first sync() of a collection reads every record,
+- the next ones only request the records whose updatedAt is at or after the high-water mark
+  (the largest updatedAt stored), and upsert them,
+- deletions are detected by comparing the 'total' of the collection with the number of local
+  records (a one item request); when they differ, the ids of the collection are listed with
+  select=id and the local records that are not listed any more are removed. A deletion hidden
+  by a creation in the same interval is only caught by sync(verify=True) or a full sync,
+- queries run locally on the JSON documents with SQLite json_extract().
+
+Example:
+   mirror = InventoryMirror(com)
+   mirror.sync()
+   for server in mirror.find('servers', {'hardware/model': 'ProLiant DL360 Gen10 Plus'}):
+      print(server['name'], server['hardware']['bmc']['ip'])
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import cache_dir, client_key
+from .pagination import get_page
+from .query import Field, query_params
+
+DEFAULT_COLLECTIONS = ('servers', 'groups', 'firmware-bundles', 'jobs')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS resources (
+    collection TEXT NOT NULL,
+    id         TEXT NOT NULL,
+    updated_at TEXT,
+    data       TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS resources_updated_at ON resources (collection, updated_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    collection TEXT PRIMARY KEY,
+    high_water TEXT,
+    synced_at  REAL NOT NULL
+);
+'''
+
+
+def json_path(path):
+    """Return the SQLite JSON path of a property path, e.g. 'hardware/bmc/ip' -> '$.hardware.bmc.ip'."""
+    return '$' + ''.join('."' + part.replace('"', '""') + '"' for part in path.split('/'))
+
+
+class InventoryMirror:
+    """SQLite copy of COM collections, kept up to date with updatedAt deltas.
+
+    com:         COMClient
+    path:        SQLite file (default: <hpecom cache>/mirror/<endpoint and client key>.sqlite)
+    collections: collections synchronized by sync()
+    page_size:   page size of the collection reads
+    """
+
+    def __init__(self, com, path=None, collections=DEFAULT_COLLECTIONS, page_size=100):
+        self.com = com
+        self.path = path or os.path.join(cache_dir('mirror'), client_key(com) + '.sqlite')
+        self.collections = tuple(collections)
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ':memory:':
+            os.chmod(self.path, 0o600)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def high_water(self, collection):
+        """Largest updatedAt synchronized for a collection, None before the first sync."""
+        row = self._db.execute('SELECT high_water FROM sync_state WHERE collection = ?', (collection,)).fetchone()
+        return row['high_water'] if row else None
+
+    def count(self, collection):
+        return self._db.execute('SELECT count(*) FROM resources WHERE collection = ?', (collection,)).fetchone()[0]
+
+    def _upsert(self, collection, items):
+        rows = [(collection, item['id'], item.get('updatedAt'), json.dumps(item, separators=(',', ':')))
+                for item in items]
+        self._db.executemany('INSERT OR REPLACE INTO resources (collection, id, updated_at, data) VALUES (?, ?, ?, ?)',
+                             rows)
+        return len(rows)
+
+    def _remote_total(self, collection):
+        return get_page(self.com, '/' + collection, 0, 1, query_params(select=['id'])).get('total')
+
+    def _remote_ids(self, collection):
+        return {item['id'] for item in self.com.iter_collection('/' + collection, select=['id'],
+                                                                 page_size=self.page_size)}
+
+    def _delete_missing(self, collection, remote_ids):
+        local_ids = [row[0] for row in self._db.execute('SELECT id FROM resources WHERE collection = ?',
+                                                        (collection,))]
+        missing = [(collection, id) for id in local_ids if id not in remote_ids]
+        self._db.executemany('DELETE FROM resources WHERE collection = ? AND id = ?', missing)
+        return len(missing)
+
+    def sync_collection(self, collection, full=False, verify=False):
+        """Synchronize one collection and return {'collection', 'full', 'updated', 'deleted'}.
+
+        full:   read every record and drop the local records that were not returned
+        verify: list the remote ids even when the totals match, to catch every deletion
+        """
+        with self._lock:
+            high_water = None if full else self.high_water(collection)
+            if high_water is None:
+                items = list(self.com.iter_collection('/' + collection, page_size=self.page_size))
+                with self._db:
+                    self._db.execute('DELETE FROM resources WHERE collection = ?', (collection,))
+                    updated = self._upsert(collection, items)
+                deleted = 0
+            else:
+                # 'ge' and not 'gt': records updated in the same second as the high-water mark are read again
+                items = list(self.com.iter_collection('/' + collection, filter=Field('updatedAt').ge(high_water),
+                                                      page_size=self.page_size))
+                with self._db:
+                    updated = self._upsert(collection, items)
+                deleted = 0
+                if verify or self._remote_total(collection) != self.count(collection):
+                    remote_ids = self._remote_ids(collection)
+                    with self._db:
+                        deleted = self._delete_missing(collection, remote_ids)
+
+            with self._db:
+                row = self._db.execute('SELECT max(updated_at) FROM resources WHERE collection = ?',
+                                       (collection,)).fetchone()
+                self._db.execute('INSERT OR REPLACE INTO sync_state (collection, high_water, synced_at) VALUES (?, ?, ?)',
+                                 (collection, row[0], time.time()))
+            return {'collection': collection, 'full': high_water is None, 'updated': updated, 'deleted': deleted}
+
+    def sync(self, collections=None, full=False, verify=False):
+        """Synchronize the collections (default: self.collections) and return their sync reports."""
+        return [self.sync_collection(collection, full=full, verify=verify)
+                for collection in (collections or self.collections)]
+
+    def get(self, collection, id):
+        """Return the local document of a record, or None."""
+        row = self._db.execute('SELECT data FROM resources WHERE collection = ? AND id = ?', (collection, id)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def query(self, collection, where=None, parameters=(), order_by=None):
+        """Return the documents of a collection matching a SQL condition on the 'data' JSON column.
+
+        e.g. mirror.query('servers', "json_extract(data, '$.hardware.powerState') = ?", ('ON',))
+        """
+        sql = 'SELECT data FROM resources WHERE collection = ?'
+        if where:
+            sql += ' AND (' + where + ')'
+        if order_by:
+            sql += ' ORDER BY ' + order_by
+        with self._lock:
+            rows = self._db.execute(sql, (collection,) + tuple(parameters)).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def find(self, collection, equals=None, order_by='name'):
+        """Return the documents whose properties equal the values of 'equals', e.g. {'hardware/model': 'ProLiant DL360 Gen10 Plus'}."""
+        equals = equals or {}
+        where = ' AND '.join('json_extract(data, ?) = ?' for _ in equals)
+        parameters = []
+        for path, value in equals.items():
+            parameters += [json_path(path), value]
+        order = "json_extract(data, '" + json_path(order_by).replace("'", "''") + "')" if order_by else None
+        return self.query(collection, where or None, parameters, order)
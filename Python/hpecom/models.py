@@ -0,0 +1,230 @@
+"""
+Compact resource models with lazily decoded nested sections.
+
+Raw dicts fail late on typos (jobtemplates['item']) and keep every nested level of every record
+as Python objects. The models keep, in __slots__:
+- the scalar properties used by the scripts, under snake_case attribute names (a misspelled
+  attribute raises AttributeError), with the most common nested values lifted to the top level
+  (Server.model, Server.bmc_ip, Server.health...) and repeated strings interned,
+- the large nested sections (hardware, firmwareInventory, host, job data...) as compact JSON
+  bytes, decoded on first access and then kept decoded,
+- every other property in a single lazily decoded 'extra' section, so to_dict() returns the
+  complete record (declared properties missing from the record come back as None).
+
+Example:
+   servers = [Server.from_dict(item) for item in com.iter_collection('/servers')]
+   # or: servers = list(iter_models(com, '/servers'))
+   for server in servers:
+      print(server.name, server.model, server.bmc_ip)
+   print(servers[0].firmware_inventory)        # decoded now
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import sys
+
+from .decode import dumps, loads
+
+
+# Value of the sections missing from the record. A section still held as bytes is not decoded yet:
+# the decoded values are dicts, lists or JSON scalars, never bytes.
+_MISSING = object()
+
+
+class LazySection:
+    """Descriptor decoding a nested JSON section on first access."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def __set_name__(self, owner, name):
+        self.slot = '_' + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if value is _MISSING:
+            return None
+        if isinstance(value, bytes):
+            value = loads(value)
+            setattr(instance, self.slot, value)
+        return value
+
+
+def _path(data, path):
+    for part in path.split('/'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Resource:
+    """Base class of the models.
+
+    FIELDS:   attribute -> property path of the scalar values kept in slots
+    INTERNED: attributes whose string values are interned (few distinct values)
+    SECTIONS: attribute -> property of the nested sections decoded on first access
+    """
+
+    FIELDS = {'id': 'id', 'name': 'name', 'resource_uri': 'resourceUri', 'updated_at': 'updatedAt'}
+    INTERNED = ()
+    SECTIONS = {}
+
+    __slots__ = ('id', 'name', 'resource_uri', 'updated_at', '_extra')
+
+    extra = LazySection(None)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for attribute, key in cls.__dict__.get('SECTIONS', {}).items():
+            section = LazySection(key)
+            section.__set_name__(cls, attribute)
+            setattr(cls, attribute, section)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a model from a record of the API."""
+        instance = cls.__new__(cls)
+        for attribute, path in cls.FIELDS.items():
+            value = _path(data, path) if '/' in path else data.get(path)
+            setattr(instance, attribute, _intern(value) if attribute in cls.INTERNED else value)
+        sections = set(cls.SECTIONS.values())
+        for attribute, key in cls.SECTIONS.items():
+            value = data.get(key, _MISSING)
+            setattr(instance, '_' + attribute, dumps(value) if isinstance(value, (dict, list)) else value)
+        # Top-level properties kept in slots are not repeated in 'extra', nested paths are (their section may be)
+        top_level = {path for path in cls.FIELDS.values() if '/' not in path}
+        extra = {key: value for key, value in data.items() if key not in top_level and key not in sections}
+        instance._extra = dumps(extra) if extra else _MISSING
+        return instance
+
+    def to_dict(self):
+        """Return the complete record as a dict."""
+        data = dict(self.extra or {})
+        for attribute, path in self.FIELDS.items():
+            if '/' not in path:
+                data[path] = getattr(self, attribute)
+        for attribute, key in self.SECTIONS.items():
+            if getattr(self, '_' + attribute) is not _MISSING:
+                data[key] = getattr(self, attribute)
+        return data
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id!r}, name={self.name!r})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.id == other.id
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.id))
+
+
+class Server(Resource):
+    FIELDS = dict(Resource.FIELDS, generation='serverGeneration', serial_number='hardware/serialNumber',
+                  model='hardware/model', power_state='hardware/powerState', health='hardware/health/summary',
+                  bmc_ip='hardware/bmc/ip', connected='state/connected', managed='state/managed',
+                  firmware_bundle_uri='firmwareBundleUri')
+    INTERNED = ('generation', 'model', 'power_state', 'health')
+    SECTIONS = {'hardware': 'hardware', 'firmware_inventory': 'firmwareInventory', 'host': 'host', 'state': 'state',
+                'last_firmware_update': 'lastFirmwareUpdate', 'tags': 'tags'}
+
+    __slots__ = ('generation', 'serial_number', 'model', 'power_state', 'health', 'bmc_ip', 'connected', 'managed',
+                 'firmware_bundle_uri', '_hardware', '_firmware_inventory', '_host', '_state', '_last_firmware_update',
+                 '_tags')
+
+
+class Group(Resource):
+    FIELDS = dict(Resource.FIELDS, firmware_baseline='firmwareBaseline')
+    SECTIONS = {'devices': 'devices', 'tags': 'tags'}
+
+    __slots__ = ('firmware_baseline', '_devices', '_tags')
+
+    @property
+    def device_ids(self):
+        return [device['id'] for device in self.devices or []]
+
+
+class FirmwareBundle(Resource):
+    FIELDS = dict(Resource.FIELDS, release_version='releaseVersion', bundle_type='bundleType')
+    SECTIONS = {'components': 'components'}
+
+    __slots__ = ('release_version', 'bundle_type', '_components')
+
+
+class JobTemplate(Resource):
+    FIELDS = dict(Resource.FIELDS, description='description')
+
+    __slots__ = ('description',)
+
+
+class Job(Resource):
+    FIELDS = dict(Resource.FIELDS, state='state', status='status', job_template_uri='jobTemplateUri',
+                  associated_resource_uri='associatedResourceUri', created_at='createdAt')
+    INTERNED = ('state', 'job_template_uri')
+    SECTIONS = {'data': 'data', 'results': 'results'}
+
+    __slots__ = ('state', 'status', 'job_template_uri', 'associated_resource_uri', 'created_at', '_data', '_results')
+
+
+class Schedule(Resource):
+    FIELDS = dict(Resource.FIELDS, description='description', purpose='purpose',
+                  associated_resource_uri='associatedResourceUri', created_at='createdAt')
+    INTERNED = ('purpose',)
+    SECTIONS = {'schedule': 'schedule', 'operation': 'operation'}
+
+    __slots__ = ('description', 'purpose', 'associated_resource_uri', 'created_at', '_schedule', '_operation')
+
+
+# Collection -> model
+MODELS = {
+    'servers': Server,
+    'groups': Group,
+    'firmware-bundles': FirmwareBundle,
+    'job-templates': JobTemplate,
+    'jobs': Job,
+    'schedules': Schedule,
+}
+
+
+def model_for(path):
+    """Return the model of a collection path, e.g. '/servers' -> Server."""
+    collection = path.strip('/').split('?', 1)[0].split('/')[-1]
+    try:
+        return MODELS[collection]
+    except KeyError:
+        raise ValueError(f"no model for the collection '{collection}'") from None
+
+
+def iter_models(com, path, **kwargs):
+    """Yield the items of a collection as models, see COMClient.iter_collection() for the arguments."""
+    model = model_for(path)
+    for item in com.iter_collection(path, **kwargs):
+        yield model.from_dict(item)
@@ -0,0 +1,124 @@
+"""
+Auto-paginating iterator over the Compute Ops Management collection endpoints.
+
+COM collections (servers, groups, activities, jobs, schedules, firmware-bundles, ...) are
+returned page by page: {"offset": 0, "count": <items in page>, "total": <items in collection>, "items": [...]}.
+Reading only the first page silently truncates large fleets.
+
+iter_collection() yields the items of every page. While the items of one page are consumed,
+the next pages are already being fetched by a small thread pool, and at most 'prefetch' pages
+are held in memory at any time, so memory stays bounded whatever the size of the collection.
+
+Example:
+   for server in iter_collection(com, '/servers', filter="hardware/model eq 'ProLiant DL360 Gen10 Plus'", select=['id', 'name']):
+      print(server['name'])
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .query import query_params
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_PREFETCH = 2
+
+
+def get_page(com, path, offset, limit, params=None):
+    """Return one page of a collection as the decoded JSON document."""
+    query = dict(params or {})
+    query['offset'] = offset
+    query['limit'] = limit
+    return com.get(path, params=query)
+
+
+def iter_collection(com, path, filter=None, select=None, params=None, page_size=DEFAULT_PAGE_SIZE,
+                    prefetch=DEFAULT_PREFETCH):
+    """Yield every item of a COM collection, fetching the next pages concurrently.
+
+    com:       COMClient
+    path:      collection path, e.g. '/servers' or '/activities'
+    filter:    optional server-side filter, a query.Filter or a string, e.g. "source/type eq 'Server'"
+    select:    optional list of properties to return, e.g. ['id', 'name', 'hardware/model']
+    params:    additional query parameters
+    page_size: number of items requested per page ('limit')
+    prefetch:  number of pages fetched ahead of the consumer (0 to fetch sequentially)
+    """
+    query = query_params(filter, select, params)
+
+    first = get_page(com, path, 0, page_size, query)
+    items = first.get('items') or []
+    total = first.get('total')
+    if total is None:
+        # Without a total, keep reading until a page comes back short
+        total = float('inf') if len(items) >= page_size else len(items)
+
+    if not items or len(items) >= total:
+        yield from items
+        return
+    if len(items) < page_size:
+        # The service caps 'limit': continue with the page size it actually returns
+        page_size = len(items)
+    next_offset = page_size
+
+    if prefetch <= 0:
+        yield from items
+        del first, items
+        offset = next_offset
+        while offset < total:
+            page = get_page(com, path, offset, page_size, query).get('items') or []
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+        return
+
+    with ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='hpecom-page') as pool:
+        pending = deque()
+
+        def submit_next():
+            nonlocal next_offset
+            if next_offset < total:
+                pending.append(pool.submit(get_page, com, path, next_offset, page_size, query))
+                next_offset += page_size
+
+        for _ in range(prefetch):
+            submit_next()
+
+        try:
+            yield from items
+            del first, items
+            while pending:
+                page = pending.popleft().result().get('items') or []
+                if len(page) < page_size and total == float('inf'):
+                    # Unknown total: a short page is the last one, drop the speculative requests
+                    yield from page
+                    return
+                submit_next()
+                yield from page
+        finally:
+            for future in pending:
+                future.cancel()
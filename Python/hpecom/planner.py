@@ -0,0 +1,292 @@
+"""
+Staggered GROUP_FW_UPDATE schedules for many groups.
+
+COM-Schedule-Group-firmware-update.py schedules one group at a fixed startAt; copied across groups,
+every group would start at the same time, saturating the iLO repository downloads and rebooting
+whole racks at once. A SchedulePlanner spreads the groups over maintenance windows:
+- the duration of a group update is estimated from its size (duration + per_server * devices),
+- in every window at most 'max_groups' groups and 'max_servers' servers are updated at the same
+  time; the largest groups are placed first, each at the earliest time it fits (a group larger
+  than max_servers runs alone), groups that fit in no window are reported as unplanned,
+- apply() reads the existing GROUP_FW_UPDATE schedules, matched by associatedResourceUri and
+  purpose, and only creates the missing ones and patches the ones that changed; the group
+  baselines and the schedule requests are sent in parallel.
+
+Example:
+   planner = SchedulePlanner(com, daily_windows('2022-10-01T01:00:00', hours=5, count=2),
+                             max_groups=2, max_servers=40, per_server=timedelta(minutes=2))
+   plan = planner.plan({'Production-Group': '2022.03.0', 'Dev-Group': '2022.03.0'})
+   print('\n'.join(format_plan(plan)))
+   print(planner.apply(plan))
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .bulk import DEFAULT_CONCURRENCY
+from .export import parse_timestamp
+from .query import Field
+
+PURPOSE = 'GROUP_FW_UPDATE'
+JOB_TEMPLATE = 'GroupFirmwareUpdate'
+GROUP_URI = '/api/compute/v1/groups/'
+
+MaintenanceWindow = namedtuple('MaintenanceWindow', ['start', 'end'])
+
+# group / baseline: target names, group_id / devices: resolved group and its device ids,
+# start / end: planned update (None when unplanned), window: index of the window
+PlannedGroup = namedtuple('PlannedGroup', ['group', 'baseline', 'group_id', 'devices', 'start', 'end', 'window'])
+
+# planned: PlannedGroups by start time, unplanned: PlannedGroups that fit in no window,
+# errors: list of (group name, error) of the groups that could not be resolved
+SchedulePlan = namedtuple('SchedulePlan', ['planned', 'unplanned', 'errors'])
+
+# created / updated / unchanged: group names, failed: list of (group name, error)
+ScheduleSummary = namedtuple('ScheduleSummary', ['created', 'updated', 'unchanged', 'failed'])
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def daily_windows(start, hours, count):
+    """Return 'count' MaintenanceWindows of 'hours' hours starting every day at 'start'."""
+    start = _datetime(start)
+    return [MaintenanceWindow(start + timedelta(days=day), start + timedelta(days=day, hours=hours))
+            for day in range(count)]
+
+
+def _fits(placed, start, end, size, max_groups, max_servers):
+    """True if a group of 'size' servers can run from start to end next to the placed (start, end, size)."""
+    overlapping = [p for p in placed if p[0] < end and p[1] > start]
+    if not overlapping:
+        return True
+    # The load only increases when an overlapping update starts: check at start and at those times
+    for instant in [start] + [p[0] for p in overlapping if p[0] > start]:
+        running = [p for p in overlapping if p[0] <= instant < p[1]]
+        if len(running) + 1 > max_groups or sum(p[2] for p in running) + size > max_servers:
+            return False
+    return True
+
+
+def stagger(sizes, windows, duration, per_server=timedelta(0), max_groups=2, max_servers=50):
+    """Place update jobs in maintenance windows.
+
+    sizes: {key: number of servers}. Return {key: (start, end, window index)}, keys that fit in no
+    window are left out.
+    """
+    windows = [MaintenanceWindow(_datetime(start), _datetime(end)) for start, end in windows]
+    placed = [[] for _ in windows]
+    result = {}
+    # Largest first: the small groups fill the gaps left next to the large ones
+    for key, size in sorted(sizes.items(), key=lambda item: -item[1]):
+        length = duration + per_server * size
+        # A group larger than max_servers can only run alone
+        limit = max(max_servers, size)
+        for index, window in enumerate(windows):
+            candidates = sorted({window.start} | {p[1] for p in placed[index]})
+            start = next((t for t in candidates
+                          if t + length <= window.end and _fits(placed[index], t, t + length, size, max_groups, limit)),
+                         None)
+            if start is not None:
+                placed[index].append((start, start + length, size))
+                result[key] = (start, start + length, index)
+                break
+    return result
+
+
+def _key(uri):
+    """Group id of an associatedResourceUri, whatever the API prefix."""
+    return (uri or '').rstrip('/').rsplit('/', 1)[-1]
+
+
+class SchedulePlanner:
+    """Plan and apply staggered GROUP_FW_UPDATE schedules.
+
+    com:         COMClient
+    windows:     list of MaintenanceWindow or (start, end), datetimes or ISO 8601 strings
+    max_groups:  maximum number of groups updated at the same time in a window
+    max_servers: maximum number of servers updated at the same time in a window
+    duration:    estimated duration of a group update...
+    per_server:  ...plus this per device of the group
+    interval:    interval of the schedules (None: run once, P7D...)
+    concurrency: maximum number of requests in flight
+    """
+
+    def __init__(self, com, windows, max_groups=2, max_servers=50, duration=timedelta(hours=1),
+                 per_server=timedelta(0), interval=None, concurrency=DEFAULT_CONCURRENCY):
+        if max_groups < 1 or max_servers < 1:
+            raise ValueError('max_groups and max_servers must be at least 1')
+        self.com = com
+        self.windows = [MaintenanceWindow(_datetime(start), _datetime(end)) for start, end in windows]
+        self.max_groups = max_groups
+        self.max_servers = max_servers
+        self.duration = duration
+        self.per_server = per_server
+        self.interval = interval
+        self.concurrency = concurrency
+
+    def _map(self, function, items):
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(items))),
+                                thread_name_prefix='hpecom-planner') as pool:
+            return list(pool.map(function, items))
+
+    def _group(self, target):
+        try:
+            group = self.com.get('/groups/' + self.com.resolver.group_id(target[0]))
+            return group, None
+        except Exception as error:
+            return None, error
+
+    def plan(self, targets):
+        """Read the groups and place their updates in the windows, return a SchedulePlan.
+
+        targets: list of (group name, baseline releaseVersion), or dict {group name: baseline};
+                 a baseline of None keeps the current baseline of the group
+        """
+        targets = list(targets.items()) if isinstance(targets, dict) else [tuple(t) for t in targets]
+        groups, errors = {}, []
+        for (group_name, baseline), (group, error) in zip(targets, self._map(self._group, targets)):
+            if error is not None:
+                errors.append((group_name, error))
+            else:
+                groups[group_name] = (baseline, group)
+
+        sizes = {name: len(group.get('devices') or []) for name, (_, group) in groups.items()}
+        slots = stagger(sizes, self.windows, self.duration, self.per_server, self.max_groups, self.max_servers)
+        planned, unplanned = [], []
+        for name, (baseline, group) in groups.items():
+            devices = [device['id'] for device in group.get('devices') or []]
+            if name in slots:
+                planned.append(PlannedGroup(name, baseline, group['id'], devices, *slots[name]))
+            else:
+                unplanned.append(PlannedGroup(name, baseline, group['id'], devices, None, None, None))
+        planned.sort(key=lambda p: (p.start, p.group))
+        return SchedulePlan(planned, unplanned, errors)
+
+    def schedule_body(self, planned, job_template_id):
+        """Return the /schedules body of a PlannedGroup."""
+        return {
+            "name": "Firmware upgrade for group " + planned.group,
+            "description": "Upgrade to SPP " + planned.baseline if planned.baseline else "Firmware upgrade",
+            "associatedResourceUri": GROUP_URI + planned.group_id,
+            "purpose": PURPOSE,
+            "schedule": {
+                "interval": self.interval,
+                "startAt": planned.start.isoformat(timespec='seconds')
+            },
+            "operation": {
+                "type": "REST",
+                "method": "POST",
+                "uri": "/api/compute/v1/jobs",
+                "body": {
+                    "resourceUri": GROUP_URI + planned.group_id,
+                    "jobTemplateUri": "/api/compute/v1/job-templates/" + job_template_id,
+                    "data": {
+                        "devices": planned.devices,
+                        "parallel": "true",
+                        "stopOnFailure": "false"
+                    }
+                }
+            }
+        }
+
+    def existing_schedules(self):
+        """Return {group id: schedule} of the GROUP_FW_UPDATE schedules."""
+        schedules = {}
+        for schedule in self.com.iter_collection('/schedules', filter=Field('purpose').eq(PURPOSE)):
+            # When a group has several schedules, the first one is kept up to date
+            schedules.setdefault(_key(schedule.get('associatedResourceUri')), schedule)
+        return schedules
+
+    @staticmethod
+    def changes(current, body):
+        """Return the merge-patch turning the schedule 'current' into 'body', {} when nothing changed."""
+        patch = {key: value for key, value in body.items() if key in ('name', 'description', 'operation')
+                 and current.get(key) != value}
+        schedule = current.get('schedule') or {}
+        # startAt may come back with another format (Z suffix, milliseconds, another offset): both are
+        # compared in UTC, a time without offset being UTC as for the API
+        start = parse_timestamp(schedule.get('startAt'))
+        same_start = start is not None and start == parse_timestamp(body['schedule']['startAt'])
+        if not same_start or schedule.get('interval') != body['schedule']['interval']:
+            patch['schedule'] = body['schedule']
+        return patch
+
+    def _baseline(self, planned):
+        bundleid = self.com.resolver.bundle_id(planned.baseline)
+        group = self.com.get('/groups/' + planned.group_id)
+        if group.get('firmwareBaseline') != bundleid:
+            self.com.patch('/groups/' + planned.group_id, json={"firmwareBaseline": bundleid},
+                           headers={"Content-Type": "application/merge-patch+json"})
+
+    def _apply_one(self, item):
+        planned, body, current = item
+        try:
+            if planned.baseline:
+                self._baseline(planned)
+            if current is None:
+                self.com.post('/schedules', json=body)
+                return 'created', None
+            patch = self.changes(current, body)
+            if not patch:
+                return 'unchanged', None
+            self.com.patch('/schedules/' + current['id'], json=patch,
+                           headers={"Content-Type": "application/merge-patch+json"})
+            return 'updated', None
+        except Exception as error:
+            return 'failed', error
+
+    def apply(self, plan):
+        """Create or patch the schedules of the planned groups, return a ScheduleSummary."""
+        job_template_id = self.com.resolver.job_template_id(JOB_TEMPLATE)
+        existing = self.existing_schedules()
+        work = [(planned, self.schedule_body(planned, job_template_id), existing.get(planned.group_id))
+                for planned in plan.planned]
+        summary = ScheduleSummary([], [], [], [])
+        for (planned, _, _), (outcome, error) in zip(work, self._map(self._apply_one, work)):
+            if error is not None:
+                summary.failed.append((planned.group, error))
+            else:
+                getattr(summary, outcome).append(planned.group)
+        return summary
+
+
+def format_plan(plan):
+    """Return the schedule plan as a list of lines."""
+    lines = []
+    for planned in plan.planned:
+        lines.append(f"{planned.start:%Y-%m-%d %H:%M} - {planned.end:%H:%M}  Window {planned.window + 1}  "
+                     f"Group: {planned.group} ({len(planned.devices)} servers) - Baseline: {planned.baseline}")
+    for planned in plan.unplanned:
+        lines.append(f"Unplanned: {planned.group} ({len(planned.devices)} servers) does not fit in the windows")
+    for group_name, error in plan.errors:
+        lines.append(f"Error: {group_name} - {error}")
+    return lines
@@ -0,0 +1,302 @@
+"""
+Per-device progress of a firmware update.
+
+During a group update the scripts used to print the /ui-doorway/compute/v1/servers/counts/state
+counters of the whole account, which do not say which device of the job is stuck. A
+FirmwareProgress follows only the devices of the job:
+- their state is read in batches, one request per batch_size devices (filter on the ids, select
+  of the tracked properties only), the batches in parallel,
+- every poll is compared with the previous snapshot and only the changes are emitted, as dicts
+  ready to be written as JSON lines,
+- every device goes through the phases pending -> updating -> done / failed (from its
+  lastFirmwareUpdate), or 'unchanged' when the job ends without touching it,
+- the records carry the time spent in the previous phase, the update duration of the finished
+  devices, the counts per phase and an ETA (median duration of the finished devices applied to
+  the devices still pending or updating, as the devices of a group are updated in parallel).
+
+Example:
+   progress = FirmwareProgress(com, deviceids, job_uri=jobUri)
+   for change in progress.follow(interval=20):
+      print(json.dumps(change), flush=True)
+   print(progress.summary())
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import calendar
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .export import value_at
+from .jobs import is_terminal
+from .membership import chunks
+from .query import Field
+
+# Properties read at every poll, the changes of all of them except the name are reported
+DEFAULT_FIELDS = ['name', 'hardware/powerState', 'hardware/health/summary', 'state/connected',
+                  'lastFirmwareUpdate/status', 'lastFirmwareUpdate/attemptedAt', 'lastFirmwareUpdate/updatedAt']
+
+FINAL_PHASES = ('done', 'failed', 'unchanged')
+PHASES = ('pending', 'updating') + FINAL_PHASES
+
+
+def parse_time(value):
+    """Epoch seconds of an API timestamp ('2022-10-01T02:00:00Z', with or without milliseconds), or None."""
+    try:
+        return calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _iso(timestamp):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+def device_phase(device, baseline, since):
+    """Phase of a device from its lastFirmwareUpdate.
+
+    baseline: lastFirmwareUpdate of the device when the tracking started, a report equal to it is
+              only taken into account when it is more recent than 'since' (epoch seconds)
+    """
+    report = device.get('lastFirmwareUpdate') or {}
+    status = str(report.get('status') or '').lower()
+    if not status:
+        return 'pending'
+    if report == baseline:
+        reported = parse_time(report.get('updatedAt') or report.get('attemptedAt'))
+        if reported is None or reported < since:
+            return 'pending'
+    if 'progress' in status or 'running' in status:
+        return 'updating'
+    if 'fail' in status or 'error' in status:
+        return 'failed'
+    return 'done'
+
+
+class FirmwareProgress:
+    """Per-device progress of the firmware update of a set of devices.
+
+    com:         COMClient
+    device_ids:  ids of the devices of the job
+    job_uri:     optional job, follow() stops once it is complete or in error
+    max_errors:  consecutive read errors of the job after which follow() stops (None: never give up)
+    fields:      property paths read and compared at every poll
+    batch_size:  devices per request
+    concurrency: maximum number of batch requests in flight
+    since:       epoch seconds of the start of the update (default: createdAt of the job, or now)
+    """
+
+    def __init__(self, com, device_ids, job_uri=None, fields=DEFAULT_FIELDS, batch_size=50, concurrency=4,
+                 since=None, max_errors=5):
+        self.com = com
+        self.device_ids = list(dict.fromkeys(device_ids))
+        self.job_uri = job_uri
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.since = since
+        self.max_errors = max_errors
+        self.job = None
+        self.job_errors = 0     # consecutive read errors of the job
+        self.job_error = None   # last read error of the job, None after a successful read
+        self.snapshot = {}      # device id -> last read properties
+        self.phases = {}        # device id -> phase
+        self.entered = {}       # device id -> time the device entered its phase
+        self.started = {}       # device id -> start of its update
+        self.durations = {}     # device id -> update duration of the finished devices
+        self.baselines = {}     # device id -> lastFirmwareUpdate when the tracking started
+        self.errors = []        # errors of the batches of the last poll
+
+    def _read_batch(self, batch):
+        select = ['id'] + self.fields
+        try:
+            return list(self.com.iter_collection('/servers', filter=Field('id').any_of(batch), select=select,
+                                                 page_size=len(batch))), None
+        except Exception as error:
+            return [], error
+
+    def read_job(self):
+        """Read the job into self.job, return False (and count the error) when the read fails."""
+        try:
+            self.job = self.com.get(self.job_uri)
+        except Exception as error:
+            self.job_errors += 1
+            self.job_error = error
+            return False
+        self.job_errors = 0
+        self.job_error = None
+        return True
+
+    def read(self):
+        """Read the tracked properties of every device, return {device id: properties}."""
+        batches = chunks(self.device_ids, self.batch_size)
+        if not batches:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(batches))),
+                                thread_name_prefix='hpecom-progress') as pool:
+            results = list(pool.map(self._read_batch, batches))
+        self.errors = [error for _, error in results if error is not None]
+        return {device['id']: device for devices, _ in results for device in devices}
+
+    def _record(self, now, device_id, device, phase, previous, changes):
+        # The counts and the ETA are added once the whole poll is processed, see _complete()
+        return {
+            'time': _iso(now),
+            'device': device_id,
+            'name': value_at(device, 'name'),
+            'phase': phase,
+            'previous_phase': previous,
+            'changes': changes,
+            'phase_time': round(now - self.entered[device_id], 1) if previous is not None else None,
+            'duration': round(self.durations[device_id], 1) if device_id in self.durations else None,
+        }
+
+    def _complete(self, now, records):
+        counts, eta = self.counts(), self.eta(now)
+        for record in records:
+            record.update(counts)
+            record['eta'] = eta
+        return records
+
+    def _enter(self, now, device_id, device, phase):
+        previous = self.phases.get(device_id)
+        report = device.get('lastFirmwareUpdate') or {}
+        if phase in ('updating', 'done', 'failed') and device_id not in self.started:
+            # attemptedAt is the real start of the update, when the device went unnoticed through 'updating'
+            self.started[device_id] = parse_time(report.get('attemptedAt')) or now
+        if phase in ('done', 'failed') and device_id in self.started:
+            end = parse_time(report.get('updatedAt')) or now
+            self.durations[device_id] = max(0.0, float(end - self.started[device_id]))
+        self.phases[device_id] = phase
+        return previous
+
+    def poll(self):
+        """Read the devices once, return the list of change records (every device on the first poll)."""
+        now = time.time()
+        if self.since is None:
+            if self.job is None and self.job_uri:
+                self.read_job()
+            self.since = parse_time((self.job or {}).get('createdAt')) or now
+        current = self.read()
+        records = []
+        for device_id in self.device_ids:
+            device = current.get(device_id)
+            if device is None:
+                continue
+            previous_device = self.snapshot.get(device_id)
+            if previous_device is None:
+                self.baselines[device_id] = device.get('lastFirmwareUpdate')
+            phase = device_phase(device, self.baselines.get(device_id), self.since)
+            changes = {}
+            if previous_device is not None:
+                for path in self.fields:
+                    if path == 'name':
+                        continue
+                    before, after = value_at(previous_device, path), value_at(device, path)
+                    if before != after:
+                        changes[path] = [before, after]
+            self.snapshot[device_id] = device
+            if previous_device is not None and not changes and phase == self.phases.get(device_id):
+                continue
+            previous = self._enter(now, device_id, device, phase) if phase != self.phases.get(device_id) \
+                else phase
+            records.append(self._record(now, device_id, device, phase, previous, changes))
+            if previous != phase:
+                self.entered[device_id] = now
+        return self._complete(now, records)
+
+    def finish(self):
+        """Mark the devices still pending as 'unchanged' (the job ended without updating them)."""
+        now = time.time()
+        records = []
+        for device_id in self.device_ids:
+            if self.phases.get(device_id) == 'pending':
+                previous = self._enter(now, device_id, self.snapshot[device_id], 'unchanged')
+                records.append(self._record(now, device_id, self.snapshot[device_id], 'unchanged', previous, {}))
+                self.entered[device_id] = now
+        return self._complete(now, records)
+
+    def counts(self):
+        counts = {phase: 0 for phase in PHASES}
+        for phase in self.phases.values():
+            counts[phase] += 1
+        counts['total'] = len(self.device_ids)
+        return counts
+
+    def eta(self, now=None):
+        """Estimated seconds until the last device is updated, None until a device has finished."""
+        now = now or time.time()
+        remaining = [device_id for device_id in self.device_ids if self.phases.get(device_id) not in FINAL_PHASES]
+        if not remaining:
+            return 0
+        if not self.durations:
+            return None
+        median = statistics.median(self.durations.values())
+        # The devices are updated in parallel: the last one to finish gives the ETA
+        return round(max(max(0, median - (now - self.started[device_id])) if device_id in self.started else median
+                         for device_id in remaining), 1)
+
+    @property
+    def finished(self):
+        return len(self.phases) == len(self.device_ids) and all(p in FINAL_PHASES for p in self.phases.values())
+
+    def follow(self, interval=20, timeout=None):
+        """Poll every 'interval' seconds and yield the change records, until the job is complete or
+        in error (every device is finished when there is no job_uri), or timeout seconds.
+
+        The job is read after every poll, so self.job is the last state of the job on return. A job
+        that cannot be read max_errors times in a row (e.g. deleted, 404) also stops the follow, its
+        last read error is in self.job_error."""
+        end = time.monotonic() + timeout if timeout else None
+        while True:
+            yield from self.poll()
+            if self.job_uri:
+                # The devices are usually finished a bit before the job is marked complete
+                if self.read_job():
+                    if is_terminal(self.job.get('state')):
+                        # Last read: the job may have ended between the poll and the job read
+                        yield from self.poll()
+                        yield from self.finish()
+                        return
+                elif self.max_errors is not None and self.job_errors >= self.max_errors:
+                    return
+            elif self.finished:
+                return
+            if end is not None and time.monotonic() + interval > end:
+                return
+            time.sleep(interval)
+
+    def summary(self):
+        """Counts per phase, update durations and devices that did not finish well."""
+        durations = list(self.durations.values())
+        return {
+            'counts': self.counts(),
+            'median_duration': round(statistics.median(durations), 1) if durations else None,
+            'max_duration': round(max(durations), 1) if durations else None,
+            'failed': [value_at(self.snapshot.get(d, {}), 'name') or d for d, p in self.phases.items() if p == 'failed'],
+            'not_finished': [value_at(self.snapshot.get(d, {}), 'name') or d for d in self.device_ids
+                             if self.phases.get(d) not in FINAL_PHASES],
+        }
@@ -0,0 +1,161 @@
+"""
+Query builder for the 'filter' and 'select' parameters of the COM collection endpoints.
+
+Filtering on the server side and projecting only the needed properties keeps large fleets from
+moving full 'hardware', 'firmwareInventory' and 'host' blobs that are then thrown away.
+
+Filters use the OData-like syntax of the API, with string literals quoted and escaped:
+   Field('hardware/model').eq('ProLiant DL360 Gen10 Plus')      -> hardware/model eq 'ProLiant DL360 Gen10 Plus'
+   Field('source/type').eq('Server') & contains('key', 'SERVER_ASSIGNED')
+                                                                 -> source/type eq 'Server' and contains(key,'SERVER_ASSIGNED')
+
+Example:
+   DL360 = Field('hardware/model').eq('ProLiant DL360 Gen10 Plus')
+   for server in com.iter_collection('/servers', filter=DL360, select=['id', 'name', 'hardware/bmc/ip']):
+      print(server['name'])
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+from urllib.parse import quote
+
+# Characters left as is in query values: they are valid in a URL query and keep filters readable in logs
+QUERY_SAFE = "/,()'*:"
+
+
+def literal(value):
+    """Return the filter literal of a Python value."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class Filter:
+    """Filter expression that can be combined with & (and), | (or) and ~ (not)."""
+
+    def __init__(self, expression, operator=None):
+        self.expression = expression
+        self.operator = operator
+
+    def _operand(self, operator):
+        if self.operator is not None and self.operator != operator:
+            return '(' + self.expression + ')'
+        return self.expression
+
+    def _combine(self, other, operator):
+        if not isinstance(other, Filter):
+            other = Filter(str(other), 'raw')
+        return Filter(self._operand(operator) + ' ' + operator + ' ' + other._operand(operator), operator)
+
+    def __and__(self, other):
+        return self._combine(other, 'and')
+
+    def __or__(self, other):
+        return self._combine(other, 'or')
+
+    def __invert__(self):
+        return Filter('not (' + self.expression + ')')
+
+    def __str__(self):
+        return self.expression
+
+    def __repr__(self):
+        return 'Filter(' + repr(self.expression) + ')'
+
+
+class Field:
+    """Property path of a resource, e.g. Field('hardware/model') or Field('state/connected')."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _compare(self, operator, value):
+        return Filter(self.path + ' ' + operator + ' ' + literal(value))
+
+    def eq(self, value):
+        return self._compare('eq', value)
+
+    def ne(self, value):
+        return self._compare('ne', value)
+
+    def gt(self, value):
+        return self._compare('gt', value)
+
+    def ge(self, value):
+        return self._compare('ge', value)
+
+    def lt(self, value):
+        return self._compare('lt', value)
+
+    def le(self, value):
+        return self._compare('le', value)
+
+    def contains(self, value):
+        return contains(self.path, value)
+
+    def any_of(self, values):
+        """Field equal to one of the values (or-ed eq comparisons)."""
+        filters = [self.eq(value) for value in values]
+        if not filters:
+            raise ValueError('any_of() requires at least one value')
+        result = filters[0]
+        for f in filters[1:]:
+            result = result | f
+        return result
+
+
+def contains(path, value):
+    return Filter('contains(' + path + ',' + literal(value) + ')')
+
+
+def all_of(*filters):
+    """Combine filters with 'and', ignoring None."""
+    filters = [f for f in filters if f is not None]
+    if not filters:
+        return None
+    result = filters[0] if isinstance(filters[0], Filter) else Filter(str(filters[0]), 'raw')
+    for f in filters[1:]:
+        result = result & f
+    return result
+
+
+def query_params(filter=None, select=None, params=None):
+    """Return the query parameters dict for a filter (Filter or str) and a select (list or str)."""
+    query = dict(params or {})
+    if filter is not None:
+        query['filter'] = str(filter)
+    if select:
+        query['select'] = select if isinstance(select, str) else ','.join(select)
+    return query
+
+
+def encode_query(params):
+    """URL-encode query parameters with %20 for spaces, as expected by the API for filter expressions."""
+    return '&'.join(quote(str(key), safe='') + '=' + quote(str(value), safe=QUERY_SAFE)
+                    for key, value in params.items() if value is not None)
@@ -0,0 +1,253 @@
+"""
+Several regional COM instances queried concurrently.
+
+The servers of an account can be spread across regional COM instances (us-west2, eu-central1,
+ap-northeast1...), each with its own connectivity endpoint. A MultiRegionClient holds one COMClient
+per region, all sharing one TokenProvider (the GreenLake SSO token is valid for every region):
+- iter_collection() reads a collection from every region at the same time and yields a single
+  stream of RegionItem(region, item) in arrival order,
+- map() runs a function with the client of every region at the same time,
+- every region has its own connection pool / concurrency, request timeout and deadline (options
+  per region override the defaults), so a slow or unreachable region neither stalls nor fails
+  the others: its error is recorded in the 'errors' of the stream and the other regions go on.
+
+Example:
+   regions = MultiRegionClient({'us-west': "https://us-west2-api.compute.cloud.hpe.com",
+                                'eu-central': "https://eu-central1-api.compute.cloud.hpe.com"},
+                               "v1beta1", tokens, options={'eu-central': {'timeout': (10, 120)}})
+   servers = regions.iter_collection('/servers')
+   for region, server in servers:
+      print(region, server['name'])
+   print(servers.counts, servers.errors)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import concurrent.futures
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from .client import DEFAULT_TIMEOUT, COMClient
+
+RegionItem = namedtuple('RegionItem', ['region', 'item'])
+
+# value: return value of the function (None on error), error: exception or None, duration: seconds
+RegionResult = namedtuple('RegionResult', ['value', 'error', 'duration'])
+
+# End of the items of a region
+_Done = namedtuple('_Done', ['region'])
+
+
+class RegionTimeout(TimeoutError):
+    """A region did not answer within its deadline."""
+
+
+def region_name(endpoint):
+    """Region of a connectivity endpoint, e.g. 'https://us-west2-api.compute.cloud.hpe.com' -> 'us-west2'."""
+    host = endpoint.split('://', 1)[-1].split('/', 1)[0]
+    label = host.split('.', 1)[0]
+    return label[:-len('-api')] if label.endswith('-api') else host
+
+
+class RegionStream:
+    """Iterator over the merged RegionItems of a collection read from every region.
+
+    Once consumed, 'counts' holds the number of items per region and 'errors' the exception of
+    each region that failed or missed its deadline. The deadline of a region is enforced on the
+    stream side: the stream ends on time even if a request of the region is still waiting for its
+    timeout, the late items are dropped. Stopping the iteration early (break, close()) stops the
+    readers of every region.
+    """
+
+    def __init__(self, clients, path, deadlines, buffer, **kwargs):
+        self.counts = {region: 0 for region in clients}
+        self.errors = {}
+        self._queue = queue.Queue(maxsize=buffer)
+        self._stop = threading.Event()
+        self._pending = set(clients)
+        now = time.monotonic()
+        self._ends = {region: now + deadline for region, deadline in deadlines.items()
+                      if deadline and region in clients}
+        self._deadlines = deadlines
+        self._threads = [threading.Thread(target=self._read, args=(region, com, path, kwargs),
+                                          name='hpecom-region-' + region, daemon=True)
+                         for region, com in clients.items()]
+        for thread in self._threads:
+            thread.start()
+
+    def _put(self, value):
+        # Bounded queue: a slow consumer slows the readers down, a stopped one releases them
+        while not self._stop.is_set():
+            try:
+                self._queue.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _timeout(self, region):
+        return RegionTimeout(f"region '{region}' exceeded its deadline of {self._deadlines[region]} seconds")
+
+    def _read(self, region, com, path, kwargs):
+        end = self._ends.get(region)
+        try:
+            for item in com.iter_collection(path, **kwargs):
+                if end is not None and time.monotonic() > end:
+                    raise self._timeout(region)
+                if not self._put(RegionItem(region, item)):
+                    return
+        except Exception as error:
+            self.errors.setdefault(region, error)
+        finally:
+            self._put(_Done(region))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self._pending:
+            ends = [self._ends[region] for region in self._pending if region in self._ends]
+            wait = max(0.0, min(ends) - time.monotonic()) if ends else None
+            try:
+                value = self._queue.get(timeout=wait)
+            except queue.Empty:
+                for region in [r for r in self._pending if self._ends.get(r, float('inf')) <= time.monotonic()]:
+                    self.errors.setdefault(region, self._timeout(region))
+                    self._pending.discard(region)
+                continue
+            if value.region not in self._pending:
+                continue
+            if isinstance(value, _Done):
+                self._pending.discard(value.region)
+                continue
+            self.counts[value.region] += 1
+            return value
+        self._stop.set()
+        raise StopIteration
+
+    def close(self):
+        """Stop the readers of every region."""
+        self._stop.set()
+        self._pending.clear()
+
+    def __del__(self):
+        self._stop.set()
+
+
+class MultiRegionClient:
+    """One COMClient per regional connectivity endpoint, sharing one token provider.
+
+    endpoints:    {region name: connectivity endpoint}, or a list of endpoints (named by region_name())
+    api_version:  API version of every region
+    access_token: TokenProvider (or static token) shared by every region
+    pool_size:    default maximum number of concurrent requests / connections per region
+    timeout:      default (connect, read) timeout of the requests
+    deadline:     default maximum duration in seconds of a collection read or map() call in a region
+                  (None: no deadline)
+    options:      per-region overrides, e.g. {'eu-central1': {'pool_size': 4, 'timeout': (10, 120),
+                  'deadline': 300}}; other keys are passed to the COMClient of the region
+    client_options: keyword arguments of every COMClient (api_versions, instrumentation, fast_json...)
+    """
+
+    def __init__(self, endpoints, api_version="v1beta1", access_token=None, pool_size=10, timeout=DEFAULT_TIMEOUT,
+                 deadline=None, options=None, **client_options):
+        if not isinstance(endpoints, dict):
+            names = [region_name(endpoint) for endpoint in endpoints]
+            if len(set(names)) != len(names):
+                raise ValueError('several endpoints have the same region name, name them with a dict')
+            endpoints = dict(zip(names, endpoints))
+        if not endpoints:
+            raise ValueError('at least one connectivity endpoint is required')
+        options = options or {}
+        unknown = set(options) - set(endpoints)
+        if unknown:
+            raise ValueError(f"options for unknown regions: {', '.join(sorted(unknown))}")
+        self.clients = {}
+        self.deadlines = {}
+        for region, endpoint in endpoints.items():
+            settings = dict(client_options, pool_size=pool_size, timeout=timeout)
+            settings.update(options.get(region, {}))
+            self.deadlines[region] = settings.pop('deadline', deadline)
+            self.clients[region] = COMClient(endpoint, api_version, access_token, **settings)
+
+    @property
+    def regions(self):
+        return list(self.clients)
+
+    def __getitem__(self, region):
+        return self.clients[region]
+
+    def iter_collection(self, path, buffer=1000, **kwargs):
+        """Return a RegionStream of the items of a collection in every region.
+
+        buffer: maximum number of items read ahead of the consumer
+        kwargs: filter, select, params, page_size, prefetch (see COMClient.iter_collection())
+        """
+        return RegionStream(self.clients, path, self.deadlines, buffer, **kwargs)
+
+    def map(self, function):
+        """Call function(com) for every region at the same time, return {region: RegionResult}.
+
+        A region that misses its deadline gets a RegionTimeout error; its call keeps running in
+        the background until its request timeout.
+        """
+        results = {}
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(self.clients), thread_name_prefix='hpecom-region')
+
+        def timed(com):
+            start = time.monotonic()
+            return function(com), time.monotonic() - start
+
+        futures = {region: pool.submit(timed, com) for region, com in self.clients.items()}
+        start = time.monotonic()
+        for region, future in futures.items():
+            deadline = self.deadlines[region]
+            try:
+                remaining = None if deadline is None else max(0.0, deadline - (time.monotonic() - start))
+                value, duration = future.result(timeout=remaining)
+                results[region] = RegionResult(value, None, duration)
+            except concurrent.futures.TimeoutError:
+                results[region] = RegionResult(None, RegionTimeout(
+                    f"region '{region}' exceeded its deadline of {deadline} seconds"), time.monotonic() - start)
+            except Exception as error:
+                results[region] = RegionResult(None, error, time.monotonic() - start)
+        pool.shutdown(wait=False)
+        return results
+
+    def get(self, path, **kwargs):
+        """GET a path in every region, return {region: RegionResult}."""
+        return self.map(lambda com: com.get(path, **kwargs))
+
+    def close(self):
+        for com in self.clients.values():
+            com.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
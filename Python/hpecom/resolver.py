@@ -0,0 +1,204 @@
+"""
+Name to ID resolver for groups, job templates, firmware bundles and filters.
+
+The scripts used to download a whole collection each time they needed one record, e.g.
+[jt for jt in jobtemplates['items'] if jt['name'] == 'GroupFirmwareUpdate']. The Resolver reads
+each collection once, in a single pass, and builds dict indexes:
+- name -> id              (groups, job-templates, firmware-bundles, filters)
+- releaseVersion -> id    (firmware-bundles)
+- resourceUri -> id
+
+The indexes are kept in the hpecom cache folder with a TTL, so repeated runs and batch jobs
+resolve names without any network call. A name missing from a cached index triggers one
+refresh before ResourceNotFound is raised; a name shared by several records raises
+DuplicateResourceName.
+
+Example:
+   resolver = Resolver(com)
+   jobtemplateUri = resolver.job_template_uri('GroupFirmwareUpdate')
+   groupid = resolver.group_id('Production-Group')
+   bundleid = resolver.bundle_id('2022.03.0')
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import os
+import threading
+import time
+
+from .cache import cache_dir, client_key, read_json, write_json_private
+
+# Default time to live of the on-disk indexes, in seconds
+DEFAULT_TTL = 3600
+
+# Record keys that can be used to look up an id, per collection
+INDEX_KEYS = {
+    'groups': ('name',),
+    'job-templates': ('name',),
+    'firmware-bundles': ('releaseVersion', 'name'),
+    'filters': ('name',),
+}
+
+# Names used in error messages
+LABELS = {
+    'groups': 'group name',
+    'job-templates': 'job template',
+    'firmware-bundles': 'firmware bundle',
+    'filters': 'filter',
+}
+
+# Fields kept from each record in the indexes
+RECORD_FIELDS = ('id', 'name', 'releaseVersion', 'resourceUri')
+
+
+class ResourceNotFound(LookupError):
+    pass
+
+
+class DuplicateResourceName(LookupError):
+    pass
+
+
+class Index:
+    """In-memory indexes of one collection."""
+
+    def __init__(self, collection, records, fetched_at):
+        self.collection = collection
+        self.records = records
+        self.fetched_at = fetched_at
+        self.by_id = {}
+        self.by_uri = {}
+        self.by_key = {key: {} for key in INDEX_KEYS.get(collection, ('name',))}
+        for record in records:
+            self.by_id[record['id']] = record
+            if record.get('resourceUri'):
+                self.by_uri[record['resourceUri']] = record['id']
+            for key, index in self.by_key.items():
+                if record.get(key) is not None:
+                    index.setdefault(record[key], []).append(record['id'])
+
+    def lookup(self, value, key='name'):
+        """Return the list of ids matching value for key ('name', 'releaseVersion', 'resourceUri' or 'id')."""
+        if key == 'id':
+            return [value] if value in self.by_id else []
+        if key == 'resourceUri':
+            return [self.by_uri[value]] if value in self.by_uri else []
+        return self.by_key.get(key, {}).get(value, [])
+
+
+class Resolver:
+    """Cached name to id resolution for the collections listed in INDEX_KEYS.
+
+    com:       COMClient
+    ttl:       seconds during which an index is reused without network call
+    use_cache: persist the indexes in the hpecom cache folder
+    """
+
+    def __init__(self, com, ttl=DEFAULT_TTL, use_cache=True):
+        self.com = com
+        self.ttl = ttl
+        self.use_cache = use_cache
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _cache_file(self, collection):
+        # Indexes are specific to an endpoint and to the account behind the API client
+        return os.path.join(cache_dir('indexes'), client_key(self.com) + '-' + collection + '.json')
+
+    def _fresh(self, index):
+        return index is not None and time.time() - index.fetched_at < self.ttl
+
+    def index(self, collection, refresh=False):
+        """Return the Index of a collection, from memory, from the disk cache or from the API."""
+        with self._lock:
+            index = self._indexes.get(collection)
+            if not refresh and self._fresh(index):
+                return index
+            if not refresh and self.use_cache:
+                cached = read_json(self._cache_file(collection))
+                if cached:
+                    index = Index(collection, cached['records'], cached['fetched_at'])
+                    if self._fresh(index):
+                        self._indexes[collection] = index
+                        return index
+
+            records = [{field: item.get(field) for field in RECORD_FIELDS if field in item}
+                       for item in self.com.iter_collection('/' + collection)]
+            index = Index(collection, records, time.time())
+            self._indexes[collection] = index
+            if self.use_cache:
+                write_json_private(self._cache_file(collection), {'fetched_at': index.fetched_at, 'records': records})
+            return index
+
+    def invalidate(self, collection=None):
+        """Drop the in-memory and on-disk indexes of one collection, or of all of them."""
+        with self._lock:
+            for name in ([collection] if collection else list(INDEX_KEYS)):
+                self._indexes.pop(name, None)
+                if self.use_cache:
+                    try:
+                        os.unlink(self._cache_file(name))
+                    except OSError:
+                        pass
+
+    def record(self, collection, value, key='name'):
+        """Return the indexed record {id, name, resourceUri...} matching value for key."""
+        ids = self.index(collection).lookup(value, key)
+        if not ids:
+            # The cached index may predate the record, look again once from the API
+            ids = self.index(collection, refresh=True).lookup(value, key)
+        label = LABELS.get(collection, collection)
+        if not ids:
+            raise ResourceNotFound(f"{label} '{value}' not found!")
+        if len(ids) > 1:
+            raise DuplicateResourceName(f"{label} '{value}' is not unique, it matches {len(ids)} records: {', '.join(ids)}")
+        return self._indexes[collection].by_id[ids[0]]
+
+    def id(self, collection, value, key='name'):
+        return self.record(collection, value, key)['id']
+
+    def uri(self, collection, value, key='name'):
+        return self.record(collection, value, key)['resourceUri']
+
+    def group_id(self, name):
+        return self.id('groups', name)
+
+    def group_uri(self, name):
+        return self.uri('groups', name)
+
+    def job_template_id(self, name):
+        return self.id('job-templates', name)
+
+    def job_template_uri(self, name):
+        return self.uri('job-templates', name)
+
+    def filter_uri(self, name):
+        return self.uri('filters', name)
+
+    def bundle_id(self, release_version):
+        return self.id('firmware-bundles', release_version, key='releaseVersion')
+
+    def bundle_uri(self, release_version):
+        return self.uri('firmware-bundles', release_version, key='releaseVersion')
@@ -0,0 +1,199 @@
+"""
+Multi-group firmware rollout with bounded concurrency and an optional canary group.
+
+COM-Group-firmware-update.py updates one group to one baseline. A FirmwareRollout takes a list of
+(group name, baseline) targets and submits one GroupFirmwareUpdate job per group:
+- the canary group, when defined, is updated alone first and must complete before any other job
+  is submitted,
+- the other groups run at most 'concurrency' jobs at a time, tracked by one JobWatcher: the next
+  group is submitted as soon as a job ends, so a slow group does not hold back the others,
+- once 'max_failures' groups have failed, no new group is started and the remaining groups are
+  reported as skipped,
+- the job template, groups and bundles are resolved with com.resolver, and the per-device
+  lastFirmwareUpdate report of every updated group is read with get_servers().
+
+Example:
+   rollout = FirmwareRollout(com, [('Production-Group', '2022.03.0'), ('Dev-Group', '2022.03.0')],
+                             canary='Dev-Group', concurrency=4, max_failures=1)
+   for result in rollout.run():
+      print(result.group, result.state, result.status)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+from collections import namedtuple
+
+from .bulk import DEFAULT_CONCURRENCY, get_servers
+from .jobs import JobWatcher
+
+JOB_TEMPLATE = 'GroupFirmwareUpdate'
+
+# group / baseline: target names, job_uri: submitted job (None when not submitted),
+# state: job state, or 'skipped' / 'error' when no job ran, status: job status or error message,
+# devices: list of BulkResult of /servers/{id} for the devices of the group
+GroupResult = namedtuple('GroupResult', ['group', 'baseline', 'job_uri', 'state', 'status', 'devices'])
+
+
+class FirmwareRollout:
+    """Submit GroupFirmwareUpdate jobs for many groups, at most 'concurrency' running at a time.
+
+    com:                COMClient
+    targets:            list of (group name, baseline releaseVersion), or dict {group name: baseline}
+    canary:             name of a group of targets updated alone first, the rollout stops if it fails
+    concurrency:        maximum number of group jobs running at the same time
+    max_failures:       number of failed groups after which no new group is started (None: never stop)
+    report:             read the lastFirmwareUpdate of the devices of every updated group
+    report_concurrency: maximum number of device reads in flight for the report
+    on_change:          callback called with (group name, JobEvent) for every job state change
+    watcher_options:    keyword arguments of the JobWatcher (initial_interval, max_interval...)
+    """
+
+    def __init__(self, com, targets, canary=None, concurrency=4, max_failures=1, report=True,
+                 report_concurrency=DEFAULT_CONCURRENCY, on_change=None, **watcher_options):
+        self.com = com
+        self.targets = list(targets.items()) if isinstance(targets, dict) else [tuple(t) for t in targets]
+        names = [group for group, _ in self.targets]
+        if len(set(names)) != len(names):
+            raise ValueError('a group can only be listed once in the targets')
+        if canary is not None and canary not in names:
+            raise ValueError(f"canary group '{canary}' is not part of the targets")
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self.canary = canary
+        self.concurrency = concurrency
+        self.max_failures = max_failures
+        self.report = report
+        self.report_concurrency = report_concurrency
+        self.on_change = on_change
+        self.watcher_options = watcher_options
+        self.results = {}
+
+    def order(self):
+        """Return the targets in submission order: the canary first, then the others as listed."""
+        return [t for t in self.targets if t[0] == self.canary] + [t for t in self.targets if t[0] != self.canary]
+
+    @property
+    def failures(self):
+        return sum(1 for result in self.results.values() if result.state in ('error', 'failed'))
+
+    def _stop(self):
+        return self.max_failures is not None and self.failures >= self.max_failures
+
+    def _submit(self, job_template_uri, group_name, baseline):
+        """Create the GroupFirmwareUpdate job of one group and return (job uri, device ids)."""
+        groupid = self.com.resolver.group_id(group_name)
+        bundleid = self.com.resolver.bundle_id(baseline)
+        group = self.com.get('/groups/' + groupid)
+        # The list of devices must be provided even if they are already part of the group!
+        deviceids = [server['id'] for server in group['devices']]
+        body = {
+            "jobTemplateUri": job_template_uri,
+            "resourceUri": group['resourceUri'],
+            "data": {
+                "bundle_id": bundleid,
+                "devices": deviceids
+            }
+        }
+        return self.com.post('/jobs', json=body)['resourceUri'], deviceids
+
+    def _callback(self, group_name):
+        return lambda event: self.on_change(group_name, event)
+
+    def _finish(self, watcher, running, job_uri):
+        """Record the GroupResult of a job that is terminal or could not be read anymore."""
+        group_name, baseline, deviceids = running.pop(job_uri)
+        job = watcher.jobs.get(job_uri) or {}
+        state, status = job.get('state'), job.get('status')
+        if job_uri in watcher.errors:
+            state, status = 'error', f"Job could not be read: {watcher.errors[job_uri]}"
+        devices = []
+        if self.report and deviceids:
+            devices = get_servers(self.com, deviceids, concurrency=self.report_concurrency)
+        self.results[group_name] = GroupResult(group_name, baseline, job_uri, state, status, devices)
+
+    def _gated(self):
+        # Nothing else starts while the canary runs, nor after it failed
+        if self.canary is None:
+            return False
+        result = self.results.get(self.canary)
+        return result is None or result.state != 'complete'
+
+    def run(self):
+        """Run the rollout and return the GroupResults in the order of the targets.
+
+        A group is submitted as soon as a job slot is free: a slow group does not hold back the
+        groups after it.
+        """
+        try:
+            job_template_uri = self.com.resolver.job_template_uri(JOB_TEMPLATE)
+        except LookupError as error:
+            for group_name, baseline in self.targets:
+                self.results[group_name] = GroupResult(group_name, baseline, None, 'error', str(error), [])
+            return self.summary()
+
+        watcher = JobWatcher(self.com, **self.watcher_options)
+        queue = self.order()
+        running = {}
+        while True:
+            while queue and len(running) < self.concurrency and not self._stop():
+                if queue[0][0] != self.canary and self._gated():
+                    break
+                group_name, baseline = queue.pop(0)
+                try:
+                    job_uri, deviceids = self._submit(job_template_uri, group_name, baseline)
+                except Exception as error:
+                    self.results[group_name] = GroupResult(group_name, baseline, None, 'error', str(error), [])
+                    continue
+                watcher.watch(job_uri, callback=self._callback(group_name) if self.on_change else None)
+                running[job_uri] = (group_name, baseline, deviceids)
+            if not running:
+                return self.summary()
+
+            watcher.poll_once()
+            pending = set(watcher.pending)
+            for job_uri in [uri for uri in running if uri not in pending]:
+                self._finish(watcher, running, job_uri)
+            if running:
+                watcher.wait()
+
+    def summary(self):
+        """GroupResults in the order of the targets; groups that were not submitted are 'skipped'."""
+        return [self.results.get(group_name) or GroupResult(group_name, baseline, None, 'skipped', None, [])
+                for group_name, baseline in self.targets]
+
+
+def format_summary(results):
+    """Return the per-group / per-device report of a rollout as a list of lines."""
+    lines = []
+    for result in results:
+        lines.append(f"Group: {result.group} - Baseline: {result.baseline} - State: {result.state} - Status: {result.status}")
+        for device in result.devices:
+            if device.error is not None:
+                lines.append(f"   Server: {device.key} - Error: {device.error}")
+            elif device.value.get('lastFirmwareUpdate') is not None:
+                lines.append(f"   Server: {device.value['name']} - Report status: {device.value['lastFirmwareUpdate']['status']}")
+            else:
+                lines.append(f"   Server: {device.value['name']} - State: Firmware update successful - No update was required")
+    return lines
@@ -0,0 +1,223 @@
+"""
+Rate-limit-aware scheduling of the COM API requests.
+
+Every request of a COMClient goes through a RequestScheduler shared by all the threads of a run
+(pagination prefetch, bulk fetches, job watchers...):
+- when a rate is configured, a token bucket per endpoint (first path segment after the API
+  version: 'servers', 'jobs'..., 'ui-doorway' for the ui-doorway calls) caps the request rate;
+  there is no rate limit by default, the concurrency limit and Retry-After react to the 429s,
+- the number of requests in flight is adjusted with AIMD: +1 slot per 'limit' successful
+  requests, and the limit is multiplied by 'decrease' after a 429 or 503 answer,
+- a 429 answer is retried for every method (the API did not process the request), 5xx answers
+  and connection errors only for the idempotent methods (GET, HEAD, PUT, DELETE, OPTIONS),
+- the wait before a retry is the Retry-After header when the API sends one, otherwise an
+  exponential backoff with full jitter.
+
+Example:
+   scheduler = RequestScheduler(rate=10, burst=20, rates={'servers': 5}, max_concurrency=16)
+   com = COMClient(ConnectivityEndpoint, APIversion, tokens, scheduler=scheduler)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+# Answers after which the request is retried; 429 and 503 also reduce the concurrency limit
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+DEFAULT_RETRIES = 5
+
+
+def retry_after(response, now=None):
+    """Return the delay in seconds requested by the Retry-After header of a response, or None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return max(0.0, date.timestamp() - (time.time() if now is None else now))
+
+
+class TokenBucket:
+    """'rate' tokens per second, at most 'burst' tokens accumulated."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def block(self, seconds):
+        """Hold every request of this bucket for 'seconds' (Retry-After)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """Take one token, waiting as needed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIMDLimiter:
+    """Concurrency limit adjusted by additive increase / multiplicative decrease."""
+
+    def __init__(self, initial, minimum=1, maximum=None, decrease=0.5):
+        self.minimum = minimum
+        self.maximum = maximum if maximum is not None else initial
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.decrease = decrease
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RequestScheduler:
+    """Token bucket per endpoint, AIMD concurrency limit and retries shared by the requests of a run.
+
+    rate:            default requests per second of every endpoint (default None: no rate limit)
+    burst:           requests that can be sent at once after an idle period (default: rate)
+    rates:           per-endpoint rates, e.g. {'servers': 5, 'ui-doorway': 2}
+    max_concurrency: upper bound of the concurrency limit, usually the client pool_size
+    min_concurrency: lower bound of the concurrency limit
+    decrease:        factor applied to the concurrency limit after a 429 or 503 answer
+    retries:         maximum number of retries of one request
+    backoff:         base delay in seconds of the exponential backoff
+    max_backoff:     upper bound of a backoff or Retry-After delay
+    """
+
+    def __init__(self, rate=None, burst=None, rates=None, max_concurrency=10, min_concurrency=1,
+                 decrease=0.5, retries=DEFAULT_RETRIES, backoff=0.5, max_backoff=60):
+        self.rate = rate
+        self.burst = burst
+        self.rates = dict(rates or {})
+        self.limiter = AIMDLimiter(max_concurrency, minimum=min_concurrency, maximum=max_concurrency,
+                                   decrease=decrease)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self.retried = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        """Return the TokenBucket of an endpoint, or None when its rate is not limited."""
+        rate = self.rates.get(endpoint, self.rate)
+        if rate is None:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = self._buckets[endpoint] = TokenBucket(rate, self.burst)
+            return bucket
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def send(self, endpoint, method, send):
+        """Call send() (which returns a requests.Response) under the rate and concurrency limits, with retries."""
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        bucket = self.bucket(endpoint)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            self.limiter.acquire()
+            response = None
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                self.limiter.release(throttled=False)
+                if not idempotent or attempt >= self.retries:
+                    raise
+            except BaseException:
+                # SSO or credentials errors raised while sending, broken answers...: the slot must be
+                # given back, or the concurrency limit would shrink for good
+                self.limiter.release(throttled=False)
+                raise
+            else:
+                status = response.status_code
+                throttled = status in THROTTLE_STATUSES
+                self.limiter.release(throttled=throttled)
+                if throttled:
+                    self.throttled += 1
+                retry = status == 429 or (idempotent and status in RETRY_STATUSES)
+                if not retry or attempt >= self.retries:
+                    return response
+
+            delay = retry_after(response) if response is not None else None
+            if delay is not None:
+                delay = min(delay, self.max_backoff)
+                if bucket is not None:
+                    bucket.block(delay)
+            else:
+                delay = self._backoff(attempt)
+            if response is not None:
+                response.close()
+            attempt += 1
+            self.retried += 1
+            time.sleep(delay)
@@ -0,0 +1,157 @@
+"""
+Sustainability metrics of the COM sustainability report in InfluxDB line protocol.
+
+Python counterpart of Grafana-InfluxDB-Telegraf/COM-telegraf-Sustainability-collector.ps1,
+meant to run in a long-lived process (Telegraf execd input) instead of a new pwsh process per
+interval:
+- the token and the connections of the COMClient stay open between collections,
+- the DataRoundupReportOrchestrator job template and the 'All Servers' filter are resolved once
+  with com.resolver and kept for the life of the collector,
+- the report of the day is reused when it is complete; otherwise a CARBON_FOOTPRINT report job is
+  created and tracked with a JobWatcher,
+- the report data is converted to the lines of the PowerShell script (same measurements and fields).
+
+Example:
+   collector = SustainabilityCollector(com)
+   for line in collector.collect():
+      print(line)
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import datetime
+
+from .jobs import JobWatcher
+
+TOTAL_MEASUREMENT = 'COM_Sustainability_Total_Report'
+INDIVIDUAL_MEASUREMENT = 'COM_Sustainability_Individual_Report'
+
+JOB_TEMPLATE = 'DataRoundupReportOrchestrator'
+ALL_SERVERS_FILTER = 'All Servers'
+REPORT_NAME = 'Sustainability report'
+REPORT_TYPE = 'CARBON_FOOTPRINT'
+
+# Versions used by the report endpoints, as in the PowerShell collector
+JOBS_PATH = '/compute-ops-mgmt/v1beta3/jobs'
+REPORTS_PATH = '/compute-ops-mgmt/v1beta2/reports'
+
+# Total series name -> field prefix
+TOTAL_SERIES = {
+    'Carbon Emissions': 'TotalCarbonEmissions',
+    'Energy Consumption': 'TotalEnergyConsumption',
+    'Energy Cost': 'TotalEnergyCost',
+}
+
+
+def escape_key(key):
+    """Escape a measurement or field key for the line protocol."""
+    return str(key).replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def line(measurement, field, value):
+    return escape_key(measurement) + ' ' + escape_key(field) + '=' + repr(round(float(value), 2))
+
+
+def report_lines(report_data, total_measurement=TOTAL_MEASUREMENT, individual_measurement=INDIVIDUAL_MEASUREMENT):
+    """Return the line protocol lines of the data of a sustainability report.
+
+    Each series gives a PerDay field (first bucket) and a PerWeek field (summary sum).
+    """
+    series = ((report_data or {}).get('data') or {}).get('series') or []
+    lines = []
+    for serie in series:
+        prefix = TOTAL_SERIES.get(serie.get('name'))
+        if prefix and (serie.get('subject') or {}).get('type') == 'TOTAL':
+            lines.append(line(total_measurement, prefix + 'PerDay', serie['buckets'][0]['value']))
+            lines.append(line(total_measurement, prefix + 'PerWeek', serie['summary']['sum']))
+
+    servers = [serie for serie in series if (serie.get('subject') or {}).get('type') == 'SERVER']
+    for serie in sorted(servers, key=lambda serie: serie['subject'].get('displayName') or ''):
+        telemetry = serie['name'].replace(' ', '')
+        server = serie['subject'].get('displayName') or serie['subject'].get('id')
+        lines.append(line(individual_measurement, server + '_Total' + telemetry + 'PerWeek', serie['summary']['sum']))
+        lines.append(line(individual_measurement, server + '_Total' + telemetry + 'PerDay', serie['buckets'][0]['value']))
+    return lines
+
+
+class SustainabilityCollector:
+    """Create or reuse the sustainability report of the day and convert its data to line protocol.
+
+    com:             COMClient
+    timeout:         seconds to wait for a report job before giving up
+    watcher_options: keyword arguments of the JobWatcher tracking the report job
+    """
+
+    def __init__(self, com, timeout=500, **watcher_options):
+        self.com = com
+        self.timeout = timeout
+        self.watcher_options = watcher_options
+        self._job_template_uri = None
+        self._filter_uri = None
+
+    def _lookups(self):
+        if self._job_template_uri is None:
+            self._job_template_uri = self.com.resolver.job_template_uri(JOB_TEMPLATE)
+        if self._filter_uri is None:
+            self._filter_uri = self.com.resolver.filter_uri(ALL_SERVERS_FILTER)
+        return self._job_template_uri, self._filter_uri
+
+    def todays_report_id(self):
+        """Return the id of the sustainability report when it was completed today, else None."""
+        report = next((item for item in self.com.iter_collection(REPORTS_PATH) if item.get('name') == REPORT_NAME), None)
+        if report is None:
+            return None
+        report = self.com.get(REPORTS_PATH + '/' + report['id'])
+        created_at = report.get('createdAt') or ''
+        if created_at[:10] == datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d') \
+                and str(report.get('state')).lower() == 'complete':
+            return report['id']
+        return None
+
+    def create_report(self):
+        """Run a CARBON_FOOTPRINT report job and return the id of the report."""
+        job_template_uri, filter_uri = self._lookups()
+        body = {
+            "jobTemplateUri": job_template_uri,
+            "resourceUri": filter_uri,
+            "data": {
+                "reportType": REPORT_TYPE
+            }
+        }
+        job_uri = self.com.post(JOBS_PATH, json=body)['resourceUri']
+        watcher = JobWatcher(self.com, **self.watcher_options)
+        watcher.watch(job_uri)
+        job = watcher.run(timeout=self.timeout)[job_uri] or {}
+        if job_uri in watcher.errors:
+            raise RuntimeError(f"Sustainability report creation failure! Job could not be read: {watcher.errors[job_uri]}")
+        state = str(job.get('state')).lower()
+        if state != 'complete':
+            raise RuntimeError(f"Sustainability report creation failure! State: {job.get('state')} - Status: {job.get('status')}")
+        return job['results']['location'][-36:]
+
+    def collect(self):
+        """Return the line protocol lines of today's sustainability report, creating it if needed."""
+        report_id = self.todays_report_id() or self.create_report()
+        return report_lines(self.com.get(REPORTS_PATH + '/' + report_id + '/data'))
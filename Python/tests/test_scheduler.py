@@ -0,0 +1,96 @@
+"""
+Regression tests of the request scheduler, run against the MockCOM of the benchmarks folder.
+
+   cd Python && python -m unittest discover -s tests
+"""
+
+#################################################################################
+#        (C) Copyright 2022 Hewlett Packard Enterprise Development LP           #
+#################################################################################
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#                                                                               #
+#################################################################################
+
+import os
+import sys
+import threading
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'benchmarks'))
+
+os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+
+from hpecom import COMClient, CredentialsError, TokenProvider  # noqa: E402
+from mock_com import MockCOM  # noqa: E402
+
+
+class FailingSecret:
+    """Client secret callable that raises CredentialsError for the first 'failures' calls."""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures > 0:
+            self.failures -= 1
+            raise CredentialsError('COM_CLIENT_SECRET')
+        return 'secret'
+
+
+class SchedulerSlotTest(unittest.TestCase):
+
+    def call(self, function):
+        """Return function() run in a thread, failing the test when it blocks on the concurrency limit."""
+        result = {}
+
+        def run():
+            try:
+                result['value'] = function()
+            except BaseException as error:
+                result['error'] = error
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), 'request blocked on the concurrency limit')
+        if 'error' in result:
+            raise result['error']
+        return result['value']
+
+    def test_slot_released_when_send_raises(self):
+        with MockCOM(servers=5, groups=1, activities=0) as mock:
+            tokens = TokenProvider('test-client', FailingSecret(3), token_url=mock.url + '/as/token.oauth2',
+                                   background_refresh=False, use_cache=False)
+            com = COMClient(mock.url, 'v1beta1', tokens, pool_size=2)
+
+            # More failures than slots: a leaked slot would block the following requests for good
+            for _ in range(3):
+                with self.assertRaises(CredentialsError):
+                    self.call(lambda: com.get('/servers'))
+            self.assertEqual(com.scheduler.limiter.in_flight, 0)
+
+            self.assertEqual(self.call(lambda: com.get('/servers'))['count'], 5)
+            self.assertEqual(com.scheduler.limiter.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()